@@ -73,8 +73,8 @@ def jsonToGeojson(raw_json):
         ]
     }
 
-    # Return GeoJSON
-    return str(geojson).replace("'", '"')
+    # Return GeoJSON, Encoded so Quotes in Values are Escaped
+    return json.dumps(geojson)
 
 # Run App
 if __name__ == "__main__":
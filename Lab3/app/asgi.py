@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+# Async ASGI API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import re
+import os
+import asyncio
+import asyncpg
+import psycopg2
+import contextlib
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from database import Database
+from versions import LayerVersions
+from layers import LAYERS, Layer, detect_resolutions
+from compression import compress, compress_async_stream, negotiate
+from serializer import CollectionWriter, encode_collection, next_members
+
+# For Type Annotations
+from typing import AsyncIterator, Callable
+
+# Set Vars for Streaming Mode
+stream_default = os.environ.get("STREAM_GEOJSON", "false").lower() == "true"
+stream_fetch_size = int(os.environ.get("STREAM_FETCH_SIZE", 2000))
+
+# Bodies Larger than this are Compressed off the Event Loop
+compress_offload_bytes = 64 * 1024
+
+# PostgreSQL Types of Query Parameters, asyncpg Does Not Infer Them from Python Values
+PARAM_TYPES = [(bool, "boolean"), (int, "bigint"), (float, "float8"), (str, "text")]
+
+
+def numbered(query: str, params: list) -> str:
+    """Rewrites a psycopg2-style query (%s placeholders) for asyncpg ($n placeholders with explicit types).
+
+    Args:
+        query (str): Query from Layer.select() or Layer.feature().
+        params (list): Parameters of the query.
+
+    Raises:
+        ValueError: Raised if the number of placeholders and parameters differ.
+
+    Returns:
+        str: Query with numbered, typed placeholders.
+    """
+    count = 0
+
+    def replace(match) -> str:
+        nonlocal count
+
+        # Escaped Percent Sign
+        if match.group(0) == "%%":
+            return "%"
+
+        param = params[count]
+        count += 1
+
+        if isinstance(param, list):
+            return f"${count}::text[]"
+
+        cast = next(
+            t for python_type, t in PARAM_TYPES if isinstance(param, python_type)
+        )
+
+        return f"${count}::{cast}"
+
+    query = re.sub(r"%%|%s", replace, query)
+
+    if count != len(params):
+        raise ValueError(f"Query has {count} placeholders for {len(params)} params")
+
+    return query
+
+
+def use_streaming(request: Request) -> bool:
+    """Determines if a request should be streamed, based on the 'stream' param or the default."""
+    stream = request.query_params.get("stream")
+
+    if stream is None:
+        return stream_default
+
+    return stream.lower() in ["true", "1", "yes"]
+
+
+async def stream_features(
+    pool: asyncpg.Pool, query: str, params: list, limit: int, fetch_size: int
+) -> AsyncIterator[bytes]:
+    """Yields a FeatureCollection piece by piece, fetching features in batches from a server-side cursor.
+
+    Args:
+        pool (asyncpg.Pool): Connection pool.
+        query (str): Query returning one serialized feature and its key per row.
+        params (list): Parameters of the query.
+        limit (int): Page size, or None if the request is not paged.
+        fetch_size (int): Rows fetched per batch.
+
+    Yields:
+        bytes: Pieces of the FeatureCollection.
+    """
+    # Hold Connection for Lifetime of Response, Cursors Need a Transaction
+    async with pool.acquire() as connection:
+        async with connection.transaction(readonly=True):
+            writer = CollectionWriter()
+            yield writer.start()
+
+            cursor = await connection.cursor(query, *params)
+
+            # Write Batches of Features, Comma Separated
+            last_key = None
+
+            while True:
+                rows = await cursor.fetch(fetch_size)
+
+                if not rows:
+                    break
+
+                yield writer.write([row[0] for row in rows])
+                last_key = rows[-1][1]
+
+            yield writer.end(next_members(limit, writer.count, last_key))
+
+
+def feature_collection(layer: Layer) -> Callable:
+    """Creates the endpoint of a layer, serving the same FeatureCollections as the Flask API.
+
+    Args:
+        layer (Layer): Layer that will be served.
+
+    Returns:
+        Callable: Async endpoint.
+    """
+
+    async def endpoint(request: Request) -> Response:
+        args = request.query_params
+
+        # Build Query from Request Params
+        try:
+            select, select_params, limit = layer.select(args)
+            feature, feature_params = layer.feature(args)
+
+        except ValueError as e:
+            raise HTTPException(400, detail=str(e))
+
+        # Feature Expression Comes First in the Query
+        params = feature_params + select_params
+
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        headers = {"Vary": "Accept-Encoding"}
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        # Stream Features if Requested
+        if use_streaming(request):
+            fetch_size = stream_fetch_size
+
+            with contextlib.suppress(ValueError):
+                fetch_size = int(args.get("fetch_size", stream_fetch_size))
+
+            q = numbered(
+                f"SELECT {feature}, r.{layer.key_column} FROM ({select}) r", params
+            )
+            chunks = stream_features(
+                request.app.state.pool, q, params, limit, max(1, min(fetch_size, 50000))
+            )
+
+            return StreamingResponse(
+                compress_async_stream(chunks, encoding),
+                media_type="application/geo+json",
+                headers=headers,
+            )
+
+        # Query, Returning JSON Text so it is Not Parsed in Python
+        q = numbered(
+            f"SELECT JSON_AGG(({feature})::json)::text, MAX(r.{layer.key_column}), COUNT(*) "
+            f"FROM ({select}) r",
+            params,
+        )
+
+        features, last_key, count = await request.app.state.pool.fetchrow(q, *params)
+
+        # Formatting, Features are Already JSON Text
+        body = encode_collection(features, next_members(limit, count, last_key))
+
+        # Compress Large Bodies in a Thread, so Other Requests Keep Being Served
+        if encoding != "identity" and len(body) > compress_offload_bytes:
+            body = await asyncio.to_thread(compress, body, encoding)
+        else:
+            body = compress(body, encoding)
+
+        # Return GeoJSON Result
+        return Response(body, media_type="application/geo+json", headers=headers)
+
+    return endpoint
+
+
+async def home(request: Request) -> Response:
+    return PlainTextResponse("GIS 5572 - Lab 3 - Luke Zaruba")
+
+
+async def watch_versions(versions: LayerVersions) -> None:
+    """Polls published layer versions in a thread, so pyramid levels are detected again after a publish."""
+    while True:
+        await asyncio.sleep(versions.interval)
+
+        try:
+            await asyncio.to_thread(versions.refresh)
+
+        except (psycopg2.Error, TimeoutError) as e:
+            # Message
+            print(f"Layer versions could not be polled: {e}")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    """Opens the connection pool when the server starts and closes it when it stops."""
+    db = Database.initialize_from_env()
+
+    # Detect H3 Pyramid Levels of Each Table, over One psycopg2 Connection Used Off the Event Loop
+    db.start_pool(minconn=0, maxconn=1)
+    await asyncio.to_thread(detect_resolutions, db)
+
+    versions = LayerVersions(
+        db, interval=float(os.environ.get("VERSION_POLL_SECONDS", 5))
+    )
+    versions.subscribe(lambda table: detect_resolutions(db, table))
+    watcher = asyncio.create_task(watch_versions(versions))
+
+    app.state.pool = await asyncpg.create_pool(
+        host=db.host,
+        user=db.user,
+        password=db.password,
+        database=db.db_name,
+        port=int(db.port) if db.port else None,
+        min_size=int(os.environ.get("DB_POOL_MIN", 1)),
+        max_size=int(os.environ.get("DB_POOL_MAX", 32)),
+    )
+
+    try:
+        yield
+
+    finally:
+        watcher.cancel()
+        await app.state.pool.close()
+        db.pool.close_all()
+
+
+# Set Up Starlette App, One Route per Published Layer
+app = Starlette(
+    routes=[Route("/", home)]
+    + [Route(f"/{name}", feature_collection(layer)) for name, layer in LAYERS.items()],
+    lifespan=lifespan,
+)
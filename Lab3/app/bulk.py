@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+#
+# Bulk PostGIS Loader
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import io
+import re
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+# For Type Annotations
+from typing import List, Tuple, Union
+from numpy import ndarray
+from pandas import DataFrame
+from database import Database
+
+# PostgreSQL Types of pandas Dtype Kinds, Anything Else is Stored as Text
+COLUMN_TYPES = {
+    "i": "bigint",
+    "u": "bigint",
+    "f": "double precision",
+    "b": "boolean",
+    "M": "timestamp",
+}
+
+# Key & Geometry Columns, Named as in SDE Exports so the API Layers Read Them Unchanged
+KEY_COLUMN = "objectid"
+GEOMETRY_COLUMN = "shape"
+
+
+class BulkLoader:
+    """
+    A class used to publish DataFrames to PostGIS with COPY, without ArcGIS.
+
+    Rows are streamed into a staging table with COPY ... FROM STDIN in CSV format, geometries as
+    EWKT. The key, spatial and attribute indexes are built once the data is in, and the staging table then
+    replaces the published table in one short transaction that also bumps its version. Readers keep
+    using the old table until the swap and only wait for the rename itself.
+
+    Methods
+    -------
+    publish(df, table, geometry, srid, index_columns)
+        Loads a DataFrame into a staging table and swaps it in for the published table.
+    publish_points(table, x, y, values, srid, index_columns)
+        Publishes point predictions held in arrays.
+
+    Example
+    -------
+    > loader = BulkLoader(Database.initialize_from_env())
+    > loader.publish(df, "aggmthwx_62022_h3", geometry="wkt", index_columns=["mean_predicted"])
+    """
+
+    def __init__(
+        self, db: Database, chunk_rows: int = 100000, lock_timeout: str = "5s"
+    ) -> None:
+        """Instantiates the BulkLoader class.
+
+        Args:
+            db (Database): Database that tables will be published to.
+            chunk_rows (int, optional): Rows serialized per COPY chunk, bounding memory. Defaults to 100000.
+            lock_timeout (str, optional): Longest wait for readers to release the table at the swap. Defaults to "5s".
+        """
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.lock_timeout = lock_timeout
+
+    def publish(
+        self,
+        df: DataFrame,
+        table: str,
+        geometry: Union[str, Tuple[str, str]] = ("x", "y"),
+        srid: int = 4326,
+        index_columns: List[str] = None,
+    ) -> None:
+        """Loads a DataFrame into a staging table and swaps it in for the published table.
+
+        Args:
+            df (DataFrame): Rows that will be published.
+            table (str): Name of the published table.
+            geometry (Union[str, Tuple[str, str]], optional): Name of a WKT column, or names of the x and y columns
+                of points. Defaults to ("x", "y").
+            srid (int, optional): SRID of the geometries. Defaults to 4326.
+            index_columns (List[str], optional): Columns that get a B-tree index, e.g. API filter columns. Defaults to None.
+
+        Raises:
+            ValueError: Raised if a table or column name is not a plain identifier.
+        """
+        table = self._identifier(table)
+        staging = f"{table[:40]}_staging_{uuid.uuid4().hex[:8]}"
+        start = time.perf_counter()
+
+        # Attribute Columns, Keeping Point Coordinates as Attributes
+        attributes = df.drop(columns=[geometry] if isinstance(geometry, str) else [])
+        attributes.columns = [self._identifier(c) for c in attributes.columns]
+        attributes = attributes.drop(
+            columns=[KEY_COLUMN, GEOMETRY_COLUMN], errors="ignore"
+        )
+
+        # Geometries as EWKT
+        if isinstance(geometry, str):
+            shapes = f"SRID={srid};" + df[geometry].astype(str)
+        else:
+            x, y = df[geometry[0]], df[geometry[1]]
+            shapes = f"SRID={srid};POINT(" + x.astype(str) + " " + y.astype(str) + ")"
+
+        with self.db.checkout() as connection:
+            try:
+                with connection.cursor() as c:
+                    # Load & Index Staging Table, Invisible to Readers until Committed
+                    c.execute(self._create_statement(staging, attributes, srid))
+                    self._copy(c, staging, attributes, shapes.to_numpy())
+                    suffixes = self._index(c, staging, index_columns or [])
+                connection.commit()
+
+                # Swap Tables & Bump Version in One Short Transaction
+                with connection.cursor() as c:
+                    self._swap(c, staging, table, suffixes)
+                connection.commit()
+
+            except Exception:
+                connection.rollback()
+
+                # Remove Partial Staging Table
+                with connection.cursor() as c:
+                    c.execute(f"DROP TABLE IF EXISTS {staging};")
+                connection.commit()
+
+                raise
+
+        # Message
+        print(
+            f"{len(df)} rows published to {table} in {time.perf_counter() - start:.2f} s"
+        )
+
+    def publish_points(
+        self,
+        table: str,
+        x: ndarray,
+        y: ndarray,
+        values: dict,
+        srid: int = 4326,
+        index_columns: List[str] = None,
+    ) -> None:
+        """Publishes point predictions held in arrays, e.g. a surface sampled at cell centres.
+
+        Args:
+            table (str): Name of the published table.
+            x (ndarray): X coordinates.
+            y (ndarray): Y coordinates.
+            values (dict): Arrays of attribute values, keyed by column name.
+            srid (int, optional): SRID of the coordinates. Defaults to 4326.
+            index_columns (List[str], optional): Columns that get a B-tree index. Defaults to None.
+        """
+        df = pd.DataFrame({"x": np.ravel(x), "y": np.ravel(y)})
+
+        for name, value in values.items():
+            df[name] = np.ravel(value)
+
+        self.publish(df, table, ("x", "y"), srid, index_columns)
+
+    def _copy(self, cursor, table: str, attributes: DataFrame, shapes: ndarray) -> None:
+        """Streams rows into a table with COPY, one chunk of CSV at a time."""
+        columns = ", ".join([KEY_COLUMN] + list(attributes.columns) + [GEOMETRY_COLUMN])
+        statement = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+        for start in range(0, len(attributes), self.chunk_rows):
+            rows = slice(start, start + self.chunk_rows)
+
+            # Key, Attributes & Geometry of the Chunk
+            chunk = attributes.iloc[rows].copy()
+            chunk.insert(0, KEY_COLUMN, np.arange(start + 1, start + 1 + len(chunk)))
+            chunk[GEOMETRY_COLUMN] = shapes[rows]
+
+            buffer = io.StringIO()
+            chunk.to_csv(
+                buffer, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S"
+            )
+            buffer.seek(0)
+
+            cursor.copy_expert(statement, buffer)
+
+    def _create_statement(self, table: str, attributes: DataFrame, srid: int) -> str:
+        """Builds the CREATE TABLE statement of a staging table."""
+        columns = [f"{KEY_COLUMN} bigint"]
+
+        for name, dtype in attributes.dtypes.items():
+            columns.append(f"{name} {COLUMN_TYPES.get(dtype.kind, 'text')}")
+
+        columns.append(f"{GEOMETRY_COLUMN} geometry(Geometry, {int(srid)})")
+
+        return f"CREATE TABLE {table} ({', '.join(columns)});"
+
+    def _index(self, cursor, table: str, index_columns: List[str]) -> List[str]:
+        """Builds the key, spatial & attribute indexes once the data is loaded, in one pass each.
+
+        Staging indexes get short ordinal names, as the final names are still taken by the published table.
+
+        Returns:
+            List[str]: Suffix of the final name of each index, in ordinal order.
+        """
+        statements = [
+            (
+                f"{KEY_COLUMN}_idx",
+                f"CREATE UNIQUE INDEX {{}} ON {table} ({KEY_COLUMN});",
+            ),
+            (
+                f"{GEOMETRY_COLUMN}_gist",
+                f"CREATE INDEX {{}} ON {table} USING GIST ({GEOMETRY_COLUMN});",
+            ),
+        ]
+
+        for column in dict.fromkeys(self._identifier(c) for c in index_columns):
+            statements.append(
+                (f"{column}_idx", f"CREATE INDEX {{}} ON {table} ({column});")
+            )
+
+        for i, (_, statement) in enumerate(statements):
+            cursor.execute(statement.format(f"{table}_{i}"))
+
+        cursor.execute(f"ANALYZE {table};")
+
+        return [suffix for suffix, _ in statements]
+
+    def _swap(self, cursor, staging: str, table: str, suffixes: List[str]) -> None:
+        """Replaces the published table with the staging table and bumps its version."""
+        # Give Up Rather than Queue Behind Long Reads, which Would Block New Readers
+        cursor.execute(f"SET LOCAL lock_timeout = '{self.lock_timeout}';")
+        cursor.execute(f"DROP TABLE IF EXISTS {table};")
+        cursor.execute(f"ALTER TABLE {staging} RENAME TO {table};")
+
+        # Index Names Match Those the API Creates, so They are Not Built Twice
+        for i, suffix in enumerate(suffixes):
+            cursor.execute(f"ALTER INDEX {staging}_{i} RENAME TO {table}_{suffix};")
+
+        # Bump Published Version & Notify Listening API Workers
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS layer_versions (
+                layer_name text PRIMARY KEY,
+                version bigint NOT NULL DEFAULT 1,
+                updated_at timestamptz NOT NULL DEFAULT now()
+            );
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO layer_versions (layer_name) VALUES (%s)
+            ON CONFLICT (layer_name) DO UPDATE
+            SET version = layer_versions.version + 1, updated_at = now();
+            """,
+            (table,),
+        )
+        cursor.execute("SELECT pg_notify('layer_changed', %s);", (table,))
+
+    @staticmethod
+    def _identifier(name: str) -> str:
+        """Lowercases a table or column name and checks that it is a plain identifier.
+
+        Args:
+            name (str): Name of the table or column.
+
+        Raises:
+            ValueError: Raised if the name is not a plain identifier.
+
+        Returns:
+            str: Lowercase name.
+        """
+        name = str(name).lower()
+
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", name):
+            raise ValueError(f"'{name}' is not a valid table or column name")
+
+        return name
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Response Compression for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import gzip
+import zlib
+
+# For Type Annotations
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+# Brotli is Optional, Only gzip is Offered Without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Supported Encodings, in Order of Server Preference
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate(accept_encoding: str) -> str:
+    """Picks the best supported content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding header, or None.
+
+    Returns:
+        str: One of ENCODINGS, or "identity" if none of them are acceptable.
+    """
+    if not accept_encoding:
+        return "identity"
+
+    # Parse Codings & Quality Values
+    qualities = {}
+
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+
+        qualities[coding.strip().lower()] = quality
+
+    # Choose Highest Quality, Ties Broken by Server Preference
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = "identity", 0.0
+
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = None) -> bytes:
+    """Compresses a body with the given content coding.
+
+    Args:
+        body (bytes): Body that will be compressed.
+        encoding (str): One of ENCODINGS or "identity".
+        level (int, optional): Compression level, or quality for brotli. Defaults to a fast level per coding.
+
+    Raises:
+        ValueError: Raised if encoding is not supported.
+
+    Returns:
+        bytes: Compressed body.
+    """
+    if encoding == "identity":
+        return body
+
+    elif encoding == "gzip":
+        return gzip.compress(body, compresslevel=6 if level is None else level)
+
+    elif encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=5 if level is None else level)
+
+    else:
+        raise ValueError(f"Param 'encoding' must be in {ENCODINGS + ['identity']}")
+
+
+def compress_stream(chunks: Iterable, encoding: str) -> Iterator[bytes]:
+    """Compresses a stream of chunks incrementally, so a streamed response stays streamed.
+
+    Args:
+        chunks (Iterable): Chunks of str or bytes that will be compressed.
+        encoding (str): One of ENCODINGS or "identity".
+
+    Raises:
+        ValueError: Raised if encoding is not supported.
+
+    Yields:
+        bytes: Compressed data, as soon as the compressor emits it.
+    """
+    process, finish = _stream_compressor(encoding)
+
+    try:
+        for chunk in chunks:
+            # Compressors Buffer Internally, Only Yield Once they Emit Data
+            data = process(chunk)
+
+            if data:
+                yield data
+
+        # Flush Remaining Data
+        data = finish()
+
+        if data:
+            yield data
+
+    finally:
+        # Close Source so it Releases its Resources if the Client Disconnects
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+async def compress_async_stream(
+    chunks: AsyncIterable, encoding: str
+) -> AsyncIterator[bytes]:
+    """Compresses an asynchronous stream of chunks incrementally, like compress_stream().
+
+    Args:
+        chunks (AsyncIterable): Chunks of str or bytes that will be compressed.
+        encoding (str): One of ENCODINGS or "identity".
+
+    Raises:
+        ValueError: Raised if encoding is not supported.
+
+    Yields:
+        bytes: Compressed data, as soon as the compressor emits it.
+    """
+    process, finish = _stream_compressor(encoding)
+
+    try:
+        async for chunk in chunks:
+            data = process(chunk)
+
+            if data:
+                yield data
+
+        data = finish()
+
+        if data:
+            yield data
+
+    finally:
+        # Close Source so it Releases its Connection if the Client Disconnects
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+
+def _stream_compressor(encoding: str) -> tuple:
+    """Creates an incremental compressor for a content coding.
+
+    Args:
+        encoding (str): One of ENCODINGS or "identity".
+
+    Raises:
+        ValueError: Raised if encoding is not supported.
+
+    Returns:
+        tuple: Function that compresses one str or bytes chunk, and function that flushes the rest.
+    """
+    if encoding == "identity":
+        compressor = None
+
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    elif encoding == "br" and brotli is not None:
+        compressor = brotli.Compressor(quality=5)
+
+    else:
+        raise ValueError(f"Param 'encoding' must be in {ENCODINGS + ['identity']}")
+
+    def process(chunk) -> bytes:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+
+        if compressor is None:
+            return chunk
+
+        return (
+            compressor.process(chunk)
+            if encoding == "br"
+            else compressor.compress(chunk)
+        )
+
+    def finish() -> bytes:
+        if compressor is None:
+            return b""
+
+        return compressor.finish() if encoding == "br" else compressor.flush()
+
+    return process, finish
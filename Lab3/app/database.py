@@ -7,8 +7,262 @@
 #
 
 import psycopg2
+import psycopg2.extensions
+import threading
+import time
+import uuid
 import os
 
+from contextlib import contextmanager
+
+# For Type Annotations
+from typing import Callable, Iterator
+
+
+class ConnectionPool:
+    """
+    A class used to represent a bounded, thread-safe pool of database connections.
+
+    Methods
+    -------
+    open_min()
+        Opens the minconn connections the pool keeps idle.
+    acquire()
+        Checks out a healthy connection from the pool, waiting if the pool is exhausted.
+    release(connection)
+        Returns a connection to the pool, recycling it if it is broken.
+    close_all()
+        Closes every connection held by the pool, and every connection released after it.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        minconn: int = 1,
+        maxconn: int = 8,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        """Instantiates the ConnectionPool class. Connections are opened on first use, or up front with open_min().
+
+        Args:
+            connect (Callable): Function that opens and returns a new database connection.
+            minconn (int, optional): Number of idle connections that are never trimmed. Defaults to 1.
+            maxconn (int, optional): Maximum number of open connections. Defaults to 8.
+            timeout (float, optional): Seconds to wait for a free connection. Defaults to 30.0.
+            max_idle (float, optional): Seconds after which idle connections above minconn are closed. Defaults to 300.0.
+            max_lifetime (float, optional): Seconds after which a connection is replaced. Defaults to 3600.0.
+            health_check_interval (float, optional): Idle seconds after which a connection is pinged before reuse. Defaults to 30.0.
+
+        Raises:
+            ValueError: Raised if minconn or maxconn are not valid sizes.
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(
+                "Params must satisfy 0 <= 'minconn' <= 'maxconn' and 'maxconn' >= 1"
+            )
+
+        self.connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        # Idle Connections as [connection, created, last_used], Most Recently Used Last
+        self._idle = []
+        self._created = {}
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def open_min(self) -> None:
+        """Opens connections until the pool holds minconn, so the first requests do not wait to connect."""
+        while True:
+            with self._condition:
+                if self._size >= self.minconn:
+                    return
+
+                self._size += 1
+
+            # Connect Outside of the Lock
+            try:
+                connection = self.connect()
+
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                raise
+
+            now = time.monotonic()
+
+            with self._condition:
+                self._created[id(connection)] = now
+                self._idle.append([connection, now, now])
+                self._condition.notify()
+
+    def acquire(self) -> psycopg2.extensions.connection:
+        """Checks out a healthy connection from the pool, waiting if the pool is exhausted.
+
+        Raises:
+            TimeoutError: Raised if no connection becomes available within the timeout.
+
+        Returns:
+            psycopg2.extensions.connection: An open database connection.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            with self._condition:
+                # Take Most Recently Used Idle Connection or Reserve a New Slot
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise TimeoutError(
+                            f"No database connection available after {self.timeout} seconds"
+                        )
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    entry = None
+                    self._size += 1
+
+            # Open New Connection Outside of the Lock
+            if entry is None:
+                try:
+                    connection = self.connect()
+
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+
+                self._created[id(connection)] = time.monotonic()
+                return connection
+
+            # Reuse Idle Connection if it is Healthy, Otherwise Recycle it
+            connection, created, last_used = entry
+
+            if self._healthy(connection, created, last_used):
+                return connection
+
+            with self._condition:
+                self._discard(connection)
+                self._condition.notify()
+
+    def release(self, connection: psycopg2.extensions.connection) -> None:
+        """Returns a connection to the pool, recycling it if it is broken.
+
+        Args:
+            connection (psycopg2.extensions.connection): Connection that was checked out with acquire().
+
+        Raises:
+            ValueError: Raised if the connection was not checked out from this pool.
+        """
+        # Only Connections Checked Out from this Pool Hold a Slot
+        with self._condition:
+            checked_out = id(connection) in self._created and not any(
+                entry[0] is connection for entry in self._idle
+            )
+
+        if not checked_out:
+            raise ValueError("Connection was not checked out from this pool")
+
+        # Clear Any Open Transaction, Outside of the Lock
+        if not connection.closed:
+            try:
+                status = connection.info.transaction_status
+
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+
+            except psycopg2.Error:
+                connection.close()
+
+        with self._condition:
+            # Recycle Broken or Expired Connections, and All Connections Once the Pool is Closed
+            created = self._created[id(connection)]
+
+            if (
+                self._closed
+                or connection.closed
+                or time.monotonic() - created > self.max_lifetime
+            ):
+                self._discard(connection)
+
+            else:
+                self._idle.append([connection, created, time.monotonic()])
+
+            # Trim Idle Connections Above Min
+            self._trim()
+
+            # Wake One Waiting Thread
+            self._condition.notify()
+
+    def close_all(self) -> None:
+        """Closes every idle connection held by the pool. Connections checked out now are closed when released."""
+        with self._condition:
+            self._closed = True
+
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def _healthy(self, connection, created: float, last_used: float) -> bool:
+        """Checks that a connection is open, not expired and, if it has been idle for a while, still responsive.
+
+        Args:
+            connection (psycopg2.extensions.connection): Connection to check.
+            created (float): Monotonic time the connection was opened.
+            last_used (float): Monotonic time the connection was last released.
+
+        Returns:
+            bool: True if the connection can be reused.
+        """
+        now = time.monotonic()
+
+        if connection.closed or now - created > self.max_lifetime:
+            return False
+
+        # Ping Connections that Have Been Idle
+        if now - last_used > self.health_check_interval:
+            try:
+                with connection.cursor() as c:
+                    c.execute("SELECT 1;")
+                connection.rollback()
+
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _trim(self) -> None:
+        """Closes the least recently used idle connections above minconn that have exceeded max_idle."""
+        now = time.monotonic()
+
+        while len(self._idle) > self.minconn and now - self._idle[0][2] > self.max_idle:
+            self._discard(self._idle.pop(0)[0])
+
+    def _discard(self, connection) -> None:
+        """Closes a connection and frees its slot in the pool. The caller must hold the lock.
+
+        Args:
+            connection (psycopg2.extensions.connection): Connection to discard.
+        """
+        self._created.pop(id(connection), None)
+        self._size -= 1
+
+        try:
+            connection.close()
+
+        except psycopg2.Error:
+            pass
+
 
 class Database:
     """
@@ -20,8 +274,14 @@ class Database:
         Initializes a database object, based on environmental variable.
     connect()
         Makes connection to database.
+    start_pool(minconn, maxconn)
+        Switches the database object to pooled mode.
+    checkout()
+        Context manager that binds a connection to the current thread.
     query(query)
         Executes query on database.
+    stream(query, params, fetch_size)
+        Streams the results of a query in batches through a server-side cursor.
     close()
         Closes connection to database.
     """
@@ -42,8 +302,21 @@ class Database:
         self.db_name = db_name
         self.port = port
 
-        # Set Connection to None
+        # Connections are Held per Thread
+        self._local = threading.local()
+
+        # Set Connection & Pool to None
         self.connection = None
+        self.pool = None
+
+    @property
+    def connection(self):
+        """The connection that is bound to the current thread."""
+        return getattr(self._local, "connection", None)
+
+    @connection.setter
+    def connection(self, value) -> None:
+        self._local.connection = value
 
     @classmethod
     def initialize_from_env(cls) -> None:
@@ -58,9 +331,13 @@ class Database:
         # Return Instance
         return cls(host, user, password, db_name, port)
 
-    def connect(self) -> None:
-        """Makes connection to database."""
-        self.connection = psycopg2.connect(
+    def _open(self) -> psycopg2.extensions.connection:
+        """Opens a new connection to the database.
+
+        Returns:
+            psycopg2.extensions.connection: The new connection.
+        """
+        return psycopg2.connect(
             host=self.host,
             database=self.db_name,
             user=self.user,
@@ -68,21 +345,71 @@ class Database:
             port=self.port,
         )
 
-    def query(self, query: str) -> str:
+    def connect(self) -> None:
+        """Makes connection to database."""
+        self.connection = self._open()
+
+    def start_pool(self, minconn: int = 1, maxconn: int = 8, **kwargs) -> None:
+        """Switches the database object to pooled mode, where checkout() borrows connections from a shared pool.
+
+        Args:
+            minconn (int, optional): Number of connections opened now and never trimmed when idle. Defaults to 1.
+            maxconn (int, optional): Maximum number of open connections. Defaults to 8.
+            **kwargs: Additional keyword arguments passed to ConnectionPool.
+        """
+        self.pool = ConnectionPool(self._open, minconn, maxconn, **kwargs)
+        self.pool.open_min()
+
+    @contextmanager
+    def checkout(self) -> Iterator[psycopg2.extensions.connection]:
+        """Binds a connection to the current thread for the duration of the block. Nested checkouts reuse it.
+
+        In pooled mode the connection is borrowed from the pool, otherwise a new connection is made and closed.
+
+        Yields:
+            psycopg2.extensions.connection: The connection bound to the current thread.
+        """
+        # Reuse Connection Already Held by this Thread
+        if self.connection is not None:
+            yield self.connection
+            return
+
+        # Borrow from Pool or Connect Directly
+        if self.pool is not None:
+            self.connection = self.pool.acquire()
+        else:
+            self.connect()
+
+        try:
+            yield self.connection
+
+        finally:
+            # Return to Pool or Close Connection
+            if self.pool is not None:
+                self.pool.release(self.connection)
+                self.connection = None
+            else:
+                self.close()
+
+    def query(self, query: str, params=None) -> list:
         """Executes a query on a database connection. A connection should already exist.
 
         Args:
             query (str): A SQL query that will be executed.
+            params (tuple, optional): Parameters that will be bound to the query. Defaults to None.
+
+        Raises:
+            psycopg2.Error: Raised if the query fails, after its transaction is rolled back.
 
         Returns:
-            str: The return from the SQL query.
+            list: The rows returned by the SQL query.
         """
         # Open Cursor
         with self.connection.cursor() as c:
             # Try to Execute
             try:
                 # Execute Query
-                c.execute(query)
+                c.execute(query, params)
 
                 # Commit to DB
                 self.connection.commit()
@@ -90,12 +417,45 @@ class Database:
                 # Return Output
                 return c.fetchall()
 
-            except Exception as e:
+            except Exception:
                 # Roll Back Transaction if Invalid Query
                 self.connection.rollback()
 
-                # Display Error
-                return "Error: " + e
+                # Let Caller Handle the Error
+                raise
+
+    def stream(self, query: str, params=None, fetch_size: int = 2000) -> Iterator[list]:
+        """Streams the results of a query in batches through a named (server-side) cursor, so the full result
+        is never held in memory. A connection should already exist, e.g. from checkout().
+
+        Args:
+            query (str): A SQL query that will be executed.
+            params (tuple, optional): Parameters that will be bound to the query. Defaults to None.
+            fetch_size (int, optional): Number of rows fetched from the server per batch. Defaults to 2000.
+
+        Yields:
+            list: A batch of at most fetch_size rows.
+        """
+        try:
+            # Open Named Cursor, which Keeps the Result Set on the Server
+            with self.connection.cursor(name=f"stream_{uuid.uuid4().hex}") as c:
+                # Execute Query
+                c.itersize = fetch_size
+                c.execute(query, params)
+
+                # Fetch Rows in Batches
+                while True:
+                    rows = c.fetchmany(fetch_size)
+
+                    if not rows:
+                        break
+
+                    yield rows
+
+        finally:
+            # End Read-Only Transaction
+            if not self.connection.closed:
+                self.connection.rollback()
 
     def close(self):
         """Closes connection to database."""
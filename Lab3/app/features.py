@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#
+# In-Memory Feature Store for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import threading
+import numpy as np
+import shapely
+
+from serializer import encode_collection
+
+# For Type Annotations
+from typing import Dict, List, Optional
+from numpy import ndarray
+from database import Database
+from layers import Layer
+
+
+class LayerIndex:
+    """
+    A class used to hold the features of one layer in memory, indexed with STRtrees.
+
+    Geometries are kept as a shapely array in WGS84, and the serialized features as one UTF-8 buffer
+    with offsets, so a layer costs a few arrays rather than a Python object per feature. Pyramid
+    layers get one tree per resolution, so a query never visits cells of other levels.
+
+    Methods
+    -------
+    bbox(bbox, res)
+        Finds the features that intersect a bounding box.
+    point(lon, lat, res)
+        Finds the features that contain a point, e.g. the H3 cell a location falls in.
+    collection(index)
+        Serializes features as a FeatureCollection.
+    """
+
+    def __init__(
+        self,
+        keys: ndarray,
+        geometries: ndarray,
+        features: List[str],
+        res: ndarray = None,
+        version: int = 0,
+    ) -> None:
+        """Instantiates the LayerIndex class, building its STRtrees.
+
+        Args:
+            keys (ndarray): Key of each feature, in ascending order.
+            geometries (ndarray): Shapely geometries in WGS84.
+            features (List[str]): Each feature serialized as GeoJSON.
+            res (ndarray, optional): H3 resolution of each feature of a pyramid layer. Defaults to None.
+            version (int, optional): Version of the table the features were loaded from. Defaults to 0.
+        """
+        self.keys = keys
+        self.geometries = geometries
+        self.version = version
+
+        # One Buffer of Features with Offsets
+        encoded = [f.encode("utf-8") for f in features]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(f) for f in encoded], out=self.offsets[1:])
+        self.buffer = b"".join(encoded)
+
+        # One Tree per Resolution, Holding Positions into the Arrays
+        self.trees = {}
+        levels = {None: np.arange(len(keys))} if res is None else {}
+
+        if res is not None:
+            for level in np.unique(res):
+                levels[int(level)] = np.flatnonzero(res == level)
+
+        for level, positions in levels.items():
+            self.trees[level] = (shapely.STRtree(geometries[positions]), positions)
+
+    def bbox(self, bbox: List[float], res: int = None) -> ndarray:
+        """Finds the features that intersect a bounding box.
+
+        Args:
+            bbox (List[float]): minx, miny, maxx, maxy in WGS84.
+            res (int, optional): Resolution of a pyramid layer. Defaults to None.
+
+        Returns:
+            ndarray: Positions of the features, in key order.
+        """
+        return self._query(shapely.box(*bbox), res)
+
+    def point(self, lon: float, lat: float, res: int = None) -> ndarray:
+        """Finds the features that contain a point, e.g. the H3 cell a location falls in.
+
+        Args:
+            lon (float): Longitude.
+            lat (float): Latitude.
+            res (int, optional): Resolution of a pyramid layer. Defaults to None.
+
+        Returns:
+            ndarray: Positions of the features, in key order.
+        """
+        return self._query(shapely.Point(lon, lat), res)
+
+    def collection(self, index: ndarray) -> bytes:
+        """Serializes features as a FeatureCollection, slicing them out of the buffer.
+
+        Args:
+            index (ndarray): Positions of the features.
+
+        Returns:
+            bytes: UTF-8 encoded FeatureCollection.
+        """
+        starts, ends = self.offsets[index], self.offsets[index + 1]
+
+        return encode_collection([self.buffer[s:e] for s, e in zip(starts, ends)])
+
+    def _query(self, geometry, res: int) -> ndarray:
+        """Queries the tree of a resolution with exact intersection, returning positions in key order."""
+        if res not in self.trees:
+            return np.empty(0, dtype=np.intp)
+
+        tree, positions = self.trees[res]
+
+        return np.sort(positions[tree.query(geometry, predicate="intersects")])
+
+
+class FeatureStore:
+    """
+    A class used to serve hot layers from memory, so bbox and point queries skip the database.
+
+    Each layer is loaded once in the background, on first use or at startup, and reloaded in the
+    background when its table is republished. Until the first load finishes requests are left to the
+    database, and a new copy is swapped in whole, so requests keep using the previous one while it
+    loads. Layers with more than max_features features are left to the database.
+
+    Methods
+    -------
+    get(layer)
+        Returns the index of a layer, starting to load it on first use.
+    load(layer, version)
+        Loads a layer from the database and swaps it in.
+    reload(table, version)
+        Reloads a republished table in a background thread.
+    """
+
+    def __init__(
+        self, db: Database, layers: List[Layer], max_features: int = 200000
+    ) -> None:
+        """Instantiates the FeatureStore class.
+
+        Args:
+            db (Database): Database that holds the layers.
+            layers (List[Layer]): Layers that may be served from memory.
+            max_features (int, optional): Largest layer held in memory. Defaults to 200000.
+        """
+        self.db = db
+        self.layers = {layer.table: layer for layer in layers}
+        self.max_features = max_features
+
+        # Index per Table, None if the Table is Too Large
+        self._indexes: Dict[str, Optional[LayerIndex]] = {}
+        self._locks = {table: threading.Lock() for table in self.layers}
+
+        # Tables Whose First Load is Running
+        self._loading = set()
+        self._loading_lock = threading.Lock()
+
+    def get(self, layer: Layer) -> Optional[LayerIndex]:
+        """Returns the index of a layer, starting to load it in the background on first use.
+
+        Args:
+            layer (Layer): Layer that is queried.
+
+        Returns:
+            LayerIndex: The index, or None if the layer is not held in memory (yet).
+        """
+        if layer.table not in self.layers:
+            return None
+
+        # Never Load on the Request Thread, the Database Serves Until the Load Finishes
+        if layer.table not in self._indexes:
+            self._load_in_background(layer)
+
+        return self._indexes.get(layer.table)
+
+    def load(self, layer: Layer, version: int = 0) -> Optional[LayerIndex]:
+        """Loads a layer from the database and swaps it in.
+
+        Args:
+            layer (Layer): Layer that will be loaded.
+            version (int, optional): Version of the table being loaded. Defaults to 0.
+
+        Returns:
+            LayerIndex: The new index, or None if the layer is too large.
+        """
+        # Geometries in WGS84 for Indexing, Features Serialized Like the Default Query
+        res = ", t.res" if layer.resolutions is not None else ""
+        q = (
+            f"SELECT t.{layer.key_column}, "
+            f"ST_AsBinary(ST_Transform(t.{layer.geometry_column}, 4326)), "
+            f"ST_AsGeoJSON(t)::text{res} "
+            f"FROM {layer.table} t ORDER BY t.{layer.key_column};"
+        )
+
+        with self.db.checkout():
+            count = self.db.query(f"SELECT COUNT(*) FROM {layer.table};")[0][0]
+
+            if count > self.max_features:
+                self._indexes[layer.table] = None
+
+                # Message
+                print(f"{layer.table} has {count} features, served from the database")
+                return None
+
+            rows = [row for batch in self.db.stream(q) for row in batch]
+
+        columns = list(zip(*rows)) if rows else [[], [], [], []]
+
+        index = LayerIndex(
+            np.array(columns[0], dtype=np.int64),
+            shapely.from_wkb([bytes(g) for g in columns[1]]),
+            list(columns[2]),
+            np.array(columns[3], dtype=np.int64) if res else None,
+            version,
+        )
+
+        # Swap In Whole
+        self._indexes[layer.table] = index
+
+        # Message
+        print(f"{len(rows)} features of {layer.table} loaded into memory")
+
+        return index
+
+    def reload(self, table: str, version: int = 0) -> None:
+        """Reloads a republished table in a background thread, if it is held in memory.
+
+        Args:
+            table (str): Name of the table that changed.
+            version (int, optional): New version of the table. Defaults to 0.
+        """
+        if table not in self.layers:
+            return
+
+        def run():
+            with self._locks[table]:
+                self.load(self.layers[table], version)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _load_in_background(self, layer: Layer) -> None:
+        """Starts the first load of a layer in a background thread, unless it is already running."""
+        with self._loading_lock:
+            if layer.table in self._loading:
+                return
+
+            self._loading.add(layer.table)
+
+        def run():
+            try:
+                with self._locks[layer.table]:
+                    if layer.table not in self._indexes:
+                        self.load(layer)
+
+            # A Failed Load is Retried on a Later Request
+            finally:
+                with self._loading_lock:
+                    self._loading.discard(layer.table)
+
+        threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+#
+# Layer Registry for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import math
+import psycopg2
+
+# For Type Annotations
+from typing import List, Optional, Tuple
+from werkzeug.datastructures import MultiDict
+
+# Maximum Number of Features per Page
+MAX_LIMIT = 50000
+
+# Size of One 256px Tile Pixel at Zoom 0, in Web Mercator Meters & in Degrees
+PIXEL_METERS = 156543.03392804097
+PIXEL_DEGREES = 360 / 256
+
+# Average Edge Length & Area of H3 Cells at Resolution 0, Each Resolution Divides Area by 7
+H3_EDGE_KM = 1107.712591
+H3_AREA_KM2 = 4357449.416078381
+
+# Target On-Screen Edge of a Cell, in Pixels, & Maximum Cells in a Bounding Box
+CELL_PIXELS = 8
+MAX_CELLS = 2000
+
+# Kilometres per Degree of Latitude
+KM_PER_DEGREE = 111.32
+
+
+class Layer:
+    """
+    A class used to represent a published layer and the query parameters it supports.
+
+    Every layer supports 'bbox' (minx,miny,maxx,maxy in WGS84), 'limit' and a keyset 'after' cursor on
+    its key column. Attribute filters are declared per layer as {param: (column, operator, type)}.
+
+    Layers that hold an H3 pyramid (several resolutions in one table, told apart by a 'res' column)
+    serve one resolution per request, picked from 'res', 'zoom' or the size of 'bbox'. Whether a table
+    holds a pyramid, and which levels, is detected from the table by detect_resolutions(), since tables
+    published by the ARCPY engine or without a pyramid have no 'res' column. Until then, and for tables
+    without one, every row is served.
+
+    Methods
+    -------
+    select(args)
+        Builds a parameterized SELECT of the rows matching the request arguments.
+    resolution(args)
+        Picks the H3 resolution served to a request on a pyramid layer.
+    bbox(args)
+        Parses the bounding box of a request.
+    feature(args)
+        Builds the expression that serializes one selected row as a GeoJSON Feature.
+    index_statements()
+        Returns the statements that create the indexes the generated queries use.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        geometry_column: str = "shape",
+        key_column: str = "objectid",
+        filters: dict = None,
+        polygon: bool = False,
+        pyramid: bool = False,
+    ) -> None:
+        """Instantiates the Layer class.
+
+        Args:
+            name (str): Name of the layer, used in URLs.
+            table (str): Name of the table in the database.
+            geometry_column (str, optional): Name of the geometry column. Defaults to "shape".
+            key_column (str, optional): Name of the unique, ordered key column used for pagination. Defaults to "objectid".
+            filters (dict, optional): Attribute filters as {param: (column, operator, type)}. Defaults to None.
+            polygon (bool, optional): Whether the layer holds polygons that can be simplified by zoom. Defaults to False.
+            pyramid (bool, optional): Whether the table may hold an H3 pyramid, detected by detect_resolutions(). Defaults to False.
+        """
+        self.name = name
+        self.table = table
+        self.geometry_column = geometry_column
+        self.key_column = key_column
+        self.filters = filters or {}
+        self.polygon = polygon
+        self.pyramid = pyramid
+
+        # Coarsest & Finest Level of the Pyramid in the Table, None if it Holds No Pyramid
+        self.resolutions: Optional[Tuple[int, int]] = None
+
+    def select(self, args: MultiDict) -> Tuple[str, list, Optional[int]]:
+        """Builds a parameterized SELECT of the rows matching the request arguments.
+
+        Args:
+            args (MultiDict): Query string arguments of the request.
+
+        Raises:
+            ValueError: Raised if an argument is not valid.
+
+        Returns:
+            Tuple[str, list, Optional[int]]: SQL query, its parameters and the page size (None if not paged).
+        """
+        conditions = []
+        params = []
+
+        # Bounding Box, Transformed to Table SRID Once so the GiST Index can be Used
+        if "bbox" in args:
+            bbox = self.bbox(args)
+
+            conditions.append(
+                f"ST_Intersects(t.{self.geometry_column}, ST_Transform("
+                "ST_MakeEnvelope(%s, %s, %s, %s, 4326), "
+                f"(SELECT ST_SRID({self.geometry_column}) FROM {self.table} LIMIT 1)))"
+            )
+            params.extend(bbox)
+
+        # One Level of H3 Pyramid
+        if self.resolutions is not None:
+            conditions.append("t.res = %s")
+            params.append(self.resolution(args))
+
+        # Attribute Filters
+        for param, (column, operator, cast) in self.filters.items():
+            if param in args:
+                conditions.append(f"t.{column} {operator} %s")
+                params.append(self._parse(param, args[param], cast))
+
+        # Keyset Cursor
+        if "after" in args:
+            conditions.append(f"t.{self.key_column} > %s")
+            params.append(self._parse("after", args["after"], int))
+
+        # Build Query
+        q = f"SELECT t.* FROM {self.table} t"
+
+        if conditions:
+            q += " WHERE " + " AND ".join(conditions)
+
+        # Page Size, Ordered by Key so the Cursor is Stable
+        limit = None
+
+        if "limit" in args:
+            limit = self._parse("limit", args["limit"], int)
+
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError(f"Param 'limit' must be between 1 and {MAX_LIMIT}")
+
+            q += f" ORDER BY t.{self.key_column} LIMIT %s"
+            params.append(limit)
+
+        elif "after" in args:
+            q += f" ORDER BY t.{self.key_column}"
+
+        return q, params, limit
+
+    def resolution(self, args: MultiDict) -> int:
+        """Picks the H3 resolution served to a request on a pyramid layer.
+
+        An explicit 'res' is used as is. Otherwise 'zoom' picks the finest resolution whose cells are
+        still about CELL_PIXELS wide on screen, and 'bbox' the finest resolution that covers the box in
+        at most MAX_CELLS cells. Requests with neither get the finest resolution.
+
+        Args:
+            args (MultiDict): Query string arguments of the request.
+
+        Raises:
+            ValueError: Raised if an argument is not valid.
+
+        Returns:
+            int: H3 resolution.
+        """
+        coarsest, finest = self.resolutions
+
+        # Explicit Resolution
+        if "res" in args:
+            res = self._parse("res", args["res"], int)
+
+            if not coarsest <= res <= finest:
+                raise ValueError(f"Param 'res' must be between {coarsest} and {finest}")
+
+            return res
+
+        # Cells of About CELL_PIXELS at Zoom Level
+        if "zoom" in args:
+            zoom = self._parse("zoom", args["zoom"], int)
+
+            if not 0 <= zoom <= 22:
+                raise ValueError("Param 'zoom' must be between 0 and 22")
+
+            edge_km = CELL_PIXELS * PIXEL_METERS / 1000 / 2**zoom
+            res = math.floor(math.log(H3_EDGE_KM / edge_km, math.sqrt(7)))
+
+        # At Most MAX_CELLS in Bounding Box
+        elif "bbox" in args:
+            minx, miny, maxx, maxy = self.bbox(args)
+
+            latitude = math.radians((miny + maxy) / 2)
+            area_km2 = (
+                (maxx - minx) * math.cos(latitude) * (maxy - miny) * KM_PER_DEGREE**2
+            )
+            res = math.floor(math.log(H3_AREA_KM2 * MAX_CELLS / max(area_km2, 1e-9), 7))
+
+        else:
+            res = finest
+
+        return min(max(res, coarsest), finest)
+
+    def bbox(self, args: MultiDict) -> Optional[List[float]]:
+        """Parses the bounding box of a request.
+
+        Args:
+            args (MultiDict): Query string arguments of the request.
+
+        Raises:
+            ValueError: Raised if the bounding box is not valid.
+
+        Returns:
+            List[float]: 'minx,miny,maxx,maxy' in WGS84, or None if the request has no 'bbox'.
+        """
+        if "bbox" not in args:
+            return None
+
+        return self._parse_bbox(args["bbox"])
+
+    def feature(self, args: MultiDict) -> Tuple[str, list]:
+        """Builds the expression that serializes one selected row (aliased 'r') as a GeoJSON Feature.
+
+        Supports 'precision' (decimal digits of coordinates), 'properties' (comma separated whitelist)
+        and, for polygon layers, 'zoom' (simplifies geometries to one pixel at that zoom level).
+
+        Args:
+            args (MultiDict): Query string arguments of the request.
+
+        Raises:
+            ValueError: Raised if an argument is not valid.
+
+        Returns:
+            Tuple[str, list]: SQL expression and its parameters.
+        """
+        # Default Serialization of Whole Row
+        if not any(param in args for param in ["precision", "properties", "zoom"]):
+            return "ST_AsGeoJSON(r)", []
+
+        params = []
+
+        # Simplify Polygons to One Pixel, in Degrees or Meters Depending on Table SRID
+        geometry = f"r.{self.geometry_column}"
+
+        if self.polygon and "zoom" in args:
+            zoom = self._parse("zoom", args["zoom"], int)
+
+            if not 0 <= zoom <= 22:
+                raise ValueError("Param 'zoom' must be between 0 and 22")
+
+            geometry = (
+                f"ST_SimplifyPreserveTopology({geometry}, ("
+                "SELECT CASE WHEN srtext LIKE 'GEOGCS%%' THEN %s ELSE %s END "
+                "FROM spatial_ref_sys WHERE srid = "
+                f"(SELECT ST_SRID({self.geometry_column}) FROM {self.table} LIMIT 1)))"
+            )
+            params.extend([PIXEL_DEGREES / 2**zoom, PIXEL_METERS / 2**zoom])
+
+        # Coordinate Precision
+        precision = 9
+
+        if "precision" in args:
+            precision = self._parse("precision", args["precision"], int)
+
+            if not 0 <= precision <= 15:
+                raise ValueError("Param 'precision' must be between 0 and 15")
+
+        # Property Whitelist, Applied to Keys so Unknown Names are Simply Omitted
+        properties = f"to_jsonb(r) - '{self.geometry_column}'"
+
+        if "properties" in args:
+            properties = (
+                "(SELECT COALESCE(jsonb_object_agg(p.key, p.value), '{}'::jsonb) "
+                "FROM jsonb_each(to_jsonb(r)) p "
+                f"WHERE p.key = ANY(%s) AND p.key <> '{self.geometry_column}')"
+            )
+            params.append(
+                [name.strip().lower() for name in args["properties"].split(",")]
+            )
+
+        # Build Feature
+        expression = (
+            "json_build_object('type', 'Feature', "
+            f"'geometry', ST_AsGeoJSON({geometry}, {precision})::json, "
+            f"'properties', {properties})::text"
+        )
+
+        return expression, params
+
+    def index_statements(self) -> List[str]:
+        """Returns the statements that create the indexes the generated queries use.
+
+        Returns:
+            List[str]: CREATE INDEX statements for the geometry, key and filter columns.
+        """
+        # GiST Index for Bounding Box, B-tree Indexes for Cursor & Filters
+        statements = [
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.table}_{self.geometry_column}_gist "
+            f"ON {self.table} USING GIST ({self.geometry_column});"
+        ]
+
+        columns = [self.key_column] + [column for column, _, _ in self.filters.values()]
+
+        if self.resolutions is not None:
+            columns.append("res")
+
+        for column in dict.fromkeys(columns):
+            statements.append(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.table}_{column}_idx "
+                f"ON {self.table} ({column});"
+            )
+
+        return statements
+
+    @staticmethod
+    def _parse(param: str, value: str, cast: type):
+        """Converts a query string value to the given type.
+
+        Args:
+            param (str): Name of the param, used in the error message.
+            value (str): Raw value.
+            cast (type): Type the value will be converted to.
+
+        Raises:
+            ValueError: Raised if the value cannot be converted.
+
+        Returns:
+            Any: Converted value.
+        """
+        try:
+            return cast(value)
+
+        except ValueError:
+            raise ValueError(f"Param '{param}' must be of type {cast.__name__}")
+
+    @staticmethod
+    def _parse_bbox(value: str) -> List[float]:
+        """Parses a 'minx,miny,maxx,maxy' bounding box in WGS84.
+
+        Args:
+            value (str): Raw value.
+
+        Raises:
+            ValueError: Raised if the bounding box is not valid.
+
+        Returns:
+            List[float]: Bounding box coordinates.
+        """
+        try:
+            bbox = [float(v) for v in value.split(",")]
+
+        except ValueError:
+            bbox = []
+
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError("Param 'bbox' must be 'minx,miny,maxx,maxy' in WGS84")
+
+        return bbox
+
+
+# Filters Shared by the Point Accuracy Layers
+point_filters = {
+    "predicted_min": ("predicted", ">=", float),
+    "predicted_max": ("predicted", "<=", float),
+    "error_min": ("error", ">=", float),
+    "error_max": ("error", "<=", float),
+}
+
+# Filters Shared by the H3 Layers
+h3_filters = {
+    "predicted_min": ("mean_predicted", ">=", float),
+    "predicted_max": ("mean_predicted", "<=", float),
+}
+
+# Published Layers, Keyed by URL Name
+LAYERS = {
+    layer.name: layer
+    for layer in [
+        Layer(
+            "weather_point_accuracy",
+            "aggmthwx_62022_point_diff",
+            filters={**point_filters, "station": ("station", "=", str)},
+        ),
+        Layer(
+            "weather_h3",
+            "aggmthwx_62022_h3",
+            filters=h3_filters,
+            polygon=True,
+            pyramid=True,
+        ),
+        Layer(
+            "elevation_point_accuracy",
+            "elevation1km_pt_point_diff",
+            filters=point_filters,
+        ),
+        Layer(
+            "elevation_h3",
+            "elevation1km_pt_h3",
+            filters=h3_filters,
+            polygon=True,
+            pyramid=True,
+        ),
+    ]
+}
+
+
+def create_indexes(db, table: str) -> None:
+    """Creates the indexes used by the layer queries on a table, if they do not already exist.
+
+    Indexes are built concurrently, so readers and the pipeline are not blocked while they build.
+
+    Args:
+        db (Database): Database that holds the table.
+        table (str): Name of the table that was published.
+    """
+    statements = [
+        statement
+        for layer in LAYERS.values()
+        if layer.table == table
+        for statement in layer.index_statements()
+    ]
+
+    if not statements:
+        return
+
+    with db.checkout() as connection:
+        # CREATE INDEX CONCURRENTLY Cannot Run Inside a Transaction
+        connection.autocommit = True
+
+        try:
+            with connection.cursor() as c:
+                for statement in statements:
+                    c.execute(statement)
+
+        except psycopg2.Error as e:
+            # Message
+            print(f"Indexes could not be created on {table}: {e}")
+
+        finally:
+            connection.autocommit = False
+
+
+def detect_resolutions(db, table: str = None) -> None:
+    """Detects the levels of the H3 pyramid held by the tables of pyramid layers, from their 'res' column.
+
+    Layers whose table has no 'res' column, or cannot be read, are served without a level filter.
+
+    Args:
+        db (Database): Database that holds the tables.
+        table (str, optional): Name of a table that was published. Defaults to None (all pyramid layers).
+    """
+    layers = [
+        layer
+        for layer in LAYERS.values()
+        if layer.pyramid and (table is None or layer.table == table)
+    ]
+
+    if not layers:
+        return
+
+    try:
+        with db.checkout() as connection:
+            for layer in layers:
+                try:
+                    with connection.cursor() as c:
+                        # Only Tables with a 'res' Column Hold a Pyramid
+                        c.execute(
+                            "SELECT 1 FROM information_schema.columns "
+                            "WHERE table_schema = ANY(current_schemas(false)) "
+                            "AND table_name = %s AND column_name = 'res';",
+                            (layer.table,),
+                        )
+                        levels = (None, None)
+
+                        if c.fetchone() is not None:
+                            c.execute(f"SELECT MIN(res), MAX(res) FROM {layer.table};")
+                            levels = c.fetchone()
+
+                    connection.rollback()
+
+                except psycopg2.Error as e:
+                    connection.rollback()
+                    levels = (None, None)
+
+                    # Message
+                    print(f"Pyramid levels of {layer.table} could not be detected: {e}")
+
+                layer.resolutions = (
+                    (int(levels[0]), int(levels[1])) if levels[0] is not None else None
+                )
+
+    except psycopg2.Error as e:
+        # Message
+        print(f"Pyramid levels could not be detected: {e}")
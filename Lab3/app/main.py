@@ -6,16 +6,297 @@
 # 2023-04-06
 #
 
-from flask import Flask, request
+from flask import Flask, Response, abort, jsonify, request, stream_with_context
 from database import Database
+from versions import LayerVersions
+from tiles import TileCache, tile_query
+from layers import LAYERS, Layer, create_indexes, detect_resolutions
+from snapshots import SnapshotCache
+from compression import compress, compress_stream, negotiate
+from surfaces import SurfaceRegistry
+from features import FeatureStore
+from serializer import CollectionWriter, encode_collection, next_members
+import numpy as np
+import threading
 import os
 
-# Set up DB Connection
+# Set up DB Connection Pool
 db = Database.initialize_from_env()
+db.start_pool(
+    minconn=int(os.environ.get("DB_POOL_MIN", 1)),
+    maxconn=int(os.environ.get("DB_POOL_MAX", 8)),
+)
 
-# Set Vars for Formatting
-start_str = """{"type": "FeatureCollection", "features": """
-end_str = "}"
+# Track Published Layer Versions for Cache Invalidation
+versions = LayerVersions(db, interval=float(os.environ.get("VERSION_POLL_SECONDS", 5)))
+
+# Detect H3 Pyramid Levels of Each Table, Again Before Other Subscribers when it is Republished
+detect_resolutions(db)
+versions.subscribe(lambda table: detect_resolutions(db, table))
+
+# Set up Tile Cache, Invalidated when a Layer is Republished
+tile_cache = TileCache(
+    max_bytes=int(os.environ.get("TILE_CACHE_MB", 64)) * 1024 * 1024,
+    directory=os.environ.get("TILE_CACHE_DIR"),
+)
+versions.subscribe(tile_cache.invalidate)
+
+# Optionally (Re)build Query Indexes in the Background after a Layer is Published
+if os.environ.get("CREATE_INDEXES", "false").lower() == "true":
+    versions.subscribe(
+        lambda table: threading.Thread(
+            target=create_indexes, args=(db, table), daemon=True
+        ).start()
+    )
+
+# Set up Interpolated Surfaces for Point Predictions, Memory-Mapped from Pipeline Exports
+surfaces = SurfaceRegistry(os.environ.get("PREDICTION_DIR"))
+predict_max_points = int(os.environ.get("PREDICT_MAX_POINTS", 100000))
+
+# Optionally Serve Hot Layers from Memory, Reloaded when a Layer is Republished
+feature_store = None
+
+if os.environ.get("FEATURE_STORE", "false").lower() == "true":
+    store_layers = os.environ.get("FEATURE_STORE_LAYERS")
+    store_layers = store_layers.split(",") if store_layers else list(LAYERS)
+
+    feature_store = FeatureStore(
+        db,
+        [LAYERS[name.strip()] for name in store_layers],
+        max_features=int(os.environ.get("FEATURE_STORE_MAX_FEATURES", 200000)),
+    )
+    versions.subscribe(
+        lambda table: feature_store.reload(table, versions.version(table))
+    )
+
+    # Pick Up Changes as Soon as they are Announced, Not Only when Polled
+    versions.listen()
+
+    # Start Loading Layers at Startup, Rather than on the First Request
+    if os.environ.get("FEATURE_STORE_WARM", "true").lower() == "true":
+        for store_layer in feature_store.layers.values():
+            feature_store.get(store_layer)
+
+# Set Vars for Snapshots
+snapshots_enabled = os.environ.get("SNAPSHOTS", "true").lower() == "true"
+snapshot_warm = os.environ.get("SNAPSHOT_WARM", "false").lower() == "true"
+
+# Set Vars for Streaming Mode
+stream_default = os.environ.get("STREAM_GEOJSON", "false").lower() == "true"
+stream_fetch_size = int(os.environ.get("STREAM_FETCH_SIZE", 2000))
+
+
+def use_streaming() -> bool:
+    """Determines if the current request should be streamed, based on the 'stream' param or the default."""
+    stream = request.args.get("stream")
+
+    if stream is None:
+        return stream_default
+
+    return stream.lower() in ["true", "1", "yes"]
+
+
+def stream_geojson(
+    layer: Layer, feature: str, select: str, params: list, limit: int
+) -> Response:
+    """Streams a layer as a GeoJSON FeatureCollection, reading features in batches from a server-side cursor.
+
+    Args:
+        layer (Layer): Layer that will be streamed.
+        feature (str): Expression that serializes one row as a Feature.
+        select (str): Parameterized SELECT of the rows to stream.
+        params (list): Parameters of the feature expression and the SELECT.
+        limit (int): Page size, or None if the request is not paged.
+
+    Returns:
+        Response: Chunked response that yields the FeatureCollection piece by piece.
+    """
+    # Allow Fetch Size to be Tuned per Request
+    fetch_size = request.args.get("fetch_size", stream_fetch_size, type=int)
+    fetch_size = max(1, min(fetch_size, 50000))
+
+    # Query
+    q = f"SELECT {feature}, r.{layer.key_column} FROM ({select}) r;"
+
+    def generate():
+        # Hold Connection for Lifetime of Response
+        with db.checkout():
+            writer = CollectionWriter()
+            yield writer.start()
+
+            # Write Batches of Features, Comma Separated
+            last_key = None
+
+            for rows in db.stream(q, params, fetch_size=fetch_size):
+                yield writer.write([row[0] for row in rows])
+                last_key = rows[-1][1]
+
+            yield writer.end(next_members(limit, writer.count, last_key))
+
+    # Compress Chunks as they are Produced
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        stream_with_context(compress_stream(generate(), encoding)),
+        mimetype="application/geo+json",
+        headers=headers,
+    )
+
+
+def build_snapshot(table: str) -> bytes:
+    """Serializes the unfiltered rows of a layer as a GeoJSON FeatureCollection inside PostgreSQL.
+
+    Args:
+        table (str): Name of the table.
+
+    Returns:
+        bytes: UTF-8 encoded FeatureCollection.
+    """
+    # Same Rows as a Request Without Params, i.e. Finest Level of a Pyramid
+    layer = next(layer for layer in LAYERS.values() if layer.table == table)
+    select, params, _ = layer.select({})
+
+    # Query, Returning JSON Text so it is Not Parsed in Python
+    q = f"SELECT JSON_AGG(ST_AsGeoJSON(r)::json)::text FROM ({select}) r;"
+
+    with db.checkout():
+        features = db.query(q, params)[0][0]
+
+    return encode_collection(features)
+
+
+def on_layer_change(table: str) -> None:
+    """Drops the snapshot of a republished table and, if enabled, rebuilds it in the background.
+
+    Args:
+        table (str): Name of the table that changed.
+    """
+    snapshots.invalidate(table)
+
+    if snapshot_warm and table in [layer.table for layer in LAYERS.values()]:
+        threading.Thread(
+            target=snapshots.get, args=(table, versions.version(table)), daemon=True
+        ).start()
+
+
+def snapshot_response(layer: Layer) -> Response:
+    """Serves a whole layer from its snapshot, answering 304 if the client already holds it.
+
+    Args:
+        layer (Layer): Layer that will be served.
+
+    Returns:
+        Response: Snapshot response, or None if the layer is too large to snapshot.
+    """
+    snapshot = snapshots.get(layer.table, versions.version(layer.table))
+
+    if snapshot is None:
+        return None
+
+    # Pick Pre-Compressed Variant
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    headers = {
+        "ETag": snapshot.etag(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+
+    # Client Already Holds Current Snapshot
+    if snapshot.matches(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        snapshot.variants[encoding], mimetype="application/geo+json", headers=headers
+    )
+
+
+def store_response(layer: Layer) -> Response:
+    """Serves a bbox or resolution request from the in-memory feature store.
+
+    Args:
+        layer (Layer): Layer that will be served.
+
+    Returns:
+        Response: GeoJSON response, or None if the request or layer cannot be served from memory.
+    """
+    # Only Default Serialization, Without Paging or Attribute Filters
+    if feature_store is None or not set(request.args) <= {"bbox", "res"}:
+        return None
+
+    # Poll Versions so a Republished Layer Triggers a Reload
+    versions.version(layer.table)
+    index = feature_store.get(layer)
+
+    if index is None:
+        return None
+
+    # Query Tree of the Requested Level
+    res = layer.resolution(request.args) if layer.resolutions is not None else None
+    bbox = layer.bbox(request.args)
+
+    positions = index.bbox(bbox if bbox is not None else [-180, -90, 180, 90], res)
+
+    return geojson_response(index.collection(positions))
+
+
+def geojson_response(body: bytes) -> Response:
+    """Returns a GeoJSON body, compressed if the client accepts it."""
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        compress(body, encoding), mimetype="application/geo+json", headers=headers
+    )
+
+
+def find_surface(name: str):
+    """Looks up a surface by name, defaulting to the only one if there is exactly one.
+
+    Args:
+        name (str): Name of the surface, or None.
+
+    Returns:
+        Surface: The surface, after aborting with 400/404 if it cannot be determined.
+    """
+    if name is None:
+        names = surfaces.names()
+
+        if len(names) != 1:
+            abort(400, description=f"Param 'surface' must be in {names}")
+
+        name = names[0]
+
+    surface = surfaces.get(name)
+
+    if surface is None:
+        abort(404, description=f"Surface '{name}' does not exist")
+
+    return surface
+
+
+def prediction_values(values: np.ndarray) -> list:
+    """Converts predicted values to a JSON-ready list, with null where there is no prediction."""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+
+    return result.tolist()
+
+
+# Set up Snapshot Cache, Rebuilt on First Request after a Layer is Republished
+snapshots = SnapshotCache(
+    build_snapshot, max_bytes=int(os.environ.get("SNAPSHOT_MAX_MB", 256)) * 1024 * 1024
+)
+versions.subscribe(on_layer_change)
 
 # Set Up Flask App
 app = Flask(__name__)
@@ -26,76 +307,211 @@ def home():
     return "GIS 5572 - Lab 3 - Luke Zaruba"
 
 
-@app.route("/weather_point_accuracy")
-def weather_point():
-    # Make Connection
-    db.connect()
+def feature_collection(layer_name):
+    # Look Up Layer
+    layer = LAYERS[layer_name]
 
-    # Query
-    q = "SELECT JSON_AGG(ST_AsGeoJSON(aggmthwx_62022_point_diff)) FROM aggmthwx_62022_point_diff;"
+    # Build Query from Request Params
+    try:
+        select, select_params, limit = layer.select(request.args)
+        feature, feature_params = layer.feature(request.args)
 
-    # Formatting
-    q_out = str(db.query(q)[0][0]).replace("'", "")
+    except ValueError as e:
+        abort(400, description=str(e))
 
-    # Close Connection
-    db.close()
+    # Serve Unfiltered Requests from Snapshot
+    if snapshots_enabled and not request.args:
+        response = snapshot_response(layer)
 
-    # Return GeoJSON Result
-    return start_str + q_out + end_str
+        if response is not None:
+            return response
 
+    # Serve Bounding Box Requests from Memory
+    response = store_response(layer)
 
-@app.route("/weather_h3")
-def weather_h3():
-    # Make Connection
-    db.connect()
+    if response is not None:
+        return response
 
-    # Query
-    q = "SELECT JSON_AGG(ST_AsGeoJSON(aggmthwx_62022_h3)) FROM aggmthwx_62022_h3;"
+    # Feature Expression Comes First in the Query
+    params = feature_params + select_params
 
-    # Formatting
-    q_out = str(db.query(q)[0][0]).replace("'", "")
+    # Stream Features if Requested
+    if use_streaming():
+        return stream_geojson(layer, feature, select, params, limit)
 
-    # Close Connection
-    db.close()
+    # Query, Returning JSON Text so it is Not Parsed in Python
+    q = (
+        f"SELECT JSON_AGG(({feature})::json)::text, MAX(r.{layer.key_column}), COUNT(*) "
+        f"FROM ({select}) r;"
+    )
 
-    # Return GeoJSON Result
-    return start_str + q_out + end_str
+    with db.checkout():
+        features, last_key, count = db.query(q, params)[0]
 
+    # Formatting, Features are Already JSON Text
+    body = encode_collection(features, next_members(limit, count, last_key))
 
-@app.route("/elevation_point_accuracy")
-def elevation_point():
-    # Make Connection
-    db.connect()
+    # Return GeoJSON Result, Compressed if Client Accepts it
+    return geojson_response(body)
 
-    # Query
-    q = "SELECT JSON_AGG(ST_AsGeoJSON(elevation1km_pt_point_diff)) FROM elevation1km_pt_point_diff;"
 
-    # Formatting
-    q_out = str(db.query(q)[0][0]).replace("'", "")
+# Register One Route per Published Layer
+for name in LAYERS:
+    app.add_url_rule(
+        f"/{name}",
+        endpoint=name,
+        view_func=feature_collection,
+        defaults={"layer_name": name},
+    )
 
-    # Close Connection
-    db.close()
 
-    # Return GeoJSON Result
-    return start_str + q_out + end_str
+@app.route("/tiles/<layer>/<int:z>/<int:x>/<int:y>.pbf")
+def tile(layer, z, x, y):
+    # Validate Layer & Tile Coordinates
+    if layer not in LAYERS or not 0 <= z <= 22:
+        abort(404)
 
+    if not (0 <= x < 2**z and 0 <= y < 2**z):
+        abort(404)
 
-@app.route("/elevation_h3")
-def elevation_h3():
-    # Make Connection
-    db.connect()
+    # Check Cache for Current Version of Table
+    table = LAYERS[layer].table
+    key = (table, versions.version(table), z, x, y)
+    mvt = tile_cache.get(key)
 
-    # Query
-    q = "SELECT JSON_AGG(ST_AsGeoJSON(elevation1km_pt_h3)) FROM elevation1km_pt_h3;"
+    # Pick Level of H3 Pyramid from Zoom
+    res = None
+
+    if LAYERS[layer].resolutions is not None:
+        res = LAYERS[layer].resolution({"zoom": z})
+
+    # Build Tile in PostGIS if Not Cached
+    if mvt is None:
+        with db.checkout() as connection:
+            with connection.cursor() as c:
+                c.execute(
+                    tile_query(table, LAYERS[layer].geometry_column, res=res),
+                    (z, x, y, layer),
+                )
+                mvt = c.fetchone()[0]
+            connection.rollback()
+
+        mvt = bytes(mvt) if mvt is not None else b""
+        tile_cache.put(key, mvt)
+
+    # Return Vector Tile
+    return Response(mvt, mimetype="application/vnd.mapbox-vector-tile")
+
+
+@app.route("/predict", methods=["GET"])
+def predict():
+    # Parse Point
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+
+    if lat is None or lon is None:
+        abort(400, description="Params 'lat' and 'lon' must be numbers")
+
+    surface = find_surface(request.args.get("surface"))
+
+    # Sample Surface without a Database Round Trip
+    value = prediction_values(surface.sample([lon], [lat]))[0]
+
+    return jsonify(
+        {
+            "surface": surface.name,
+            "value_of_interest": surface.meta["value_of_interest"],
+            "lat": lat,
+            "lon": lon,
+            "value": value,
+        }
+    )
+
+
+@app.route("/predict", methods=["POST"])
+def predict_batch():
+    # Parse Points, as Separate Coordinate Arrays or [lon, lat] Pairs
+    body = request.get_json(silent=True) or {}
+
+    try:
+        if "points" in body:
+            points = np.asarray(body["points"], dtype=np.float64).reshape(-1, 2)
+            lon, lat = points[:, 0], points[:, 1]
+        else:
+            lon = np.asarray(body["lon"], dtype=np.float64).ravel()
+            lat = np.asarray(body["lat"], dtype=np.float64).ravel()
+
+    except (KeyError, TypeError, ValueError):
+        abort(
+            400,
+            description="Body must hold 'points' as [lon, lat] pairs, or 'lat' and 'lon' arrays",
+        )
+
+    if len(lon) != len(lat):
+        abort(400, description="Arrays 'lat' and 'lon' must have the same length")
+
+    if len(lon) > predict_max_points:
+        abort(400, description=f"At most {predict_max_points} points per request")
+
+    surface = find_surface(body.get("surface"))
+
+    # Sample All Points in One Vectorized Lookup
+    values = prediction_values(surface.sample(lon, lat))
+
+    return jsonify(
+        {
+            "surface": surface.name,
+            "value_of_interest": surface.meta["value_of_interest"],
+            "values": values,
+        }
+    )
+
+
+@app.route("/contains/<layer>")
+def contains(layer):
+    # Validate Layer & Point
+    if layer not in LAYERS:
+        abort(404)
+
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+
+    if lat is None or lon is None:
+        abort(400, description="Params 'lat' and 'lon' must be numbers")
+
+    layer = LAYERS[layer]
+
+    try:
+        res = layer.resolution(request.args) if layer.resolutions is not None else None
+
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    # Look Up Containing Features in Memory, e.g. the H3 Cell of a Location
+    versions.version(layer.table)
+    index = feature_store.get(layer) if feature_store is not None else None
+
+    if index is not None:
+        return geojson_response(index.collection(index.point(lon, lat, res)))
 
-    # Formatting
-    q_out = str(db.query(q)[0][0]).replace("'", "")
+    # Otherwise Ask PostGIS
+    point = (
+        "ST_Transform(ST_SetSRID(ST_MakePoint(%s, %s), 4326), "
+        f"(SELECT ST_SRID({layer.geometry_column}) FROM {layer.table} LIMIT 1))"
+    )
+    q = (
+        f"SELECT JSON_AGG(ST_AsGeoJSON(r)::json ORDER BY r.{layer.key_column})::text "
+        f"FROM (SELECT t.* FROM {layer.table} t "
+        f"WHERE ST_Intersects(t.{layer.geometry_column}, {point})"
+        + (" AND t.res = %s" if res is not None else "")
+        + ") r;"
+    )
+    params = [lon, lat] + ([res] if res is not None else [])
 
-    # Close Connection
-    db.close()
+    with db.checkout():
+        features = db.query(q, params)[0][0]
 
-    # Return GeoJSON Result
-    return start_str + q_out + end_str
+    return geojson_response(encode_collection(features))
 
 
 if __name__ == "__main__":
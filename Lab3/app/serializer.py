@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+#
+# GeoJSON Serialization for Flask & ASGI APIs
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import json
+
+# For Type Annotations
+from typing import Iterable, Iterator, Union
+
+# orjson is Optional, Encodes Features Several Times Faster than the Standard Library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Opening & Closing of Every FeatureCollection
+COLLECTION_START = b'{"type": "FeatureCollection", "features": '
+COLLECTION_END = b"}"
+
+
+def dumps(obj) -> bytes:
+    """Encodes an object as compact UTF-8 JSON, with orjson if installed.
+
+    Args:
+        obj (Any): Object that will be encoded, may hold numpy scalars and arrays.
+
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    return json.dumps(
+        obj, separators=(",", ":"), ensure_ascii=False, default=_default
+    ).encode("utf-8")
+
+
+def encode_features(features: Iterable) -> bytes:
+    """Encodes features as the comma separated members of a JSON array, without brackets.
+
+    Features serialized by PostgreSQL (str or bytes) are copied as they are, so they are never parsed
+    in Python. Dicts are encoded, in one call if the whole batch is dicts.
+
+    Args:
+        features (Iterable): Features as JSON text (str or bytes) or dicts.
+
+    Returns:
+        bytes: Comma separated features.
+    """
+    features = features if isinstance(features, list) else list(features)
+
+    if not features:
+        return b""
+
+    # Whole Batch of Dicts in One Call
+    if all(isinstance(f, dict) for f in features):
+        return dumps(features)[1:-1]
+
+    return b",".join(_encode_feature(f) for f in features)
+
+
+def encode_collection(features=None, members: dict = None) -> bytes:
+    """Builds a FeatureCollection in one piece.
+
+    Args:
+        features (Any, optional): JSON array of features as str or bytes, e.g. from JSON_AGG, or a
+            sequence of features as accepted by encode_features(). Defaults to None, an empty collection.
+        members (dict, optional): Additional top-level members, e.g. the 'next' cursor. Defaults to None.
+
+    Returns:
+        bytes: UTF-8 encoded FeatureCollection.
+    """
+    # JSON Array Built by PostgreSQL, Used as Is
+    if isinstance(features, str):
+        array = features.encode("utf-8")
+    elif isinstance(features, (bytes, bytearray, memoryview)):
+        array = bytes(features)
+    else:
+        array = b"[" + encode_features(features or []) + b"]"
+
+    return COLLECTION_START + array + encode_members(members) + COLLECTION_END
+
+
+def encode_members(members: dict = None) -> bytes:
+    """Encodes additional top-level members, each preceded by a comma.
+
+    Args:
+        members (dict, optional): Members as {name: value}. Defaults to None.
+
+    Returns:
+        bytes: Encoded members, or an empty string if there are none.
+    """
+    if not members:
+        return b""
+
+    return b"".join(
+        b", " + dumps(name) + b": " + dumps(value) for name, value in members.items()
+    )
+
+
+def next_members(limit: int, count: int, last_key) -> dict:
+    """Builds the 'next' cursor member of a paged FeatureCollection.
+
+    Args:
+        limit (int): Page size, or None if the request is not paged.
+        count (int): Number of features returned.
+        last_key (Any): Key of the last feature returned.
+
+    Returns:
+        dict: The 'next' member, or an empty dict if there are no more pages.
+    """
+    if limit is None or count < limit:
+        return {}
+
+    return {"next": last_key}
+
+
+class CollectionWriter:
+    """
+    A class used to write a FeatureCollection incrementally, one batch of features at a time, so a
+    large collection is streamed or written to disk without being held in memory.
+
+    Methods
+    -------
+    start()
+        Returns the opening of the collection.
+    write(features)
+        Encodes a batch of features.
+    end(members)
+        Returns the closing of the collection.
+    dump(batches, file, members)
+        Writes a whole collection to a binary file.
+    chunks(batches, members)
+        Yields a whole collection piece by piece.
+
+    Example
+    -------
+    > writer = CollectionWriter()
+    > body = writer.start() + writer.write(['{"type": "Feature", ...}']) + writer.end()
+    """
+
+    def __init__(self) -> None:
+        """Instantiates the CollectionWriter class."""
+        self.count = 0
+
+    def start(self) -> bytes:
+        """Returns the opening of the collection, up to the features array.
+
+        Returns:
+            bytes: Opening of the collection.
+        """
+        self.count = 0
+
+        return COLLECTION_START + b"["
+
+    def write(self, features: Iterable) -> bytes:
+        """Encodes a batch of features, comma separated from earlier batches.
+
+        Args:
+            features (Iterable): Features as accepted by encode_features().
+
+        Returns:
+            bytes: Encoded batch, or an empty string if the batch is empty.
+        """
+        features = features if isinstance(features, list) else list(features)
+        body = encode_features(features)
+
+        if not body:
+            return b""
+
+        sep = b"," if self.count else b""
+        self.count += len(features)
+
+        return sep + body
+
+    def end(self, members: dict = None) -> bytes:
+        """Returns the closing of the collection.
+
+        Args:
+            members (dict, optional): Additional top-level members, e.g. the 'next' cursor. Defaults to None.
+
+        Returns:
+            bytes: Closing of the collection.
+        """
+        return b"]" + encode_members(members) + COLLECTION_END
+
+    def chunks(self, batches: Iterable, members: dict = None) -> Iterator[bytes]:
+        """Yields a whole collection piece by piece.
+
+        Args:
+            batches (Iterable): Batches of features as accepted by encode_features().
+            members (dict, optional): Additional top-level members. Defaults to None.
+
+        Yields:
+            bytes: Pieces of the collection, one per non-empty batch.
+        """
+        yield self.start()
+
+        for batch in batches:
+            body = self.write(batch)
+
+            if body:
+                yield body
+
+        yield self.end(members)
+
+    def dump(self, batches: Iterable, file, members: dict = None) -> int:
+        """Writes a whole collection to a binary file, batch by batch.
+
+        Args:
+            batches (Iterable): Batches of features as accepted by encode_features().
+            file (BinaryIO): File opened for binary writing.
+            members (dict, optional): Additional top-level members. Defaults to None.
+
+        Returns:
+            int: Number of features written.
+        """
+        for chunk in self.chunks(batches, members):
+            file.write(chunk)
+
+        return self.count
+
+
+def _encode_feature(feature: Union[str, bytes, dict]) -> bytes:
+    """Encodes one feature, copying JSON text as it is."""
+    if isinstance(feature, str):
+        return feature.encode("utf-8")
+
+    if isinstance(feature, (bytes, bytearray, memoryview)):
+        return bytes(feature)
+
+    return dumps(feature)
+
+
+def _default(obj):
+    """Converts numpy values for the standard library encoder, like orjson.OPT_SERIALIZE_NUMPY."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
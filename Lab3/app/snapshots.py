@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# FeatureCollection Snapshots for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import threading
+import hashlib
+
+from compression import ENCODINGS, compress
+
+# For Type Annotations
+from typing import Callable, Optional
+
+
+class Snapshot:
+    """
+    A class used to represent a serialized FeatureCollection with its pre-compressed variants.
+
+    Methods
+    -------
+    etag(encoding)
+        Returns the strong ETag of a variant.
+    matches(if_none_match)
+        Checks if an If-None-Match header matches any variant of the snapshot.
+    """
+
+    def __init__(self, body: bytes, version: int) -> None:
+        """Instantiates the Snapshot class, compressing the body once with every supported coding.
+
+        Args:
+            body (bytes): Serialized FeatureCollection.
+            version (int): Version of the table the snapshot was built from.
+        """
+        self.version = version
+        self.digest = hashlib.sha256(body).hexdigest()
+
+        # Compress at Highest Levels, since Each Variant is Only Built Once per Publish
+        self.variants = {"identity": body}
+
+        for encoding in ENCODINGS:
+            self.variants[encoding] = compress(body, encoding, 9)
+
+    def etag(self, encoding: str) -> str:
+        """Returns the strong ETag of a variant. Each coding gets its own tag, as it is a different representation.
+
+        Args:
+            encoding (str): Content coding of the variant.
+
+        Returns:
+            str: Quoted ETag.
+        """
+        if encoding == "identity":
+            return f'"{self.digest}"'
+
+        return f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """Checks if an If-None-Match header matches any variant of the snapshot.
+
+        Args:
+            if_none_match (str): Value of the If-None-Match header, or None.
+
+        Returns:
+            bool: True if the client already holds the snapshot.
+        """
+        if not if_none_match:
+            return False
+
+        if if_none_match.strip() == "*":
+            return True
+
+        # Compare Opaque Tags, Ignoring Weak Prefix
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+        return any(self.etag(encoding) in tags for encoding in self.variants)
+
+
+class SnapshotCache:
+    """
+    A class used to hold one Snapshot per table, rebuilt on the first request after the table changes.
+
+    Methods
+    -------
+    get(table, version)
+        Returns the snapshot of a table at a version, building it if needed.
+    invalidate(table)
+        Drops the snapshot of a table.
+    """
+
+    def __init__(
+        self, build: Callable[[str], bytes], max_bytes: int = 256 * 1024 * 1024
+    ) -> None:
+        """Instantiates the SnapshotCache class.
+
+        Args:
+            build (Callable[[str], bytes]): Function that serializes a whole table as a FeatureCollection.
+            max_bytes (int, optional): Largest body that will be kept, larger tables are not snapshotted. Defaults to 256 MB.
+        """
+        self.build = build
+        self.max_bytes = max_bytes
+
+        self._snapshots = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str, version: int) -> Optional[Snapshot]:
+        """Returns the snapshot of a table at a version, building it if needed. Concurrent
+        requests for the same table wait for a single build.
+
+        Args:
+            table (str): Name of the table.
+            version (int): Current version of the table.
+
+        Returns:
+            Optional[Snapshot]: The snapshot, or None if the table is too large to snapshot.
+        """
+        snapshot = self._snapshots.get(table)
+
+        if snapshot is not None and snapshot.version == version:
+            return snapshot.value
+
+        # One Build per Table at a Time
+        with self._lock:
+            lock = self._locks.setdefault(table, threading.Lock())
+
+        with lock:
+            # Another Thread May Have Built it While Waiting
+            snapshot = self._snapshots.get(table)
+
+            if snapshot is not None and snapshot.version == version:
+                return snapshot.value
+
+            # Serialize Table, Remembering Tables that are Too Large
+            body = self.build(table)
+            value = Snapshot(body, version) if len(body) <= self.max_bytes else None
+
+            self._snapshots[table] = _Entry(version, value)
+
+            return value
+
+    def invalidate(self, table: str) -> None:
+        """Drops the snapshot of a table.
+
+        Args:
+            table (str): Name of the table.
+        """
+        self._snapshots.pop(table, None)
+
+
+class _Entry:
+    """A cached snapshot, or None for a table that was too large, at a table version."""
+
+    def __init__(self, version: int, value: Optional[Snapshot]) -> None:
+        self.version = version
+        self.value = value
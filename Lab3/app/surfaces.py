@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+# Interpolated Surfaces for Point Predictions
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import json
+import threading
+import numpy as np
+
+# pyproj is Only Needed for Surfaces that are Not in WGS84
+try:
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
+# For Type Annotations
+from typing import List
+from numpy import ndarray
+
+# Suffix of the Kriging Variance Grid Exported Next to a Surface
+VARIANCE_SUFFIX = "_variance"
+
+
+class Surface:
+    """
+    A class used to sample an interpolated surface written by Pipeline.export_surface().
+
+    The grid is memory-mapped, so only the pages around sampled points are read, and values are
+    interpolated bilinearly between the four nearest cell centres in one vectorized operation.
+
+    Methods
+    -------
+    sample(lon, lat)
+        Interpolates the surface at WGS84 coordinates.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Instantiates the Surface class from the JSON sidecar of a surface.
+
+        Args:
+            path (str): Path to the JSON sidecar, next to the .npy grid of the same name.
+
+        Raises:
+            ImportError: Raised if the surface is projected and pyproj is not installed.
+        """
+        with open(path) as f:
+            self.meta = json.load(f)
+
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.grid = np.load(os.path.splitext(path)[0] + ".npy", mmap_mode="r")
+
+        # Transform from WGS84 to Surface CRS, Built Once
+        self.transformer = None
+
+        if self.meta["crs"] != 4326:
+            if Transformer is None:
+                raise ImportError(f"Surface '{self.name}' requires pyproj")
+
+            self.transformer = Transformer.from_crs(
+                4326, self.meta["crs"], always_xy=True
+            )
+
+    def sample(self, lon: ndarray, lat: ndarray) -> ndarray:
+        """Interpolates the surface bilinearly at WGS84 coordinates.
+
+        Args:
+            lon (ndarray): Longitudes.
+            lat (ndarray): Latitudes.
+
+        Returns:
+            ndarray: Values, NaN outside the grid or next to cells without a prediction.
+        """
+        x, y = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
+        if self.transformer is not None:
+            x, y = self.transformer.transform(x, y)
+
+        nrows, ncols = self.grid.shape
+        cell_size = self.meta["cell_size"]
+
+        # Fractional Position Relative to Cell Centres
+        col = (x - self.meta["xmin"]) / cell_size - 0.5
+        row = (self.meta["ymax"] - y) / cell_size - 0.5
+
+        # Points Half a Cell Past the Outer Centres Take the Edge Values
+        inside = (
+            (col >= -0.5) & (col <= ncols - 0.5) & (row >= -0.5) & (row <= nrows - 0.5)
+        )
+        col = np.clip(np.nan_to_num(col), 0, ncols - 1)
+        row = np.clip(np.nan_to_num(row), 0, nrows - 1)
+
+        # Four Surrounding Cells & Weights
+        c0 = np.minimum(np.floor(col).astype(np.intp), max(ncols - 2, 0))
+        r0 = np.minimum(np.floor(row).astype(np.intp), max(nrows - 2, 0))
+        c1 = np.minimum(c0 + 1, ncols - 1)
+        r1 = np.minimum(r0 + 1, nrows - 1)
+
+        dc = col - c0
+        dr = row - r0
+
+        top = self.grid[r0, c0] * (1 - dc) + self.grid[r0, c1] * dc
+        bottom = self.grid[r1, c0] * (1 - dc) + self.grid[r1, c1] * dc
+        values = top * (1 - dr) + bottom * dr
+
+        return np.where(inside, values, np.nan)
+
+
+class SurfaceRegistry:
+    """
+    A class used to hold the surfaces in a directory, reloading any that the pipeline rewrites.
+
+    Methods
+    -------
+    names()
+        Lists the available surfaces, without the variance sidecars of kriged surfaces.
+    get(name)
+        Returns a surface, reloading it if its sidecar changed.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Instantiates the SurfaceRegistry class.
+
+        Args:
+            directory (str): Directory that holds .npy grids and their .json sidecars.
+        """
+        self.directory = directory
+        self._surfaces = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        """Lists the available surfaces.
+
+        The '<name>_variance' grid written next to a kriged surface is left out, so a single export
+        still counts as one surface, but it can be requested by name through get().
+
+        Returns:
+            List[str]: Names of the surfaces.
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+
+        names = {
+            os.path.splitext(f)[0]
+            for f in os.listdir(self.directory)
+            if f.endswith(".json")
+        }
+
+        return sorted(
+            n
+            for n in names
+            if not (n.endswith(VARIANCE_SUFFIX) and n[: -len(VARIANCE_SUFFIX)] in names)
+        )
+
+    def get(self, name: str) -> Surface:
+        """Returns a surface, reloading it if its sidecar was rewritten since it was loaded.
+
+        Only the sidecar of the requested surface is checked, so a lookup never lists the directory.
+
+        Args:
+            name (str): Name of the surface.
+
+        Returns:
+            Surface: The surface, or None if it does not exist.
+        """
+        # Names are File Names, Never Paths Out of the Directory
+        if not self.directory or not name or name != os.path.basename(name):
+            return None
+
+        path = os.path.join(self.directory, f"{name}.json")
+
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._surfaces.get(name)
+
+            # Sidecar is Written Last, so a New mtime Means a Complete New Surface
+            if entry is None or entry[0] != mtime:
+                entry = (mtime, Surface(path))
+                self._surfaces[name] = entry
+
+        return entry[1]
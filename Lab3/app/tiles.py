@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Vector Tiles for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import threading
+import shutil
+import os
+
+from collections import OrderedDict
+
+# For Type Annotations
+from typing import Optional, Tuple
+from os import PathLike
+
+
+class TileCache:
+    """
+    A class used to represent a bounded LRU cache of vector tiles, with an optional on-disk tier.
+
+    Keys are (layer, version, z, x, y) tuples, so a tile built before a table was republished is never
+    served afterwards, and invalidate(layer) frees the space held by the old version.
+
+    Methods
+    -------
+    get(key)
+        Returns a cached tile, checking memory first and then disk.
+    put(key, tile)
+        Adds a tile to the cache, evicting the least recently used tiles if needed.
+    invalidate(layer)
+        Removes all tiles of a layer from memory and disk.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, directory: PathLike = None
+    ) -> None:
+        """Instantiates the TileCache class.
+
+        Args:
+            max_bytes (int, optional): Maximum total size of the tiles held in memory. Defaults to 64 MB.
+            directory (PathLike, optional): Directory for the on-disk tier. Defaults to None (memory only).
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+
+        self._tiles = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        """Returns a cached tile, checking memory first and then disk.
+
+        Args:
+            key (Tuple): Tile key as (layer, version, z, x, y).
+
+        Returns:
+            Optional[bytes]: The tile, or None if it is not cached.
+        """
+        # Check Memory
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        # Check Disk, Promoting Hits to Memory
+        if self.directory is not None:
+            path = self._path(key)
+
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    tile = f.read()
+
+                self._remember(key, tile)
+                return tile
+
+        return None
+
+    def put(self, key: Tuple, tile: bytes) -> None:
+        """Adds a tile to the cache, evicting the least recently used tiles if needed.
+
+        Args:
+            key (Tuple): Tile key as (layer, version, z, x, y).
+            tile (bytes): Encoded vector tile.
+        """
+        self._remember(key, tile)
+
+        # Write Through to Disk, Atomically so Readers Never See Partial Tiles
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+            with open(tmp_path, "wb") as f:
+                f.write(tile)
+
+            os.replace(tmp_path, path)
+
+    def invalidate(self, layer: str) -> None:
+        """Removes all tiles of a layer from memory and disk.
+
+        Args:
+            layer (str): Name of the layer.
+        """
+        with self._lock:
+            for key in [k for k in self._tiles if k[0] == layer]:
+                self._size -= len(self._tiles.pop(key))
+
+        if self.directory is not None:
+            shutil.rmtree(os.path.join(self.directory, layer), ignore_errors=True)
+
+    def _remember(self, key: Tuple, tile: bytes) -> None:
+        """Stores a tile in memory and evicts least recently used tiles above max_bytes.
+
+        Args:
+            key (Tuple): Tile key as (layer, version, z, x, y).
+            tile (bytes): Encoded vector tile.
+        """
+        # Skip Tiles that Could Never Fit
+        if len(tile) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._tiles:
+                self._size -= len(self._tiles.pop(key))
+
+            self._tiles[key] = tile
+            self._size += len(tile)
+
+            while self._size > self.max_bytes:
+                self._size -= len(self._tiles.popitem(last=False)[1])
+
+    def _path(self, key: Tuple) -> str:
+        """Builds the on-disk path of a tile.
+
+        Args:
+            key (Tuple): Tile key as (layer, version, z, x, y).
+
+        Returns:
+            str: Path to the tile file.
+        """
+        layer, version, z, x, y = key
+        return os.path.join(
+            self.directory, layer, str(version), str(z), str(x), f"{y}.pbf"
+        )
+
+
+def tile_query(
+    table: str,
+    geometry_column: str = "shape",
+    extent: int = 4096,
+    buffer: int = 64,
+    res: int = None,
+) -> str:
+    """Builds the query that encodes one Mapbox Vector Tile of a table with ST_AsMVT.
+
+    The query takes (z, x, y, layer_name) as parameters. Features are clipped to the tile envelope
+    in Web Mercator, and every non-geometry column is encoded as a feature attribute.
+
+    Args:
+        table (str): Name of the table that will be tiled.
+        geometry_column (str, optional): Name of the geometry column. Defaults to "shape".
+        extent (int, optional): Tile extent in tile coordinate space. Defaults to 4096.
+        buffer (int, optional): Buffer around the tile in tile coordinate space. Defaults to 64.
+        res (int, optional): Level of an H3 pyramid table that will be tiled. Defaults to None (all rows).
+
+    Returns:
+        str: SQL query.
+    """
+    # One Level of H3 Pyramid
+    level = "" if res is None else f"AND t.res = {int(res)}"
+
+    # Envelope is Transformed to the Table SRID Once, so the Spatial Index can be Used
+    return f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%s, %s, %s) AS geom
+        ),
+        mvtgeom AS (
+            SELECT
+                ST_AsMVTGeom(ST_Transform(t.{geometry_column}, 3857), bounds.geom, {extent}, {buffer}, true) AS geom,
+                to_jsonb(t) - '{geometry_column}' AS properties
+            FROM {table} t, bounds
+            WHERE t.{geometry_column} && ST_Transform(
+                bounds.geom, (SELECT ST_SRID({geometry_column}) FROM {table} LIMIT 1)
+            ) {level}
+        )
+        SELECT ST_AsMVT(mvtgeom, %s, {extent}, 'geom') FROM mvtgeom;
+    """
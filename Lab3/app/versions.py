@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Layer Version Tracking for Flask API
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import psycopg2
+import select
+import threading
+import time
+
+# For Type Annotations
+from typing import Callable
+from database import Database
+
+
+class LayerVersions:
+    """
+    A class used to track the published version of each layer, so that caches can be invalidated
+    when the pipeline rewrites a table.
+
+    Versions are read from the 'layer_versions' table, which Pipeline.export_to_sde bumps after every
+    export. The table is polled at most once per interval, so a cache lookup costs no database round trip.
+    With listen(), changes announced on the 'layer_changed' channel are picked up as soon as they happen.
+
+    Methods
+    -------
+    version(table)
+        Returns the current version of a table.
+    subscribe(callback)
+        Registers a function that is called with the table name whenever a table changes.
+    refresh()
+        Re-reads all versions from the database and notifies subscribers of changes.
+    listen(timeout)
+        Refreshes versions whenever the pipeline announces a change, from a background thread.
+    """
+
+    def __init__(self, db: Database, interval: float = 5.0) -> None:
+        """Instantiates the LayerVersions class.
+
+        Args:
+            db (Database): Database that holds the 'layer_versions' table.
+            interval (float, optional): Minimum seconds between polls of the database. Defaults to 5.0.
+        """
+        self.db = db
+        self.interval = interval
+
+        self._versions = {}
+        self._seeded = False
+        self._subscribers = []
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    def version(self, table: str) -> int:
+        """Returns the current version of a table, polling the database if the last poll is stale.
+
+        Args:
+            table (str): Name of the table.
+
+        Returns:
+            int: Version of the table, or 0 if it has never been published through the pipeline.
+        """
+        if time.monotonic() - self._checked > self.interval:
+            self.refresh()
+
+        return self._versions.get(table, 0)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """Registers a function that is called with the table name whenever a table changes.
+
+        Args:
+            callback (Callable[[str], None]): Function that will be called.
+        """
+        self._subscribers.append(callback)
+
+    def refresh(self) -> None:
+        """Re-reads all versions from the database and notifies subscribers of changes.
+
+        Errors raised by a subscriber are printed, so the other subscribers are still notified and the
+        caller, e.g. a request thread or the listen() thread, is never interrupted.
+        """
+        # Only One Thread Polls at a Time
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            self._checked = time.monotonic()
+
+            # Query Versions
+            with self.db.checkout() as connection:
+                try:
+                    with connection.cursor() as c:
+                        c.execute("SELECT layer_name, version FROM layer_versions;")
+                        versions = dict(c.fetchall())
+                    connection.rollback()
+
+                # Table Does Not Exist Until First Publish, Which Must then be Notified
+                except psycopg2.Error as e:
+                    connection.rollback()
+
+                    if getattr(e, "pgcode", None) == "42P01":
+                        self._seeded = True
+                    return
+
+            # Notify Subscribers of Changed Tables, Not of Versions Seen on First Poll
+            changed = [t for t, v in versions.items() if self._versions.get(t) != v]
+            self._versions = versions
+
+            if not self._seeded:
+                self._seeded = True
+                return
+
+            # A Failing Subscriber Must Not Keep the Others Stale
+            for table in changed:
+                for callback in self._subscribers:
+                    try:
+                        callback(table)
+
+                    except Exception as e:
+                        # Message
+                        print(f"Subscriber of layer '{table}' failed: {e!r}")
+
+        finally:
+            self._lock.release()
+
+    def listen(self, timeout: float = 60.0) -> threading.Thread:
+        """Refreshes versions whenever the pipeline announces a change, from a background thread.
+
+        The thread holds its own connection outside of the pool, listening on the 'layer_changed'
+        channel, and reconnects if the connection is lost.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a notification before refreshing anyway. Defaults to 60.0.
+
+        Returns:
+            threading.Thread: The listening thread.
+        """
+
+        def run():
+            while True:
+                try:
+                    # Dedicated Connection, Notifications are Only Delivered Outside Transactions
+                    connection = self.db._open()
+                    connection.autocommit = True
+
+                    with connection.cursor() as c:
+                        c.execute("LISTEN layer_changed;")
+
+                    try:
+                        while True:
+                            # Wait for Notification or Timeout
+                            select.select([connection], [], [], timeout)
+                            connection.poll()
+                            connection.notifies.clear()
+
+                            # Force Poll on Next Lookup, Even Within Interval
+                            self._checked = float("-inf")
+                            self.refresh()
+
+                    finally:
+                        connection.close()
+
+                # Pool Can Also Time Out while Refreshing
+                except (psycopg2.Error, TimeoutError) as e:
+                    # Message
+                    print(f"Listening for layer changes failed, retrying: {e}")
+                    time.sleep(timeout / 4)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        return thread
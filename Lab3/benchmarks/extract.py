@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of WeatherLoader Extract Parsing
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Make Utils Importable when Run as a Script
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.etl import WeatherLoader, orjson
+
+# For Type Annotations
+from typing import List
+
+
+def synthetic_features(stations: int, days: int, seed: int = 0) -> List[dict]:
+    """Creates daily features shaped like the Mesonet daily.geojson response.
+
+    Args:
+        stations (int): Number of stations.
+        days (int): Number of days per station.
+        seed (int, optional): Seed of the random values. Defaults to 0.
+
+    Returns:
+        List[dict]: GeoJSON features.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2022-01-01", periods=days).strftime("%Y-%m-%d")
+
+    features = []
+
+    for s in range(stations):
+        x, y = rng.uniform(-97.5, -89.0), rng.uniform(43.0, 49.5)
+
+        for date in dates:
+            features.append(
+                {
+                    "type": "Feature",
+                    "properties": {
+                        "station": f"MN{s:04d}",
+                        "date": date,
+                        "max_tmpf": float(rng.normal(60, 15)),
+                        "min_tmpf": float(rng.normal(40, 15)),
+                        "precip": None if rng.random() < 0.1 else float(rng.random()),
+                        "name": f"Station {s}",
+                    },
+                    "geometry": {"type": "Point", "coordinates": [x, y]},
+                }
+            )
+
+    return features
+
+
+def per_row(features: List[dict]) -> pd.DataFrame:
+    """Parses features like extract(fast=False), with per-row lambdas over a DataFrame of dicts."""
+    df_raw = pd.DataFrame.from_records(features)
+
+    for s in ["station", "date", "max_tmpf", "min_tmpf", "precip", "name"]:
+        WeatherLoader._extractToCol(df_raw, s)
+
+    df_raw["x"] = df_raw["geometry"].apply(lambda x: dict(x)["coordinates"][0])
+    df_raw["y"] = df_raw["geometry"].apply(lambda x: dict(x)["coordinates"][1])
+
+    return df_raw[
+        ["station", "date", "max_tmpf", "min_tmpf", "precip", "name", "x", "y"]
+    ].copy()
+
+
+def best_of(function, repeat: int) -> float:
+    """Returns the fastest of several timed runs of a function, in seconds."""
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Times per-row and single-pass parsing of daily weather features."
+    )
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--days", type=int, nargs="+", default=[31, 365, 1095])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'features':>10} {'per-row (s)':>12} {'fast (s)':>10} {'speedup':>8}")
+
+    for days in args.days:
+        features = synthetic_features(args.stations, days)
+        body = json.dumps({"type": "FeatureCollection", "features": features})
+
+        # Both Paths Include Decoding the Response Body, with orjson if Installed
+        decode = orjson.loads if orjson is not None else json.loads
+
+        slow = best_of(lambda: per_row(json.loads(body)["features"]), args.repeat)
+        fast = best_of(
+            lambda: WeatherLoader._parse_features(decode(body)["features"]),
+            args.repeat,
+        )
+
+        print(f"{len(features):>10} {slow:>12.3f} {fast:>10.3f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# Load Test of the Flask & ASGI APIs
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+# Serve both APIs against the same database, e.g.
+#   gunicorn --bind :8080 --workers 1 --threads 8 main:app
+#   gunicorn --bind :8081 --workers 1 -k uvicorn.workers.UvicornWorker asgi:app
+# then compare them at increasing concurrency:
+#   python load.py --url http://localhost:8080 http://localhost:8081 --path "/weather_h3?res=6"
+#
+
+import time
+import asyncio
+import argparse
+import numpy as np
+from urllib.parse import urlsplit
+
+# For Type Annotations
+from typing import List, Tuple
+
+
+async def fetch(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str
+) -> Tuple[int, int, bool]:
+    """Sends one GET over a kept-alive connection and reads the whole response.
+
+    Args:
+        reader (asyncio.StreamReader): Reader of the connection.
+        writer (asyncio.StreamWriter): Writer of the connection.
+        host (str): Value of the Host header.
+        path (str): Path and query string.
+
+    Returns:
+        Tuple[int, int, bool]: Status code, body size in bytes and whether the server keeps the connection open.
+    """
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n".encode()
+    )
+    await writer.drain()
+
+    # Status Line & Headers
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+
+        if not line:
+            break
+
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # Body, Sized or Chunked
+    size = 0
+
+    if "content-length" in headers:
+        size = len(await reader.readexactly(int(headers["content-length"])))
+
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            chunk_size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+
+            if chunk_size == 0:
+                break
+
+    return status, size, headers.get("connection", "").lower() != "close"
+
+
+async def client(
+    url: str, path: str, deadline: float, latencies: List[float], errors: List[str]
+) -> int:
+    """Sends requests back to back on one connection until the deadline.
+
+    Returns:
+        int: Bytes received.
+    """
+    parts = urlsplit(url)
+    received = 0
+
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+
+            try:
+                status, size, keep_alive = await fetch(
+                    reader, writer, parts.netloc, path
+                )
+
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                errors.append(type(e).__name__)
+
+                # Reconnect after a Dropped Connection
+                writer.close()
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80
+                )
+                continue
+
+            latencies.append(time.perf_counter() - start)
+            received += size
+
+            if status != 200:
+                errors.append(str(status))
+
+            # Reconnect if the Server Closes Connections after Each Response
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80
+                )
+
+    finally:
+        writer.close()
+
+    return received
+
+
+async def load(url: str, path: str, concurrency: int, duration: float) -> dict:
+    """Runs concurrent clients against one server for a fixed duration.
+
+    Args:
+        url (str): Base URL of the server.
+        path (str): Path and query string requested.
+        concurrency (int): Number of concurrent connections.
+        duration (float): Seconds to run.
+
+    Returns:
+        dict: Throughput, latency percentiles and errors.
+    """
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    received = await asyncio.gather(
+        *[client(url, path, deadline, latencies, errors) for _ in range(concurrency)]
+    )
+
+    latencies = np.array(latencies) * 1000
+
+    return {
+        "requests_s": len(latencies) / duration,
+        "p50_ms": np.percentile(latencies, 50) if len(latencies) else np.nan,
+        "p95_ms": np.percentile(latencies, 95) if len(latencies) else np.nan,
+        "p99_ms": np.percentile(latencies, 99) if len(latencies) else np.nan,
+        "mb_s": sum(received) / duration / 1024**2,
+        "errors": len(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compares throughput and latency of API servers at increasing concurrency."
+    )
+    parser.add_argument("--url", nargs="+", required=True)
+    parser.add_argument("--path", default="/weather_h3")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'url':<28} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'MB/s':>7} {'errors':>7}"
+    )
+
+    for concurrency in args.concurrency:
+        for url in args.url:
+            r = asyncio.run(load(url, args.path, concurrency, args.duration))
+
+            print(
+                f"{url:<28} {concurrency:>5} {r['requests_s']:>9.1f} {r['p50_ms']:>8.1f} "
+                f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['mb_s']:>7.2f} {r['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of GeoJSON Serialization
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Make App Modules Importable when Run as a Script
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from serializer import CollectionWriter, encode_collection, orjson
+
+# For Type Annotations
+from typing import List
+
+
+def synthetic_features(count: int, seed: int = 0) -> List[dict]:
+    """Creates hexagon features shaped like the rows of an H3 layer.
+
+    Args:
+        count (int): Number of features.
+        seed (int, optional): Seed of the random values. Defaults to 0.
+
+    Returns:
+        List[dict]: GeoJSON features.
+    """
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(-97.5, -89.0, count), rng.uniform(43.0, 49.5, count)
+    values = rng.normal(50, 15, count)
+
+    # Offsets of a Hexagon's Vertices
+    angles = np.linspace(0, 2 * np.pi, 7)
+    dx, dy = 0.05 * np.cos(angles), 0.05 * np.sin(angles)
+
+    return [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [list(zip((x[i] + dx).tolist(), (y[i] + dy).tolist()))],
+            },
+            "properties": {
+                "objectid": i + 1,
+                "res": 6,
+                "value": float(values[i]),
+                # Apostrophes Break Quote-Swapping Serializers
+                "name": "Lake O'Brien" if i % 100 == 0 else f"Cell {i}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def legacy(features: List[dict]) -> bytes:
+    """Serializes like the old helpers, by swapping quotes in the repr of the collection."""
+    collection = {"type": "FeatureCollection", "features": features}
+
+    return str(collection).replace("'", '"').encode("utf-8")
+
+
+def standard(features: List[dict]) -> bytes:
+    """Serializes with the standard library encoder."""
+    return json.dumps({"type": "FeatureCollection", "features": features}).encode(
+        "utf-8"
+    )
+
+
+def streamed(rows: List[str], batch_size: int) -> int:
+    """Writes a collection of pre-serialized features in batches, like a streamed response.
+
+    Returns:
+        int: Size of the largest piece, in bytes.
+    """
+    writer = CollectionWriter()
+    batches = (rows[i : i + batch_size] for i in range(0, len(rows), batch_size))
+
+    return max(len(chunk) for chunk in writer.chunks(batches))
+
+
+def valid(body: bytes) -> bool:
+    """Checks if a body parses as JSON."""
+    try:
+        json.loads(body)
+        return True
+
+    except ValueError:
+        return False
+
+
+def best_of(function, repeat: int) -> float:
+    """Returns the fastest of several timed runs of a function, in seconds."""
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Times GeoJSON serialization of feature collections of increasing size."
+    )
+    parser.add_argument(
+        "--features", type=int, nargs="+", default=[1000, 10000, 100000, 1000000]
+    )
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Message
+    print(f"orjson {'installed' if orjson is not None else 'not installed'}")
+    print(
+        f"{'features':>10} {'MB':>7} {'legacy (s)':>11} {'valid':>6} {'json (s)':>9} "
+        f"{'dicts (s)':>10} {'text (s)':>9} {'stream (s)':>11} {'chunk KB':>9}"
+    )
+
+    for count in args.features:
+        features = synthetic_features(count)
+
+        # Features as PostgreSQL Returns them, One Text per Row & One JSON_AGG Array
+        rows = [json.dumps(f) for f in features]
+        array = "[" + ",".join(rows) + "]"
+
+        body = encode_collection(features)
+
+        t_legacy = best_of(lambda: legacy(features), args.repeat)
+        t_json = best_of(lambda: standard(features), args.repeat)
+        t_dicts = best_of(lambda: encode_collection(features), args.repeat)
+        t_text = best_of(lambda: encode_collection(array), args.repeat)
+        t_stream = best_of(lambda: streamed(rows, args.batch_size), args.repeat)
+
+        print(
+            f"{count:>10} {len(body) / 1024**2:>7.1f} {t_legacy:>11.3f} "
+            f"{str(valid(legacy(features))):>6} {t_json:>9.3f} {t_dicts:>10.3f} "
+            f"{t_text:>9.3f} {t_stream:>11.3f} {streamed(rows, args.batch_size) / 1024:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+#
+# Shared Setup of Regression Checks
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+
+# Make Utils Importable Wherever pytest is Run From
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
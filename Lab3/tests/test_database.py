@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the Database Connection Pool
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+# Make App Modules Importable
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from database import ConnectionPool, Database
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def execute(self, query: str, params=None) -> None:
+        raise psycopg2.Error("relation does not exist")
+
+
+class FakeConnection:
+    """Connection whose queries always fail."""
+
+    class info:
+        transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def __init__(self) -> None:
+        self.closed = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+def test_query_raises_after_rollback():
+    db = Database("localhost", "user", "password", "db", 5432)
+    db.connection = FakeConnection()
+
+    with pytest.raises(psycopg2.Error):
+        db.query("SELECT * FROM missing;")
+
+    assert db.connection.rollbacks == 1
+
+
+def test_min_connections_are_opened_up_front():
+    pool = ConnectionPool(FakeConnection, minconn=2, maxconn=4)
+    pool.open_min()
+
+    assert pool._size == 2
+    assert len(pool._idle) == 2
+
+    # Already at minconn
+    pool.open_min()
+    assert pool._size == 2
+
+
+def test_connections_released_after_close_all_are_closed():
+    pool = ConnectionPool(FakeConnection, minconn=1, maxconn=2)
+
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close_all()
+
+    assert idle.closed and not busy.closed
+
+    pool.release(busy)
+
+    assert busy.closed
+    assert pool._idle == [] and pool._size == 0
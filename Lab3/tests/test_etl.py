@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the Weather ETL
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import json
+import time
+import threading
+import http.server
+
+from utils.etl import RateLimiter, WeatherLoader, WeatherRangeLoader, make_session
+
+
+def serve(statuses: list, body: bytes = b"{}") -> tuple:
+    """Starts a local server that answers with the given statuses in turn, then 200 with body.
+
+    Returns:
+        tuple: Server and list of monotonic times of the requests it received.
+    """
+    hits = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(time.monotonic())
+            status = statuses[len(hits) - 1] if len(hits) <= len(statuses) else 200
+
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, hits
+
+
+def test_retries_wait_for_rate_limiter():
+    server, hits = serve([503, 503])
+    limiter = RateLimiter(rate=5.0)
+    session = make_session(pool_size=1, retries=3, backoff=0.0, limiter=limiter)
+
+    try:
+        limiter.wait()
+        response = session.get(f"http://127.0.0.1:{server.server_port}/")
+
+    finally:
+        server.shutdown()
+
+    # Two Retries, Each Spaced by the Limiter Rather than Sent Back to Back
+    assert response.status_code == 200
+    assert len(hits) == 3
+    assert all(b - a >= 0.15 for a, b in zip(hits, hits[1:]))
+
+
+def test_networks_default_is_not_shared(tmp_path):
+    first = WeatherRangeLoader(str(tmp_path / "a.gdb"), "2022-01", "2022-02")
+    first.networks.append("IA_RWIS")
+
+    second = WeatherRangeLoader(str(tmp_path / "b.gdb"), "2022-01", "2022-02")
+
+    assert second.networks == ["MN_RWIS"]
+
+
+def test_fresh_state_file_extracts_every_day(tmp_path):
+    features = [
+        {
+            "type": "Feature",
+            "properties": {
+                "station": station,
+                "date": f"2022-06-{day:02d}",
+                "max_tmpf": 70.0,
+                "min_tmpf": 50.0,
+                "precip": 0.1,
+                "name": f"Station {station}",
+            },
+            "geometry": {"type": "Point", "coordinates": [-93.0, 45.0]},
+        }
+        for station in ["A", "B"]
+        for day in [1, 2, 3]
+    ]
+    body = json.dumps({"type": "FeatureCollection", "features": features}).encode()
+    server, _ = serve([], body)
+    url = f"http://127.0.0.1:{server.server_port}/daily.geojson"
+    state_path = str(tmp_path / "state.csv")
+
+    try:
+        # State File Does Not Exist Yet
+        loader = WeatherLoader(
+            str(tmp_path / "out.gdb"), 6, 2022, base_url=url, state_path=state_path
+        )
+        assert len(loader.extract()) == 6
+
+        loader.transform()
+        loader.aggregate()
+
+        # Every Day is Now Behind the Checkpoint
+        loader = WeatherLoader(
+            str(tmp_path / "out.gdb"), 6, 2022, base_url=url, state_path=state_path
+        )
+        assert len(loader.extract()) == 0
+
+    finally:
+        server.shutdown()
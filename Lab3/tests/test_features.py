@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the In-Memory Feature Store
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import json
+import time
+import contextlib
+import threading
+import pytest
+
+shapely = pytest.importorskip("shapely")
+pytest.importorskip("psycopg2")
+
+# Make App Modules Importable
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from features import FeatureStore
+from layers import Layer
+
+
+class SlowDatabase:
+    """Serves one square feature, but only once the test lets the read finish."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    @contextlib.contextmanager
+    def checkout(self):
+        yield None
+
+    def query(self, q: str, params: list = None) -> list:
+        return [(1,)]
+
+    def stream(self, q: str, params: list = None):
+        self.release.wait(5)
+
+        square = shapely.box(-94, 44, -92, 46)
+        feature = json.dumps({"type": "Feature", "properties": {"objectid": 1}})
+
+        yield [(1, shapely.to_wkb(square), feature)]
+
+
+def test_first_load_does_not_block_requests():
+    db = SlowDatabase()
+    layer = Layer("squares", "squares")
+    store = FeatureStore(db, [layer])
+
+    # Request Thread Falls Back to the Database while the Load Runs
+    start = time.perf_counter()
+    assert store.get(layer) is None
+    assert store.get(layer) is None
+    assert time.perf_counter() - start < 1
+
+    db.release.set()
+
+    for _ in range(100):
+        if store.get(layer) is not None:
+            break
+        time.sleep(0.05)
+
+    assert store.get(layer).point(-93, 45).tolist() == [0]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of H3 Aggregation
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import pytest
+import numpy as np
+
+pytest.importorskip("h3")
+
+from utils.hexagons import aggregate_to_h3, build_pyramid
+from utils.interpolation import Pipeline
+
+
+def test_pyramid_of_surface_without_predictions():
+    lng, lat = np.array([-93.0, -93.1]), np.array([45.0, 45.1])
+
+    df = aggregate_to_h3(lng, lat, np.full(2, np.nan), 6)
+    pyramid = build_pyramid(df, 4, 6)
+
+    assert pyramid.empty
+    assert Pipeline._h3_features(pyramid).empty
+
+    with pytest.raises(ValueError):
+        build_pyramid(df, 4)
+
+
+def test_pyramid_levels():
+    rng = np.random.default_rng(0)
+    lng, lat = rng.uniform(-94, -93, 200), rng.uniform(45, 46, 200)
+
+    df = aggregate_to_h3(lng, lat, rng.normal(size=200), 6)
+    pyramid = build_pyramid(df, 4)
+
+    assert sorted(pyramid["res"].unique()) == [4, 5, 6]
+    assert (pyramid.groupby("res")["count"].sum() == 200).all()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the Native Kriging Engine
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+
+from utils.grid import Grid
+from utils.kriging import KrigingInterpolator, empirical_variogram, fit_variogram
+
+
+def known_points(n: int = 40, seed: int = 0):
+    """Scattered points with a smooth field and some noise."""
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(0, 100, n), rng.uniform(0, 100, n)
+    values = np.sin(x / 20) + np.cos(y / 25) + rng.normal(0, 0.05, n)
+
+    return x, y, values
+
+
+def test_ordinary_kriging_reproduces_known_points():
+    x, y, values = known_points()
+
+    # Variogram without a Nugget
+    model = KrigingInterpolator(neighbors=12).fit(
+        x, y, values, variogram=("spherical", [0.0, 1.0, 60.0])
+    )
+    predicted, variance = model.predict(x, y, return_variance=True)
+
+    np.testing.assert_allclose(predicted, values, atol=1e-8)
+    np.testing.assert_allclose(variance, 0.0, atol=1e-8)
+
+
+def test_ordinary_kriging_weights_sum_to_one():
+    x, y, _ = known_points()
+
+    # A Constant Field is Only Reproduced Away from the Points if the Weights Sum to One
+    model = KrigingInterpolator(neighbors=12).fit(
+        x, y, np.full(len(x), 7.0), variogram=("exponential", [0.1, 1.0, 40.0])
+    )
+    predicted = model.predict(np.array([5.0, 50.0, 95.0]), np.array([5.0, 33.0, 60.0]))
+
+    np.testing.assert_allclose(predicted, 7.0)
+
+
+def test_universal_kriging_reproduces_linear_trend():
+    x, y, _ = known_points()
+
+    model = KrigingInterpolator("UNIVERSAL_KRIGING", neighbors=12).fit(
+        x, y, 2.0 + 0.5 * x - 0.25 * y, variogram=("gaussian", [0.0, 1.0, 30.0])
+    )
+    grid = Grid.from_points(x, y, cell_size=10.0)
+    gx, gy = grid.coordinates()
+
+    surface = model.predict_grid(grid)
+
+    np.testing.assert_allclose(surface.ravel(), 2.0 + 0.5 * gx - 0.25 * gy, atol=1e-6)
+
+
+def test_variogram_of_spatially_correlated_field():
+    x, y, values = known_points(200)
+
+    lags, gamma, counts = empirical_variogram(x, y, values, 15)
+    name, (nugget, sill, range_) = fit_variogram(lags, gamma, counts, "spherical")
+
+    # Semivariance Grows with Distance, so the Fit is Not a Pure Nugget
+    assert name == "spherical"
+    assert sill > nugget and range_ > 0
+
+
+def test_variogram_of_too_few_bins_is_pure_nugget():
+    name, params = fit_variogram(np.array([10.0]), np.array([0.5]), np.array([1]))
+
+    np.testing.assert_allclose(params, [0.5, 0.0, 10.0])
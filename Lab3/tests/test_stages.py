@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of Pipeline Stage Caching
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+
+from utils.kriging import KrigingInterpolator
+from utils.stages import StageCache, stage
+
+
+class Steps:
+    """Two chained stages, counting how often each one really runs."""
+
+    def __init__(self, cache: StageCache, model, values: np.ndarray) -> None:
+        self.stage_cache = cache
+        self.model = model
+        self.values = values
+        self.runs = {"fit": 0, "scale": 0}
+
+    def _stage_inputs(self, name: str) -> dict:
+        return {"model": self.model, "values": self.values}
+
+    def _output_exists(self, path: str) -> bool:
+        return True
+
+    @stage("fit", ["fitted"])
+    def fit(self) -> None:
+        self.runs["fit"] += 1
+        self.fitted = self.values.sum()
+
+    @stage("scale", ["scaled"], depends_on=["fit"], ignore=["workers"])
+    def scale(self, factor: float, workers: int = 1) -> float:
+        self.runs["scale"] += 1
+        self.scaled = self.fitted * factor
+
+        return self.scaled
+
+
+def run(directory, model, values, factor=2.0, workers=1) -> Steps:
+    """Runs both stages with a cache reloaded from disk, like a new session."""
+    steps = Steps(StageCache(str(directory)), model, values)
+    steps.fit()
+    steps.scale(factor, workers=workers)
+
+    return steps
+
+
+def test_unchanged_stages_are_restored(tmp_path):
+    values = np.arange(4.0)
+    model = KrigingInterpolator(n_lags=10)
+
+    first = run(tmp_path, model, values)
+    second = run(tmp_path, model, values, workers=8)
+
+    assert first.runs == {"fit": 1, "scale": 1}
+    assert second.runs == {"fit": 0, "scale": 0}
+    assert second.scaled == first.scaled == 12.0
+
+
+def test_argument_change_reruns_only_that_stage(tmp_path):
+    values = np.arange(4.0)
+    model = KrigingInterpolator(n_lags=10)
+
+    run(tmp_path, model, values)
+    steps = run(tmp_path, model, values, factor=3.0)
+
+    assert steps.runs == {"fit": 0, "scale": 1}
+    assert steps.scaled == 18.0
+
+
+def test_input_change_reruns_downstream_stages(tmp_path):
+    model = KrigingInterpolator(n_lags=10)
+
+    run(tmp_path, model, np.arange(4.0))
+    steps = run(tmp_path, model, np.arange(5.0))
+
+    assert steps.runs == {"fit": 1, "scale": 1}
+    assert steps.scaled == 20.0
+
+
+def test_interpolator_parameter_change_misses(tmp_path):
+    values = np.arange(4.0)
+
+    run(tmp_path, KrigingInterpolator(n_lags=10), values)
+
+    # Runtime Settings Keep the Key, Variogram Bins Change It
+    same = run(tmp_path, KrigingInterpolator(n_lags=10, workers=4), values)
+    changed = run(tmp_path, KrigingInterpolator(n_lags=20), values)
+
+    assert same.runs == {"fit": 0, "scale": 0}
+    assert changed.runs == {"fit": 1, "scale": 1}
+
+
+def test_invalidate_drops_downstream_stages(tmp_path):
+    values = np.arange(4.0)
+    model = KrigingInterpolator()
+
+    run(tmp_path, model, values)
+    StageCache(str(tmp_path)).invalidate("fit")
+
+    assert StageCache(str(tmp_path)).manifest == {}
+    assert run(tmp_path, model, values).runs == {"fit": 1, "scale": 1}
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the Partitioned Weather Store
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import pytest
+import pandas as pd
+
+pytest.importorskip("pyarrow")
+
+from utils.storage import WeatherStore
+
+
+def days(station: str, first: int, last: int, value: float) -> pd.DataFrame:
+    """Creates daily observations of one station in June 2022."""
+    dates = pd.date_range(f"2022-06-{first:02d}", f"2022-06-{last:02d}")
+
+    return pd.DataFrame(
+        {
+            "station": station,
+            "date": dates.strftime("%Y-%m-%d"),
+            "name": f"Station {station}",
+            "max_tmpf": value,
+            "min_tmpf": value - 10,
+            "precip": 0.1,
+            "x": -93.0,
+            "y": 45.0,
+        }
+    )
+
+
+def test_incremental_write_keeps_earlier_days(tmp_path):
+    store = WeatherStore(str(tmp_path / "weather"))
+
+    store.write(pd.concat([days("A", 1, 10, 70.0), days("B", 1, 10, 60.0)]))
+
+    # Only the New Days of One Station, as an Incremental Extract Returns
+    store.write(days("A", 11, 15, 80.0))
+
+    df = store.read()
+
+    assert df.groupby("station", observed=True).size().to_dict() == {"A": 15, "B": 10}
+
+
+def test_rewritten_day_replaces_stored_one(tmp_path):
+    store = WeatherStore(str(tmp_path / "weather"))
+
+    store.write(days("A", 1, 10, 70.0))
+    store.write(days("A", 5, 5, 99.0))
+
+    df = store.read().sort_values("date")
+
+    assert len(df) == 10
+    assert df["max_tmpf"].tolist() == [70.0] * 4 + [99.0] + [70.0] * 5
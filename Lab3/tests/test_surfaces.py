@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of the Surface Registry
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import json
+import numpy as np
+
+# Make App Modules Importable
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from surfaces import SurfaceRegistry
+
+
+def export(directory: str, name: str) -> None:
+    """Writes a small WGS84 surface like Pipeline.export_surface()."""
+    np.save(os.path.join(directory, f"{name}.npy"), np.ones((2, 2), dtype=np.float32))
+
+    meta = {
+        "xmin": -94.0,
+        "ymax": 46.0,
+        "cell_size": 1.0,
+        "nrows": 2,
+        "ncols": 2,
+        "crs": 4326,
+        "value_of_interest": "max_tmpf",
+        "method": "KRIGING",
+    }
+
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def test_variance_sidecar_is_not_a_surface(tmp_path):
+    export(str(tmp_path), "max_temp")
+    export(str(tmp_path), "max_temp_variance")
+
+    registry = SurfaceRegistry(str(tmp_path))
+
+    assert registry.names() == ["max_temp"]
+    assert registry.get("max_temp_variance").name == "max_temp_variance"
+
+
+def test_get_does_not_list_directory(tmp_path, monkeypatch):
+    export(str(tmp_path), "max_temp")
+
+    registry = SurfaceRegistry(str(tmp_path))
+
+    def listdir(path):
+        raise AssertionError("get() listed the directory")
+
+    monkeypatch.setattr(os, "listdir", listdir)
+
+    assert registry.get("max_temp").sample([-93.0], [45.0])[0] == 1.0
+    assert registry.get("missing") is None
+    assert registry.get("../max_temp") is None
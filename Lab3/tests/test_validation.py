@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of Native Cross-Validation
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+
+from utils.idw import IDWInterpolator
+from utils.kriging import KrigingInterpolator
+from utils.validation import (
+    cross_validate,
+    error_statistics,
+    fold_ids,
+    held_out_neighbours,
+    parameter_grid,
+)
+
+
+def known_points(n: int = 15, seed: int = 0):
+    """A tiny scattered dataset."""
+    rng = np.random.default_rng(seed)
+    x, y = rng.uniform(0, 10, n), rng.uniform(0, 10, n)
+
+    return x, y, x * y / 10 + rng.normal(0, 0.1, n)
+
+
+def brute_force(model, x, y, values, folds):
+    """Predicts each fold from a model refitted to the other folds."""
+    predicted = np.empty(len(values))
+
+    for fold in np.unique(folds):
+        test, train = folds == fold, folds != fold
+        model.fit(x[train], y[train], values[train])
+        predicted[test] = model.predict(x[test], y[test])
+
+    return predicted
+
+
+def test_idw_weights_sum_to_one():
+    x, y, _ = known_points()
+
+    # Weighted Mean of Ones is One Only if the Weights are Normalized
+    model = IDWInterpolator(power=2, neighbors=5).fit(x, y, np.ones(len(x)))
+
+    np.testing.assert_allclose(model.predict([0.5, 5.0, 9.5], [9.5, 5.0, 0.5]), 1.0)
+
+
+def test_held_out_neighbours_skip_own_fold():
+    x, y, _ = known_points()
+    points = np.column_stack([x, y])
+    folds = fold_ids(len(x), 3)
+
+    distances, index = held_out_neighbours(points, 4, folds)
+
+    for i in range(len(x)):
+        others = np.flatnonzero(folds != folds[i])
+        expected = np.sort(np.linalg.norm(points[others] - points[i], axis=1))[:4]
+
+        assert (folds[index[i]] != folds[i]).all()
+        np.testing.assert_allclose(distances[i], expected)
+
+
+def test_leave_one_out_matches_brute_force():
+    x, y, values = known_points()
+    candidates = parameter_grid(IDWInterpolator, power=[1, 2], neighbors=[3, 6])
+
+    ranked = cross_validate(candidates, x, y, values)
+
+    for row in ranked.itertuples():
+        predicted = brute_force(
+            candidates[row.candidate], x, y, values, np.arange(len(x))
+        )
+        expected = error_statistics(predicted, values)
+
+        assert row.count == expected["count"]
+        np.testing.assert_allclose(row.rmse, expected["rmse"])
+        np.testing.assert_allclose(row.bias, expected["bias"], atol=1e-12)
+
+    # Best First
+    assert ranked["rmse"].is_monotonic_increasing
+
+
+def test_k_fold_kriging_matches_brute_force():
+    x, y, values = known_points()
+    variogram = ("spherical", [0.01, 1.0, 8.0])
+
+    # Variogram Fixed, as Cross-Validation Fits it Once to All Points
+    class FixedKriging(KrigingInterpolator):
+        def fit(self, x, y, values, variogram=variogram):
+            return super().fit(x, y, values, variogram)
+
+    model = FixedKriging(neighbors=5)
+    ranked = cross_validate([model], x, y, values, folds=3)
+
+    predicted = brute_force(model, x, y, values, fold_ids(len(x), 3))
+
+    np.testing.assert_allclose(
+        ranked.loc[0, "rmse"], error_statistics(predicted, values)["rmse"]
+    )
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Regression Checks of Layer Version Tracking
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import sys
+import contextlib
+import pytest
+
+pytest.importorskip("psycopg2")
+
+# Make App Modules Importable
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from versions import LayerVersions
+
+
+class FakeCursor:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def execute(self, sql: str) -> None:
+        pass
+
+    def fetchall(self) -> list:
+        return list(self.rows)
+
+
+class FakeDatabase:
+    """Serves the rows of 'layer_versions' from a list."""
+
+    def __init__(self) -> None:
+        self.rows = []
+
+    @contextlib.contextmanager
+    def checkout(self):
+        db = self
+
+        class Connection:
+            def cursor(self):
+                return FakeCursor(db.rows)
+
+            def rollback(self):
+                pass
+
+        yield Connection()
+
+
+def test_failing_subscriber_does_not_block_others():
+    db = FakeDatabase()
+    versions = LayerVersions(db, interval=0)
+
+    calls = []
+
+    def failing(table):
+        raise RuntimeError("detection failed")
+
+    versions.subscribe(failing)
+    versions.subscribe(calls.append)
+
+    # First Poll Only Seeds Versions
+    db.rows = [("h3_hex", 1)]
+    versions.refresh()
+
+    # Publish
+    db.rows = [("h3_hex", 2)]
+    versions.refresh()
+
+    assert calls == ["h3_hex"]
+    assert versions.version("h3_hex") == 2
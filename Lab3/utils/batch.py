@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+#
+# Batch Interpolation of Many Variables & Periods
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import time
+import itertools
+import traceback
+import contextlib
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.interpolation import ENGINES, Pipeline
+
+# ArcPy is Only Needed for the ARCPY Engine
+try:
+    import arcpy
+except ImportError:
+    arcpy = None
+
+# For Type Annotations
+from typing import Callable, List, Tuple
+from os import PathLike
+from pandas import DataFrame
+
+# Stages of a Job, in the Order they Run
+STAGES = ["interpolate", "accuracy", "hexagons", "export"]
+
+
+class BatchRunner:
+    """
+    A class used to run the interpolation pipeline for many (dataset, variable, period) jobs on a process pool.
+
+    Every job runs the full chain of interpolation, point accuracy, H3 aggregation and export in its
+    own process, with its own directory (and file geodatabase for the ARCPY engine), so the global
+    arcpy.env.workspace of one job never leaks into another. Failures are captured per job, with their
+    traceback and the time spent in each stage, and the remaining jobs carry on.
+
+    Methods
+    -------
+    jobs(dataset, variables, periods)
+        Static method. Creates one job per combination of variable and period.
+    run(jobs)
+        Runs jobs on the process pool and summarizes their outcome.
+    _run_job(job)
+        Private method. Runs the full chain of one job, in a worker process.
+
+    Example
+    -------
+    > runner = BatchRunner(r"backfill_dir", engine="NATIVE", surface_directory=r"surfaces", workers=8)
+    > jobs = BatchRunner.jobs(r"weather.gdb\\aggMthWX_{period}", ["max_tmpf", "min_tmpf", "precip"], ["12022", "22022"])
+    > summary = runner.run(jobs)
+    > summary.loc[summary["status"] == "FAILED", ["dataset", "variable", "period", "error"]]
+    """
+
+    def __init__(
+        self,
+        output_directory: PathLike,
+        engine: str = "NATIVE",
+        workers: int = None,
+        sde_path: PathLike = None,
+        loader_factory: Callable = None,
+        surface_directory: PathLike = None,
+        res: int = 6,
+        min_res: int = None,
+        accuracy_source: str = "SURFACE",
+        cell_size: float = None,
+        crs: int = None,
+    ) -> None:
+        """Instantiates the BatchRunner class.
+
+        Args:
+            output_directory (PathLike): Directory that will hold one workspace per job.
+            engine (str, optional): Interpolation engine, one of ['ARCPY', 'NATIVE']. Defaults to "NATIVE".
+            workers (int, optional): Number of processes. Defaults to the number of CPUs.
+            sde_path (PathLike, optional): SDE connection that results are exported to. Defaults to None.
+            loader_factory (Callable, optional): Picklable function that returns a BulkLoader in a worker, used
+                to publish NATIVE results with export_to_postgis(). Defaults to None.
+            surface_directory (PathLike, optional): Directory that NATIVE surfaces are exported to for /predict. Defaults to None.
+            res (int, optional): Resolution of the H3 cells. Defaults to 6.
+            min_res (int, optional): Coarsest resolution of a NATIVE H3 pyramid. Defaults to None (single resolution).
+            accuracy_source (str, optional): NATIVE point accuracy source, one of ['SURFACE', 'CROSS_VALIDATION']. Defaults to "SURFACE".
+            cell_size (float, optional): Cell size of the NATIVE prediction grid. Defaults to 1/250 of the extent.
+            crs (int, optional): EPSG code of NATIVE tabular inputs. Defaults to that of the feature class, or 4326.
+
+        Raises:
+            ValueError: Raised if engine is not valid option.
+            TypeError: Raised if engine is not of type str.
+        """
+        # Check Engine
+        if engine not in ENGINES:
+            if type(engine) == str:
+                raise ValueError(f"Param 'engine' must be in {ENGINES}")
+            else:
+                raise TypeError(
+                    f"Param 'engine' must be of type string and value of {ENGINES}"
+                )
+
+        self.output_directory = output_directory
+        self.engine = engine
+        self.workers = workers or os.cpu_count()
+        self.sde_path = sde_path
+        self.loader_factory = loader_factory
+        self.surface_directory = surface_directory
+        self.res = res
+        self.min_res = min_res
+        self.accuracy_source = accuracy_source
+        self.cell_size = cell_size
+        self.crs = crs
+
+    @staticmethod
+    def jobs(
+        dataset: str, variables: List[str], periods: List[str]
+    ) -> List[Tuple[str, str, str]]:
+        """Creates one job per combination of variable and period.
+
+        Args:
+            dataset (str): Path to the input points, with a '{period}' placeholder, e.g. r"weather.gdb\\aggMthWX_{period}".
+            variables (List[str]): Values that will be interpolated.
+            periods (List[str]): Periods substituted into the dataset path.
+
+        Returns:
+            List[Tuple[str, str, str]]: Jobs as (dataset, variable, period).
+        """
+        return [
+            (dataset, variable, period)
+            for period, variable in itertools.product(periods, variables)
+        ]
+
+    def run(self, jobs: List[Tuple[str, str, str]]) -> DataFrame:
+        """Runs jobs on the process pool and summarizes their outcome.
+
+        Args:
+            jobs (List[Tuple[str, str, str]]): Jobs as (dataset, variable, period). A '{period}' placeholder
+                in the dataset path is replaced by the period.
+
+        Returns:
+            DataFrame: One row per job, in input order, with status ('OK' or 'FAILED'), error traceback,
+                total and per-stage seconds, NATIVE RMSE and the path to the job's workspace and log.
+        """
+        start = time.perf_counter()
+        results = [None] * len(jobs)
+
+        with ProcessPoolExecutor(self.workers) as executor:
+            futures = {
+                executor.submit(self._run_job, job): i for i, job in enumerate(jobs)
+            }
+
+            for future in as_completed(futures):
+                i = futures[future]
+                dataset, variable, period = jobs[i]
+
+                # Worker Crashes are Captured Like Any Other Failure
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    results[i] = {
+                        "dataset": str(dataset).format(period=period),
+                        "variable": variable,
+                        "period": period,
+                        "status": "FAILED",
+                        "error": traceback.format_exc(),
+                    }
+
+                # Message
+                print(
+                    f"{results[i]['dataset']} {variable}: {results[i]['status']} "
+                    f"({sum(r is not None for r in results)}/{len(jobs)})"
+                )
+
+        summary = pd.DataFrame(results)
+
+        # Message
+        print(
+            f"{(summary['status'] == 'OK').sum()} of {len(jobs)} jobs succeeded in {time.perf_counter() - start:.1f} s"
+        )
+
+        return summary
+
+    def _run_job(self, job: Tuple[str, str, str]) -> dict:
+        """Runs the full chain of one job in its own workspace, in a worker process.
+
+        Args:
+            job (Tuple[str, str, str]): Job as (dataset, variable, period).
+
+        Returns:
+            dict: Outcome of the job.
+        """
+        dataset, variable, period = job
+        point_feature_class = str(dataset).format(period=period)
+        name = (
+            f"{os.path.splitext(os.path.basename(point_feature_class))[0]}_{variable}"
+        )
+
+        # Isolated Workspace & Log of the Job
+        workspace = os.path.join(self.output_directory, name)
+        os.makedirs(workspace, exist_ok=True)
+
+        output_geodatabase = None
+
+        if self.engine == "ARCPY":
+            output_geodatabase = os.path.join(workspace, f"{name}.gdb")
+
+            if not arcpy.Exists(output_geodatabase):
+                arcpy.management.CreateFileGDB(workspace, f"{name}.gdb")
+
+            arcpy.env.scratchWorkspace = workspace
+
+        log = os.path.join(workspace, f"{name}.log")
+        result = {
+            "dataset": point_feature_class,
+            "variable": variable,
+            "period": period,
+            "status": "OK",
+            "error": None,
+            "rmse": None,
+            "workspace": workspace,
+            "log": log,
+            **{f"{stage}_seconds": None for stage in STAGES},
+        }
+
+        start = time.perf_counter()
+
+        with open(log, "w") as f, contextlib.redirect_stdout(f):
+            try:
+                pipeline = Pipeline(
+                    point_feature_class,
+                    workspace,
+                    output_geodatabase,
+                    variable,
+                    engine=self.engine,
+                    cell_size=self.cell_size,
+                    crs=self.crs,
+                    name=name,
+                )
+
+                # Interpolate
+                stage = time.perf_counter()
+                pipeline.run_exploratory_interpolation()
+                result["interpolate_seconds"] = time.perf_counter() - stage
+
+                # Point Accuracy
+                stage = time.perf_counter()
+
+                if self.engine == "NATIVE":
+                    pipeline.create_point_accuracy_layer(self.accuracy_source)
+                    result["rmse"] = pipeline.point_accuracy_stats["rmse"]
+                else:
+                    pipeline.create_point_accuracy_layer()
+
+                result["accuracy_seconds"] = time.perf_counter() - stage
+
+                # Aggregate to H3
+                stage = time.perf_counter()
+                pipeline.convert_results_to_hex(res=self.res, min_res=self.min_res)
+                result["hexagons_seconds"] = time.perf_counter() - stage
+
+                # Export
+                stage = time.perf_counter()
+
+                if self.sde_path is not None:
+                    pipeline.export_to_sde(self.sde_path, "TESSELLATION")
+                    pipeline.export_to_sde(self.sde_path, "POINT_ACCURACY")
+
+                if self.loader_factory is not None:
+                    loader = self.loader_factory()
+                    pipeline.export_to_postgis(loader, "TESSELLATION")
+                    pipeline.export_to_postgis(loader, "POINT_ACCURACY")
+
+                if self.surface_directory is not None:
+                    pipeline.export_surface(self.surface_directory)
+
+                result["export_seconds"] = time.perf_counter() - stage
+
+            except Exception:
+                result["status"] = "FAILED"
+                result["error"] = traceback.format_exc()
+
+                # Keep Traceback with the Rest of the Log
+                print(result["error"])
+
+        result["seconds"] = time.perf_counter() - start
+
+        return result
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# On-Disk Cache of API Responses
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import time
+import hashlib
+import tempfile
+
+# For Type Annotations
+from os import PathLike
+
+
+class ResponseCache:
+    """
+    A class used to cache API response bodies on disk, with a time to live and a size cap.
+
+    Bodies are stored once under the SHA-256 of their content, and each request key points to the
+    body it last returned, so identical responses (e.g. months without new data) share one file.
+    When the cache grows past its cap, the least recently used bodies are removed first.
+
+    Methods
+    -------
+    get(key)
+        Returns the cached body of a request, or None if it is missing or expired.
+    put(key, body)
+        Stores the body of a request.
+    clear()
+        Removes every cached body.
+
+    Example
+    -------
+    > cache = ResponseCache(r"cache_dir", ttl=6 * 3600, max_bytes=512 * 1024 * 1024)
+    > body = cache.get(url)
+    """
+
+    def __init__(
+        self, directory: PathLike, ttl: float = 86400, max_bytes: int = 512 * 1024**2
+    ) -> None:
+        """Instantiates the ResponseCache class.
+
+        Args:
+            directory (PathLike): Directory that holds the cache.
+            ttl (float, optional): Seconds a response stays fresh. Defaults to 86400 (one day).
+            max_bytes (int, optional): Maximum total size of cached bodies. Defaults to 512 MB.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._keys = os.path.join(directory, "keys")
+        self._objects = os.path.join(directory, "objects")
+
+        os.makedirs(self._keys, exist_ok=True)
+        os.makedirs(self._objects, exist_ok=True)
+
+    def get(self, key: str) -> bytes:
+        """Returns the cached body of a request, or None if it is missing or expired.
+
+        Args:
+            key (str): Request key, e.g. its URL.
+
+        Returns:
+            bytes: Cached body, or None.
+        """
+        key_path = self._key_path(key)
+
+        try:
+            # Expired Keys are Misses, the Body May Still be Shared by Others
+            if time.time() - os.path.getmtime(key_path) > self.ttl:
+                return None
+
+            with open(key_path) as f:
+                object_path = os.path.join(self._objects, f.read().strip())
+
+            with open(object_path, "rb") as f:
+                body = f.read()
+
+        except FileNotFoundError:
+            return None
+
+        # Mark Body as Recently Used
+        os.utime(object_path)
+
+        return body
+
+    def put(self, key: str, body: bytes) -> None:
+        """Stores the body of a request, then trims the cache to its size cap.
+
+        Args:
+            key (str): Request key, e.g. its URL.
+            body (bytes): Response body.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = os.path.join(self._objects, digest)
+
+        # Content Already Stored Only Needs Touching
+        if os.path.exists(object_path):
+            os.utime(object_path)
+        else:
+            self._write(object_path, body)
+
+        self._write(self._key_path(key), digest.encode("ascii"))
+        self._trim()
+
+    def clear(self) -> None:
+        """Removes every cached body."""
+        for folder in [self._keys, self._objects]:
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+
+    def _key_path(self, key: str) -> str:
+        """Returns the path of the file that points a request key to its body."""
+        return os.path.join(self._keys, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _trim(self) -> None:
+        """Removes least recently used bodies until the cache is within its size cap."""
+        entries = []
+
+        for name in os.listdir(self._objects):
+            try:
+                stat = os.stat(os.path.join(self._objects, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            except FileNotFoundError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+
+        # Keys Pointing to Removed Bodies Become Misses
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(os.path.join(self._objects, name))
+                total -= size
+
+            except FileNotFoundError:
+                continue
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        """Writes a file atomically, so readers never see a partial file."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp, path)
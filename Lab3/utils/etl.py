@@ -6,15 +6,161 @@
 # 2023-04-06
 #
 
+import numpy as np
 import pandas as pd
+import json
+import itertools
 import requests
-import arcpy
-import arcgis
+import threading
+import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import ResponseCache
+from utils.incremental import IncrementalAggregate
+from utils.storage import WeatherStore
+from utils.outliers import spatial_outliers
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ArcGIS is Only Needed to Load Results
+try:
+    import arcpy
+    import arcgis
+except ImportError:
+    arcpy = arcgis = None
+
+# orjson is Optional, Decodes Responses Faster than the Standard Library
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # For Type Annotations
+from typing import Iterable, Iterator, List
 from os import PathLike
 from pandas import DataFrame, Series
+from requests import Session
+
+# Properties Kept from Each Daily Observation
+PROPERTIES = ["station", "date", "max_tmpf", "min_tmpf", "precip", "name"]
+NUMERIC_PROPERTIES = ["max_tmpf", "min_tmpf", "precip"]
+
+# Ways Spatial Outliers are Handled in QAQC
+OUTLIER_OPTIONS = ["FLAG", "DROP"]
+
+# Daily Observations Endpoint of the Iowa Environmental Mesonet
+BASE_URL = "https://mesonet.agron.iastate.edu/api/1/daily.geojson"
+
+# Responses that are Retried with Backoff
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+def make_session(
+    pool_size: int = 8,
+    retries: int = 3,
+    backoff: float = 0.5,
+    limiter: "RateLimiter" = None,
+) -> Session:
+    """Creates an HTTP session that keeps connections alive and retries failed requests with backoff.
+
+    Args:
+        pool_size (int, optional): Number of keep-alive connections per host. Defaults to 8.
+        retries (int, optional): Number of retries of a failed request. Defaults to 3.
+        backoff (float, optional): Backoff factor, retries wait backoff * 2^(n - 1) seconds. Defaults to 0.5.
+        limiter (RateLimiter, optional): Rate limiter that every retry also waits for. Defaults to None.
+
+    Returns:
+        Session: The session.
+    """
+    retry = LimitedRetry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        limiter=limiter,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+class LimitedRetry(Retry):
+    """
+    A class used to retry failed requests like Retry, waiting for a RateLimiter before every retry so
+    that retries count against the same rate as first attempts.
+
+    Methods
+    -------
+    new(**kwargs)
+        Returns the retry state of the next attempt, keeping the limiter.
+    sleep(response)
+        Waits for the backoff, then for the limiter.
+    """
+
+    def __init__(self, *args, limiter: "RateLimiter" = None, **kwargs) -> None:
+        """Instantiates the LimitedRetry class.
+
+        Args:
+            limiter (RateLimiter, optional): Rate limiter that every retry waits for. Defaults to None.
+            *args, **kwargs: Arguments passed to Retry.
+        """
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def new(self, **kwargs) -> "LimitedRetry":
+        """Returns the retry state of the next attempt, keeping the limiter."""
+        retry = super().new(**kwargs)
+        retry.limiter = self.limiter
+
+        return retry
+
+    def sleep(self, response=None) -> None:
+        """Waits for the backoff, or Retry-After, then for the limiter."""
+        super().sleep(response)
+
+        if self.limiter is not None:
+            self.limiter.wait()
+
+
+class RateLimiter:
+    """
+    A class used to space requests shared by several threads to a maximum rate.
+
+    Methods
+    -------
+    wait()
+        Blocks until the next request may be sent.
+    """
+
+    def __init__(self, rate: float = None) -> None:
+        """Instantiates the RateLimiter class.
+
+        Args:
+            rate (float, optional): Maximum requests per second. Defaults to None (no limit).
+        """
+        self.interval = 0.0 if not rate else 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Blocks until the next request may be sent."""
+        if not self.interval:
+            return
+
+        # Reserve Next Slot, then Sleep Outside the Lock
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+
+        time.sleep(max(0.0, slot - now))
 
 
 class WeatherLoader:
@@ -23,16 +169,32 @@ class WeatherLoader:
 
     Methods
     -------
-    extract()
+    extract(fast)
         Runs the extraction process for the data and returns as either JSON or DataFrame.
+    _fetch(url)
+        Private method. Requests one response, or reads it from the cache, and returns its features.
+    _skip_ingested(df)
+        Private method. Drops observations that were already ingested, if the loader is incremental.
+    _months()
+        Private method. Lists the months covered by the loader.
+    _parse_features(features)
+        Static, private method. Builds typed columns from GeoJSON features directly.
     _extractColumn(field)
         Static, private method. Used for converting JSON to DataFrame.
-    transform()
+    transform(outliers)
         Performs QAQC Process on DataFrame.
-    aggregate()
+    transform_chunks(chunks, outliers)
+        Performs QAQC Process on batches of observations.
+    _qaqc(df, outliers)
+        Static, private method. Applies every QAQC rule as one boolean mask.
+    aggregate(chunks)
         Aggregates and calculates average values for stations.
+    persist(store)
+        Writes daily observations to a partitioned Parquet dataset.
     load()
         Loads to geodatabase.
+    publish(loader)
+        Publishes to PostGIS with bulk COPY, without ArcGIS.
 
     Example
     -------
@@ -43,37 +205,80 @@ class WeatherLoader:
     > weather_etl.load()
     """
 
-    def __init__(self, geodatabase: PathLike, month=1, year=2023):
+    def __init__(
+        self,
+        geodatabase: PathLike,
+        month=1,
+        year=2023,
+        network: str = "MN_RWIS",
+        base_url: str = BASE_URL,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache: ResponseCache = None,
+        state_path: PathLike = None,
+    ):
         """Instantiates the WeatherLoader class.
 
         Args:
             geodatabase (PathLike): Path to the geodatabse that will be used to store outputs.
             month (int, optional): Month that data will be queried for. Defaults to 1.
             year (int, optional): Year that data will be queried for. Defaults to 2023.
+            network (str, optional): Mesonet network that will be queried. Defaults to "MN_RWIS".
+            base_url (str, optional): URL of the daily GeoJSON endpoint, e.g. a local test server. Defaults to BASE_URL.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 30.
+            retries (int, optional): Number of retries of a failed request. Defaults to 3.
+            backoff (float, optional): Backoff factor between retries, in seconds. Defaults to 0.5.
+            cache (ResponseCache, optional): On-disk cache of API responses. Defaults to None.
+            state_path (PathLike, optional): CSV of running sums & last ingested dates. If given, only days
+                after the checkpoint of each station are processed and merged into the running means. Defaults to None.
         """
         self.geodatabase = geodatabase
         self.month = month
         self.year = year
+        self.network = network
+        self.base_url = base_url
+        self.timeout = timeout
 
         self.fc = f"aggMthWX_{self.month}{self.year}"
 
         # Set Base URL
-        self.url = r"https://mesonet.agron.iastate.edu/api/1/daily.geojson?network=MN_RWIS&month=_M_&year=_Y_".replace(
-            "_M_", str(self.month)
-        ).replace(
-            "_Y_", str(self.year)
+        self.url = self._month_url(network, month, year)
+
+        # Keep-Alive Session with Retries
+        self.session = make_session(retries=retries, backoff=backoff)
+
+        # Response Cache & Incremental State
+        self.cache = cache
+        self.incremental = (
+            IncrementalAggregate(state_path) if state_path is not None else None
         )
 
-    def extract(self) -> DataFrame:
+    def _month_url(self, network: str, month: int, year: int) -> str:
+        """Builds the URL of one month of one network."""
+        return f"{self.base_url}?network={network}&month={month}&year={year}"
+
+    def extract(self, fast: bool = True) -> DataFrame:
         """Extracts data from API and performs miminal cleaning to return as a DataFrame.
 
+        Args:
+            fast (bool, optional): Parses features straight to final dtypes, rather than with
+                per-row lambdas over a DataFrame of dicts. Defaults to True.
+
         Returns:
             DataFrame: DataFrame containing raw data is returned.
         """
-        # Get Response & Convert to DF
-        response = requests.get(self.url)
-        json = response.json()["features"]
-        df_raw = pd.DataFrame.from_records(json)
+        # Get Response
+        features = self._fetch(self.url)
+
+        # Parse Features Directly to Typed Columns
+        if fast:
+            self.df = self._skip_ingested(self._parse_features(features))
+
+            return self.df
+
+        # Convert to DF
+        df_raw = pd.DataFrame.from_records(features)
 
         # Series Conversion from Dicts to Actual Vals
         desiredSeries = ["station", "date", "max_tmpf", "min_tmpf", "precip", "name"]
@@ -86,13 +291,100 @@ class WeatherLoader:
         df_raw["y"] = df_raw["geometry"].apply(lambda x: dict(x)["coordinates"][1])
 
         # Copy Useful Columns to new DF
-        self.df = df_raw[
-            ["station", "date", "max_tmpf", "min_tmpf", "precip", "name", "x", "y"]
-        ].copy()
+        self.df = self._skip_ingested(
+            df_raw[
+                ["station", "date", "max_tmpf", "min_tmpf", "precip", "name", "x", "y"]
+            ].copy()
+        )
 
         # Return DF
         return self.df
 
+    def _fetch(self, url: str) -> List[dict]:
+        """Requests one response and returns its features.
+
+        Args:
+            url (str): URL of the request.
+
+        Raises:
+            HTTPError: Raised if the request still fails after retries.
+
+        Returns:
+            List[dict]: GeoJSON features.
+        """
+        body = self.cache.get(url) if self.cache is not None else None
+
+        # Request if Not Cached
+        if body is None:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.content
+
+            if self.cache is not None:
+                self.cache.put(url, body)
+
+        # Decode with orjson if Installed
+        if orjson is not None:
+            return orjson.loads(body)["features"]
+
+        return json.loads(body)["features"]
+
+    def _skip_ingested(self, df: DataFrame) -> DataFrame:
+        """Drops observations that were already ingested, if the loader is incremental."""
+        if self.incremental is None:
+            return df
+
+        new = self.incremental.new_rows(df)
+
+        # Message
+        print(f"{len(new)} of {len(df)} observations are new since the last run")
+
+        return new
+
+    def _months(self) -> List[str]:
+        """Lists the months covered by the loader, as 'YYYY-MM'."""
+        return [f"{self.year}-{int(self.month):02d}"]
+
+    @staticmethod
+    def _parse_features(features: List[dict]) -> DataFrame:
+        """Builds typed columns from GeoJSON features directly, without an intermediate DataFrame of dicts.
+
+        Args:
+            features (List[dict]): Features of the daily GeoJSON response.
+
+        Returns:
+            DataFrame: DataFrame with the same columns as the per-row path, numeric columns as float64
+                and dates as datetime64.
+        """
+        # One Pass to Unwrap Features, then One List per Column
+        properties = [f["properties"] for f in features]
+        coordinates = [f["geometry"]["coordinates"] for f in features]
+
+        columns = {c: [p[c] for p in properties] for c in PROPERTIES}
+        columns["x"] = [xy[0] for xy in coordinates]
+        columns["y"] = [xy[1] for xy in coordinates]
+
+        # Convert Numeric Columns, None Becomes NaN
+        for c in NUMERIC_PROPERTIES + ["x", "y"]:
+            try:
+                columns[c] = np.array(columns[c], dtype=np.float64)
+
+            except (TypeError, ValueError):
+                columns[c] = pd.to_numeric(pd.Series(columns[c]), errors="coerce")
+
+        return pd.DataFrame(
+            {
+                "station": pd.Series(columns["station"], dtype=object),
+                "date": pd.to_datetime(pd.Series(columns["date"], dtype=object)),
+                "max_tmpf": columns["max_tmpf"],
+                "min_tmpf": columns["min_tmpf"],
+                "precip": columns["precip"],
+                "name": pd.Series(columns["name"], dtype=object),
+                "x": columns["x"],
+                "y": columns["y"],
+            }
+        )
+
     @staticmethod
     def _extractToCol(df: DataFrame, field: Series) -> None:
         """Function to extract fields from dicts that are columns in DF.
@@ -103,41 +395,136 @@ class WeatherLoader:
         """
         df[field] = df["properties"].apply(lambda x: dict(x)[field])
 
-    def transform(self) -> DataFrame:
+    def transform(self, outliers: str = None) -> DataFrame:
         """Transforms and performs QAQC on raw DataFrame to create cleaned DataFrame.
 
+        Args:
+            outliers (str, optional): Handling of values that disagree with neighbouring stations on the same day,
+                'FLAG' adds a boolean 'outlier' column and 'DROP' removes them. Defaults to None (not checked).
+
         Returns:
             DataFrame: DataFrame containing cleaned data is returned.
         """
-        # Fill NA Precip Values
-        self.df["precip"].fillna(0, inplace=True)
+        self.df = self._qaqc(self.df, outliers)
 
-        # Drop Rows where 'precip' < 0
-        self.df = self.df.loc[self.df["precip"] >= 0]
+        # Return DF
+        return self.df
 
-        # Drop Rows with Null 'Latitude' or 'Longitude'
-        self.df = self.df.dropna(subset=["x", "y", "max_tmpf", "min_tmpf"])
+    def transform_chunks(
+        self, chunks: Iterable[DataFrame], outliers: str = None
+    ) -> Iterator[DataFrame]:
+        """Performs QAQC on batches of raw observations, holding one batch in memory at a time.
 
-        # Convert Data Types
-        self.df["station"] = self.df["station"].astype(str)
-        self.df["name"] = self.df["name"].astype(str)
-        self.df["date"] = self.df["date"].astype("datetime64[ns]")
+        Spatial outliers are checked within each batch, so batches should hold whole days of a network.
 
-        # Drop Rows where Lat/Lon are Outside MN BBox
-        self.df = self.df.loc[self.df["x"] > -97.5]
-        self.df = self.df.loc[self.df["x"] < -89.0]
-        self.df = self.df.loc[self.df["y"] > 43.0]
-        self.df = self.df.loc[self.df["y"] < 49.5]
+        Args:
+            chunks (Iterable[DataFrame]): Batches of raw observations, e.g. from extract_chunks().
+            outliers (str, optional): 'FLAG' or 'DROP' spatial outliers. Defaults to None (not checked).
 
-        # Return DF
-        return self.df
+        Yields:
+            DataFrame: Cleaned batch.
+        """
+        for chunk in chunks:
+            yield self._qaqc(chunk, outliers)
+
+    @staticmethod
+    def _qaqc(df: DataFrame, outliers: str = None) -> DataFrame:
+        """Applies every QAQC rule as one boolean mask, so the raw data is only copied once.
+
+        Args:
+            df (DataFrame): Raw observations.
+            outliers (str, optional): 'FLAG' or 'DROP' spatial outliers. Defaults to None (not checked).
+
+        Raises:
+            ValueError: Raised if outliers is not a valid option.
+            TypeError: Raised if outliers is not of type str.
+
+        Returns:
+            DataFrame: Cleaned observations.
+        """
+        if outliers is not None and outliers not in OUTLIER_OPTIONS:
+            if type(outliers) == str:
+                raise ValueError(f"Param 'outliers' must be in {OUTLIER_OPTIONS}")
+            else:
+                raise TypeError(
+                    f"Param 'outliers' must be of type string and value of {OUTLIER_OPTIONS}"
+                )
+
+        # Missing Precip Counts as Zero
+        precip = df["precip"].fillna(0)
+
+        # Keep Rows with Non-Negative Precip, Values & Coordinates Inside MN BBox
+        mask = (
+            (precip >= 0)
+            & df["max_tmpf"].notna()
+            & df["min_tmpf"].notna()
+            & (df["x"] > -97.5)
+            & (df["x"] < -89.0)
+            & (df["y"] > 43.0)
+            & (df["y"] < 49.5)
+        )
+
+        df = df.loc[mask].copy()
+        df["precip"] = precip[mask]
+
+        # Convert Data Types on the Copy
+        df["station"] = df["station"].astype(str)
+        df["name"] = df["name"].astype(str)
+        df["date"] = df["date"].astype("datetime64[ns]")
+
+        # Compare Each Value to Neighbouring Stations on the Same Day
+        if outliers is not None:
+            flagged = spatial_outliers(df).any(axis=1)
 
-    def aggregate(self) -> DataFrame:
+            # Message
+            print(
+                f"{int(flagged.sum())} of {len(df)} observations are spatial outliers"
+            )
+
+            if outliers == "FLAG":
+                df["outlier"] = flagged
+            else:
+                df = df.loc[~flagged]
+
+        return df
+
+    def aggregate(self, chunks: Iterable[DataFrame] = None) -> DataFrame:
         """Aggregates daily values to monthly summary at each weather station.
 
+        Incremental loaders merge the new days into the running sums and return means over every
+        day ingested so far, without rereading earlier days.
+
+        Args:
+            chunks (Iterable[DataFrame], optional): Batches of cleaned observations, e.g. from transform_chunks(),
+                merged into running sums one at a time instead of aggregating self.df. Defaults to None.
+
         Returns:
             DataFrame: DataFrame containing aggregated data is returned.
         """
+        # Stream Batches into Running Sums
+        if chunks is not None:
+            sums = (
+                self.incremental
+                if self.incremental is not None
+                else IncrementalAggregate()
+            )
+
+            for chunk in chunks:
+                sums.update(chunk)
+
+            self.aggregated_df = sums.means(
+                self._months() if self.incremental is not None else None
+            )
+
+            return self.aggregated_df
+
+        # Merge New Days into Running Sums
+        if self.incremental is not None:
+            self.incremental.update(self.df)
+            self.aggregated_df = self.incremental.means(self._months())
+
+            return self.aggregated_df
+
         # Define Aggregate Functions
         agg_functions = {
             "station": "first",
@@ -157,6 +544,17 @@ class WeatherLoader:
         # Return DF
         return self.aggregated_df
 
+    def persist(self, store: WeatherStore) -> None:
+        """Writes the daily observations to a partitioned Parquet dataset, merged with the days already stored.
+
+        Args:
+            store (WeatherStore): Dataset the observations will be written to.
+        """
+        store.write(self.df)
+
+        # Message
+        print(f"{len(self.df)} observations written to: {store.root}")
+
     def load(self) -> None:
         """Loads aggregated data to feature class."""
         # Convert Weather Observations from DF to SEDF
@@ -166,3 +564,187 @@ class WeatherLoader:
         self.sedf.spatial.to_featureclass(
             location=os.path.join(self.geodatabase, self.fc)
         )
+
+    def publish(self, loader) -> None:
+        """Publishes aggregated data to PostGIS with bulk COPY and an atomic table swap, without ArcGIS.
+
+        Args:
+            loader (BulkLoader): Loader from the API's bulk module, bound to the database.
+        """
+        loader.publish(self.aggregated_df, self.fc, geometry=("x", "y"))
+
+
+class WeatherRangeLoader(WeatherLoader):
+    """
+    A class used to extract daily weather data for a range of months and several networks concurrently.
+
+    Every (network, month) combination is requested from a bounded thread pool over one keep-alive
+    session, so a multi-year backfill takes about as long as its slowest requests rather than their sum.
+    Transform, aggregate and load work as in WeatherLoader, over the combined data.
+
+    Methods
+    -------
+    combinations()
+        Lists the (network, month, year) combinations that will be requested.
+    extract()
+        Requests every combination concurrently and combines them in one DataFrame.
+    extract_chunks()
+        Requests every combination concurrently and yields them one at a time.
+    _extract_month(network, month, year)
+        Private method. Requests and parses one month of one network.
+    _months()
+        Private method. Lists the months covered by the loader.
+
+    Example
+    -------
+    > weather_etl = WeatherRangeLoader(r"out_gdb_path", "2021-01", "2022-12", ["MN_RWIS", "MN_ASOS"])
+    > raw_df = weather_etl.extract()
+    > transformed_df = weather_etl.transform()
+    > aggregated_df = weather_etl.aggregate()
+
+    Or, for long ranges in bounded memory:
+
+    > aggregated_df = weather_etl.aggregate(weather_etl.transform_chunks(weather_etl.extract_chunks()))
+    """
+
+    def __init__(
+        self,
+        geodatabase: PathLike,
+        start: str,
+        end: str,
+        networks: List[str] = None,
+        workers: int = 8,
+        rate: float = None,
+        base_url: str = BASE_URL,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache: ResponseCache = None,
+        state_path: PathLike = None,
+    ):
+        """Instantiates the WeatherRangeLoader class.
+
+        Args:
+            geodatabase (PathLike): Path to the geodatabse that will be used to store outputs.
+            start (str): First month that will be queried, as 'YYYY-MM'.
+            end (str): Last month that will be queried, as 'YYYY-MM'.
+            networks (List[str], optional): Mesonet networks that will be queried. Defaults to ["MN_RWIS"].
+            workers (int, optional): Maximum number of concurrent requests. Defaults to 8.
+            rate (float, optional): Maximum requests per second. Defaults to None (no limit).
+            base_url (str, optional): URL of the daily GeoJSON endpoint, e.g. a local test server. Defaults to BASE_URL.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 30.
+            retries (int, optional): Number of retries of a failed request. Defaults to 3.
+            backoff (float, optional): Backoff factor between retries, in seconds. Defaults to 0.5.
+            cache (ResponseCache, optional): On-disk cache of API responses. Defaults to None.
+            state_path (PathLike, optional): CSV of running sums & last ingested dates. Defaults to None.
+
+        Raises:
+            ValueError: Raised if start is after end.
+        """
+        self.start = pd.Period(start, freq="M")
+        self.end = pd.Period(end, freq="M")
+
+        if self.start > self.end:
+            raise ValueError("Param 'start' must not be after 'end'")
+
+        networks = ["MN_RWIS"] if networks is None else list(networks)
+
+        super().__init__(
+            geodatabase,
+            self.start.month,
+            self.start.year,
+            networks[0],
+            base_url,
+            timeout,
+            retries,
+            backoff,
+            cache,
+            state_path,
+        )
+
+        self.networks = networks
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+
+        self.fc = f"aggMthWX_{self.start.strftime('%Y%m')}_{self.end.strftime('%Y%m')}"
+
+        # Connection Pool Sized to the Thread Pool, Retries are Rate Limited Too
+        self.session = make_session(workers, retries, backoff, self.limiter)
+
+    def combinations(self) -> List[tuple]:
+        """Lists the (network, month, year) combinations that will be requested.
+
+        Returns:
+            List[tuple]: Combinations, by network and then by month.
+        """
+        months = pd.period_range(self.start, self.end, freq="M")
+
+        return [(n, m.month, m.year) for n in self.networks for m in months]
+
+    def extract(self) -> DataFrame:
+        """Requests every (network, month) combination concurrently and combines them in one DataFrame.
+
+        Raises:
+            HTTPError: Raised if a request still fails after retries.
+
+        Returns:
+            DataFrame: DataFrame containing raw data is returned, with a 'network' column.
+        """
+        with ThreadPoolExecutor(self.workers) as executor:
+            frames = list(
+                executor.map(lambda c: self._extract_month(*c), self.combinations())
+            )
+
+        self.df = self._skip_ingested(pd.concat(frames, ignore_index=True))
+
+        # Message
+        print(f"Extracted {len(self.df)} observations from {len(frames)} requests")
+
+        return self.df
+
+    def extract_chunks(self) -> Iterator[DataFrame]:
+        """Requests every (network, month) combination concurrently and yields them one at a time.
+
+        At most 'workers' responses are held at once, so ranges of any length stream in bounded memory.
+
+        Yields:
+            DataFrame: Raw data of one month of one network, in request order.
+        """
+        combinations = iter(self.combinations())
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            # Keep a Window of Requests in Flight
+            pending = [
+                executor.submit(self._extract_month, *c)
+                for _, c in zip(range(self.workers), combinations)
+            ]
+
+            while pending:
+                chunk = pending.pop(0).result()
+
+                for c in itertools.islice(combinations, 1):
+                    pending.append(executor.submit(self._extract_month, *c))
+
+                yield self._skip_ingested(chunk)
+
+    def _months(self) -> List[str]:
+        """Lists the months covered by the loader, as 'YYYY-MM'."""
+        return [str(m) for m in pd.period_range(self.start, self.end, freq="M")]
+
+    def _extract_month(self, network: str, month: int, year: int) -> DataFrame:
+        """Requests and parses one month of one network.
+
+        Args:
+            network (str): Mesonet network.
+            month (int): Month.
+            year (int): Year.
+
+        Returns:
+            DataFrame: Raw data of the month.
+        """
+        self.limiter.wait()
+
+        df = self._parse_features(self._fetch(self._month_url(network, month, year)))
+        df["network"] = network
+
+        return df
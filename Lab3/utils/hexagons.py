@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+#
+# Native H3 Aggregation
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+import pandas as pd
+import h3.api.basic_int as h3
+
+# For Type Annotations
+from numpy import ndarray
+from pandas import DataFrame
+
+
+def to_wgs84(x: ndarray, y: ndarray, crs: int) -> tuple:
+    """Transforms coordinates to longitude/latitude, as H3 requires.
+
+    Args:
+        x (ndarray): X coordinates.
+        y (ndarray): Y coordinates.
+        crs (int): EPSG code of the coordinates.
+
+    Returns:
+        tuple: Longitudes and latitudes.
+    """
+    if crs == 4326:
+        return np.asarray(x), np.asarray(y)
+
+    # Only Needed for Projected Inputs
+    from pyproj import Transformer
+
+    transformer = Transformer.from_crs(crs, 4326, always_xy=True)
+    return transformer.transform(x, y)
+
+
+def cells_for_points(lng: ndarray, lat: ndarray, res: int) -> ndarray:
+    """Assigns points to the H3 cells that contain them.
+
+    Args:
+        lng (ndarray): Longitudes of the points.
+        lat (ndarray): Latitudes of the points.
+        res (int): H3 resolution.
+
+    Returns:
+        ndarray: H3 index of each point, as uint64.
+    """
+    # Plain Floats are Faster to Pass to H3 than NumPy Scalars
+    lat, lng = np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+
+    return np.fromiter(
+        (h3.latlng_to_cell(a, b, res) for a, b in zip(lat.tolist(), lng.tolist())),
+        dtype=np.uint64,
+        count=len(lat),
+    )
+
+
+def cells_for_grid(lng: ndarray, lat: ndarray, ncols: int, res: int) -> ndarray:
+    """Assigns the cells of a regular grid to the H3 cells that contain them.
+
+    When grid cells are smaller than H3 cells, only every k-th column is looked up, with k about the
+    square root of the grid cells per H3 cell width. Spans whose two sampled ends fall in the same H3
+    cell are filled in one vectorized step, and only spans that cross a cell edge are looked up point
+    by point, so H3 is called for a fraction of the grid.
+
+    Args:
+        lng (ndarray): Longitudes of the grid cells, flattened in row-major order.
+        lat (ndarray): Latitudes of the grid cells, flattened in row-major order.
+        ncols (int): Number of columns of the grid.
+        res (int): H3 resolution.
+
+    Returns:
+        ndarray: H3 index of each grid cell, as uint64.
+    """
+    lng = np.asarray(lng, dtype=np.float64).reshape(-1, ncols)
+    lat = np.asarray(lat, dtype=np.float64).reshape(-1, ncols)
+    nrows = lng.shape[0]
+
+    # Grid Cells per H3 Cell Width, Measured along the Middle Row
+    stride = 1
+
+    if ncols > 2 and nrows > 0:
+        row = nrows // 2
+        step_km = h3.great_circle_distance(
+            (lat[row, 0], lng[row, 0]), (lat[row, 1], lng[row, 1]), unit="km"
+        )
+        width_km = np.sqrt(3) * h3.average_hexagon_edge_length(res, unit="km")
+
+        if step_km > 0:
+            stride = max(1, int(np.sqrt(width_km / step_km)))
+
+    if stride == 1:
+        return cells_for_points(lng.ravel(), lat.ravel(), res)
+
+    # Look Up Sampled Columns, Always Including the Last
+    sampled = np.unique(np.append(np.arange(0, ncols, stride), ncols - 1))
+    sample_cells = cells_for_points(
+        lng[:, sampled].ravel(), lat[:, sampled].ravel(), res
+    ).reshape(nrows, len(sampled))
+
+    cells = np.zeros((nrows, ncols), dtype=np.uint64)
+    cells[:, sampled] = sample_cells
+
+    # Fill Columns between Samples that Share a Cell
+    between = np.setdiff1d(np.arange(ncols), sampled)
+    span = np.searchsorted(sampled, between) - 1
+    same = (sample_cells[:, :-1] == sample_cells[:, 1:])[:, span]
+
+    cells[:, between] = np.where(same, sample_cells[:, span], 0)
+
+    # Look Up Columns of Spans that Cross a Cell Edge
+    rows, columns = np.nonzero(~same)
+    columns = between[columns]
+    cells[rows, columns] = cells_for_points(lng[rows, columns], lat[rows, columns], res)
+
+    return cells.ravel()
+
+
+def cell_parents(cells: ndarray, res: int) -> ndarray:
+    """Returns the parents of H3 cells at a coarser resolution, with bit operations on all cells at once.
+
+    An H3 index stores its resolution in bits 52-55 and one 3-bit digit per resolution below it, so
+    the parent sets the resolution and marks the digits finer than it as unused (7).
+
+    Args:
+        cells (ndarray): H3 indexes, all at a resolution finer than or equal to res.
+        res (int): Resolution of the parents.
+
+    Returns:
+        ndarray: Parent of each cell, as uint64.
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+
+    # Digits of Resolutions res+1..15 Occupy the Lowest 3 * (15 - res) Bits
+    unused = np.uint64((1 << (3 * (15 - res))) - 1)
+    resolution = np.uint64(0xF << 52)
+
+    return (cells & ~resolution) | np.uint64(res << 52) | unused
+
+
+def aggregate_cells(cells: ndarray, values: ndarray) -> DataFrame:
+    """Computes additive statistics of values per H3 cell with a NumPy group-by.
+
+    Args:
+        cells (ndarray): H3 index of each value.
+        values (ndarray): Values that will be summarized.
+
+    Returns:
+        DataFrame: One row per occupied cell with h3, count, sum, min, max and mean.
+    """
+    return _group_statistics(
+        cells, np.ones(len(cells), dtype=np.int64), values, values, values
+    )
+
+
+def rollup(df: DataFrame, res: int) -> DataFrame:
+    """Rolls H3 statistics up to the parent cells at a coarser resolution.
+
+    Counts and sums are added, minimums and maximums are combined, so parents are exact without
+    going back to the values that were aggregated. Parents follow the H3 hierarchy, whose coarse cells
+    only approximately cover their children.
+
+    Args:
+        df (DataFrame): Statistics from aggregate_to_h3() or rollup() at a finer resolution.
+        res (int): Resolution of the parent cells.
+
+    Returns:
+        DataFrame: Statistics of the parent cells, with the same columns.
+    """
+    parents = cell_parents(df["h3"].to_numpy(), res)
+
+    parent_df = _group_statistics(
+        parents,
+        df["count"].to_numpy(),
+        df["sum"].to_numpy(),
+        df["min"].to_numpy(),
+        df["max"].to_numpy(),
+    )
+
+    return _add_rate(parent_df, res)
+
+
+def build_pyramid(df: DataFrame, min_res: int, res: int = None) -> DataFrame:
+    """Builds every coarser level of an H3 aggregation down to min_res, each from the level below it.
+
+    Args:
+        df (DataFrame): Statistics from aggregate_to_h3() at the finest resolution.
+        min_res (int): Coarsest resolution of the pyramid.
+        res (int, optional): Resolution of df. Defaults to None (read from its 'res' column).
+
+    Raises:
+        ValueError: Raised if min_res is finer than the resolution of df, or if df is empty and res is not given.
+
+    Returns:
+        DataFrame: All levels stacked, finest first, told apart by the 'res' column.
+    """
+    if res is None:
+        if df.empty:
+            raise ValueError("Param 'res' is required when there are no cells")
+
+        res = int(df["res"].iloc[0])
+
+    finest = res
+
+    if min_res > finest:
+        raise ValueError(f"Param 'min_res' must be at most {finest}")
+
+    # Nothing to Roll Up, e.g. a Surface without Predictions
+    if df.empty:
+        return df
+
+    levels = [df]
+
+    for res in range(finest - 1, min_res - 1, -1):
+        levels.append(rollup(levels[-1], res))
+
+    return pd.concat(levels, ignore_index=True)
+
+
+def aggregate_to_h3(
+    lng: ndarray, lat: ndarray, values: ndarray, res: int, ncols: int = None
+) -> DataFrame:
+    """Aggregates point values to the H3 cells that contain them.
+
+    Args:
+        lng (ndarray): Longitudes of the points.
+        lat (ndarray): Latitudes of the points.
+        values (ndarray): Values at the points, NaN values are skipped.
+        res (int): H3 resolution.
+        ncols (int, optional): Number of columns if the points are the cells of a regular grid, in
+            row-major order, so cells_for_grid() can be used. Defaults to None (scattered points).
+
+    Returns:
+        DataFrame: One row per occupied cell with h3, count, sum, min, max, mean and rate
+            (points per square kilometre).
+    """
+    lng, lat, values = np.asarray(lng), np.asarray(lat), np.asarray(values, float)
+
+    # Assign Cells, Before Filtering so a Grid Keeps its Rows
+    if ncols is not None:
+        cells = cells_for_grid(lng, lat, ncols, res)
+    else:
+        cells = cells_for_points(lng, lat, res)
+
+    # Skip Missing Predictions & Summarize
+    valid = np.isfinite(values)
+    df = aggregate_cells(cells[valid], values[valid])
+
+    return _add_rate(df, res)
+
+
+def cell_areas(cells: ndarray) -> ndarray:
+    """Returns the area of H3 cells in square kilometres.
+
+    Args:
+        cells (ndarray): H3 indexes.
+
+    Returns:
+        ndarray: Cell areas.
+    """
+    return np.array([h3.cell_area(int(c), "km^2") for c in cells])
+
+
+def cell_polygons(cells: ndarray) -> list:
+    """Builds WKT polygons of H3 cells, in longitude/latitude.
+
+    Args:
+        cells (ndarray): H3 indexes.
+
+    Returns:
+        list: WKT polygon of each cell.
+    """
+    polygons = []
+
+    for cell in cells:
+        # Boundary is (lat, lng), WKT is (x y), Closed Ring
+        ring = [(lng, lat) for lat, lng in h3.cell_to_boundary(int(cell))]
+        ring.append(ring[0])
+        polygons.append("POLYGON((" + ", ".join(f"{x} {y}" for x, y in ring) + "))")
+
+    return polygons
+
+
+def cell_strings(cells: ndarray) -> list:
+    """Converts H3 indexes to their hexadecimal string form.
+
+    Args:
+        cells (ndarray): H3 indexes.
+
+    Returns:
+        list: H3 index strings.
+    """
+    return [h3.int_to_str(int(c)) for c in cells]
+
+
+def _group_statistics(
+    cells: ndarray, count: ndarray, total: ndarray, low: ndarray, high: ndarray
+) -> DataFrame:
+    """Combines partial statistics that share an H3 cell.
+
+    Args:
+        cells (ndarray): H3 index of each partial.
+        count (ndarray): Count of each partial.
+        total (ndarray): Sum of each partial.
+        low (ndarray): Minimum of each partial.
+        high (ndarray): Maximum of each partial.
+
+    Returns:
+        DataFrame: One row per cell with h3, count, sum, min, max and mean.
+    """
+    # Group by Cell, Sorted so Groups are Contiguous
+    unique, inverse = np.unique(cells, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.searchsorted(inverse[order], np.arange(len(unique)))
+
+    cell_count = np.bincount(inverse, weights=count, minlength=len(unique))
+    cell_total = np.bincount(inverse, weights=total, minlength=len(unique))
+
+    return pd.DataFrame(
+        {
+            "h3": unique,
+            "count": cell_count.astype(np.int64),
+            "sum": cell_total,
+            "min": np.minimum.reduceat(low[order], starts),
+            "max": np.maximum.reduceat(high[order], starts),
+            "mean": cell_total / cell_count,
+        }
+    )
+
+
+def _add_rate(df: DataFrame, res: int) -> DataFrame:
+    """Adds the 'res' column and the 'rate' column (points per square kilometre)."""
+    df["rate"] = df["count"] / cell_areas(df["h3"])
+    df.insert(1, "res", res)
+
+    return df
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# Native Inverse Distance Weighting Interpolation
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# For Type Annotations
+from numpy import ndarray
+from utils.grid import Grid
+
+
+class IDWInterpolator:
+    """
+    A class used to interpolate values with inverse distance weighting, without arcpy.
+
+    Neighbours are found with a KD-tree, and weights are computed in vectorized form over blocks of
+    prediction locations, so memory stays bounded for any grid size.
+
+    Methods
+    -------
+    fit(x, y, values)
+        Builds the KD-tree over the known points.
+    predict(x, y)
+        Predicts values at arbitrary locations.
+    predict_grid(grid)
+        Predicts values at every cell of a grid.
+    predict_from_neighbours(locations, distances, index)
+        Predicts from precomputed neighbours.
+
+    Example
+    -------
+    > idw = IDWInterpolator(power=2, neighbors=12)
+    > idw.fit(x, y, values)
+    > surface = idw.predict_grid(Grid.from_points(x, y))
+    """
+
+    method = "IDW"
+
+    def __init__(
+        self,
+        power: float = 2.0,
+        neighbors: int = 12,
+        radius: float = None,
+        block_size: int = 65536,
+    ) -> None:
+        """Instantiates the IDWInterpolator class.
+
+        Args:
+            power (float, optional): Power that distances are raised to in the weights. Defaults to 2.0.
+            neighbors (int, optional): Number of nearest neighbours used for each prediction. Defaults to 12.
+            radius (float, optional): Maximum distance of a neighbour. Defaults to None (no limit).
+            block_size (int, optional): Number of locations predicted per vectorized block. Defaults to 65536.
+        """
+        self.power = power
+        self.neighbors = neighbors
+        self.radius = radius
+        self.block_size = block_size
+
+    @property
+    def params(self) -> dict:
+        """Tunable parameters of the interpolator."""
+        return {"power": self.power, "neighbors": self.neighbors, "radius": self.radius}
+
+    def fit(self, x: ndarray, y: ndarray, values: ndarray):
+        """Builds the KD-tree over the known points.
+
+        Args:
+            x (ndarray): X coordinates of the known points.
+            y (ndarray): Y coordinates of the known points.
+            values (ndarray): Values at the known points.
+
+        Returns:
+            IDWInterpolator: The fitted interpolator.
+        """
+        self.points = np.column_stack([x, y]).astype(np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.tree = cKDTree(self.points)
+
+        return self
+
+    def predict(self, x: ndarray, y: ndarray) -> ndarray:
+        """Predicts values at arbitrary locations, block by block.
+
+        Args:
+            x (ndarray): X coordinates of the prediction locations.
+            y (ndarray): Y coordinates of the prediction locations.
+
+        Returns:
+            ndarray: Predicted values, NaN where no neighbour is within the radius.
+        """
+        locations = np.column_stack([np.ravel(x), np.ravel(y)])
+        out = np.empty(len(locations))
+
+        for start in range(0, len(locations), self.block_size):
+            block = slice(start, start + self.block_size)
+            out[block] = self._predict_block(locations[block])
+
+        return out
+
+    def predict_grid(self, grid: Grid) -> ndarray:
+        """Predicts values at every cell of a grid.
+
+        Args:
+            grid (Grid): Prediction grid.
+
+        Returns:
+            ndarray: Predicted surface with shape (nrows, ncols).
+        """
+        surface = np.empty(grid.shape)
+
+        for rows in grid.blocks(self.block_size):
+            surface[rows] = self.predict(*grid.coordinates(rows)).reshape(
+                -1, grid.ncols
+            )
+
+        return surface
+
+    def predict_from_neighbours(
+        self, locations: ndarray, distances: ndarray, index: ndarray
+    ) -> ndarray:
+        """Predicts from precomputed neighbours, e.g. queried once and reused across cross-validation folds.
+
+        Args:
+            locations (ndarray): (n, 2) array of prediction locations.
+            distances (ndarray): (n, >=k) distances to neighbours, sorted ascending, infinite where missing.
+            index (ndarray): (n, >=k) indexes of neighbours, len(values) where missing.
+
+        Returns:
+            ndarray: Predicted values.
+        """
+        distances = distances[:, : self.neighbors]
+        index = index[:, : self.neighbors]
+
+        # Apply Search Radius
+        if self.radius is not None:
+            distances = np.where(distances <= self.radius, distances, np.inf)
+
+        return self._weighted_mean(distances, index, self.values)
+
+    def _predict_block(self, locations: ndarray) -> ndarray:
+        """Predicts one block of locations from its k nearest neighbours.
+
+        Args:
+            locations (ndarray): (n, 2) array of prediction locations.
+
+        Returns:
+            ndarray: Predicted values.
+        """
+        k = min(self.neighbors, len(self.values))
+        upper_bound = np.inf if self.radius is None else self.radius
+
+        # Query Neighbours, Missing Neighbours have Infinite Distance
+        distances, index = self.tree.query(
+            locations, k=k, distance_upper_bound=upper_bound
+        )
+        distances = distances.reshape(len(locations), k)
+        index = index.reshape(len(locations), k)
+
+        return self._weighted_mean(distances, index, self.values)
+
+    def _weighted_mean(
+        self, distances: ndarray, index: ndarray, values: ndarray
+    ) -> ndarray:
+        """Computes inverse distance weighted means from neighbour distances and indexes.
+
+        Args:
+            distances (ndarray): (n, k) distances to neighbours, infinite where missing.
+            index (ndarray): (n, k) indexes of neighbours, len(values) where missing.
+            values (ndarray): Values at the known points.
+
+        Returns:
+            ndarray: Weighted means, NaN where no neighbour was found.
+        """
+        valid = np.isfinite(distances)
+
+        # Pad Values so Missing Neighbours Index a Zero
+        padded = np.append(values, 0.0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.where(valid, 1.0 / distances**self.power, 0.0)
+
+            # Locations that Coincide with a Known Point Take its Value
+            exact = distances == 0
+            weights = np.where(
+                exact.any(axis=1, keepdims=True), exact.astype(float), weights
+            )
+
+            return (weights * padded[index]).sum(axis=1) / weights.sum(axis=1)
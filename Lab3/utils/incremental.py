@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# Incremental Aggregation of Daily Weather Observations
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import tempfile
+import pandas as pd
+
+# For Type Annotations
+from typing import List
+from os import PathLike
+from pandas import DataFrame
+
+# Values Averaged per Station & Month
+VALUES = ["max_tmpf", "min_tmpf", "precip"]
+
+# Columns of the Persisted State
+STATE_COLUMNS = (
+    ["station", "month", "name", "x", "y"]
+    + [f"sum_{v}" for v in VALUES]
+    + [f"count_{v}" for v in VALUES]
+    + ["last_date"]
+)
+
+# Dtypes of the Numeric Columns of the State
+STATE_DTYPES = {
+    "x": "float64",
+    "y": "float64",
+    **{f"sum_{v}": "float64" for v in VALUES},
+    **{f"count_{v}": "int64" for v in VALUES},
+    "last_date": "datetime64[ns]",
+}
+
+
+class IncrementalAggregate:
+    """
+    A class used to keep running sums and counts of daily observations per station and month.
+
+    New days are merged into the persisted sums, so monthly means are updated without rereading the
+    days that were already ingested. The last ingested date of each station is kept in the same file,
+    and acts as the checkpoint: sums and checkpoint are always written together, so a run that
+    fails before saving can simply be repeated.
+
+    Methods
+    -------
+    checkpoint()
+        Returns the last ingested date of each station.
+    new_rows(df)
+        Keeps only observations after the checkpoint of their station.
+    update(df)
+        Merges new observations into the running sums and saves the state.
+    means(months)
+        Returns the mean values of each station over some months.
+
+    Example
+    -------
+    > state = IncrementalAggregate(r"state_dir/aggMthWX_62022.csv")
+    > state.update(state.new_rows(df))
+    > aggregated_df = state.means(["2022-06"])
+    """
+
+    def __init__(self, path: PathLike = None) -> None:
+        """Instantiates the IncrementalAggregate class, loading its state if it exists.
+
+        Args:
+            path (PathLike, optional): Path to the CSV file that holds the state. Defaults to None (kept in memory only).
+        """
+        self.path = path
+
+        if path is not None and os.path.exists(path):
+            self.state = pd.read_csv(
+                path, dtype={"station": str, "month": str, "name": str}
+            )
+            self.state["last_date"] = pd.to_datetime(self.state["last_date"])
+
+        else:
+            self.state = pd.DataFrame(
+                {c: pd.Series(dtype=STATE_DTYPES.get(c, object)) for c in STATE_COLUMNS}
+            )
+
+    def checkpoint(self) -> pd.Series:
+        """Returns the last ingested date of each station.
+
+        Returns:
+            Series: Last date, indexed by station.
+        """
+        return self.state.groupby("station")["last_date"].max()
+
+    def new_rows(self, df: DataFrame) -> DataFrame:
+        """Keeps only observations after the checkpoint of their station.
+
+        Args:
+            df (DataFrame): Daily observations with 'station' and 'date' columns.
+
+        Returns:
+            DataFrame: Observations that were not ingested yet.
+        """
+        checkpoint = self.checkpoint()
+
+        # Nothing Ingested Yet, e.g. a Fresh State File
+        if checkpoint.empty:
+            return df
+
+        dates = pd.to_datetime(df["date"])
+        last = pd.to_datetime(df["station"].map(checkpoint))
+
+        # Stations Without a Checkpoint are New
+        return df.loc[last.isna() | (dates > last)]
+
+    def update(self, df: DataFrame) -> None:
+        """Merges new observations into the running sums and saves the state.
+
+        Args:
+            df (DataFrame): Cleaned daily observations, not ingested yet.
+        """
+        if df.empty:
+            return
+
+        dates = pd.to_datetime(df["date"])
+
+        # Sums & Counts of the New Days
+        grouped = df.assign(month=dates.dt.strftime("%Y-%m"), last_date=dates).groupby(
+            ["station", "month"]
+        )
+
+        new = grouped.agg(
+            name=("name", "first"),
+            x=("x", "first"),
+            y=("y", "first"),
+            **{f"sum_{v}": (v, "sum") for v in VALUES},
+            **{f"count_{v}": (v, "count") for v in VALUES},
+            last_date=("last_date", "max"),
+        )
+
+        # Merge with Running State, Adding Sums & Counts
+        old = self.state.set_index(["station", "month"])
+        merged = pd.concat([old, new])
+        additive = [f"sum_{v}" for v in VALUES] + [f"count_{v}" for v in VALUES]
+
+        self.state = (
+            merged.groupby(level=["station", "month"])
+            .agg(
+                {
+                    "name": "first",
+                    "x": "first",
+                    "y": "first",
+                    **{c: "sum" for c in additive},
+                    "last_date": "max",
+                }
+            )
+            .reset_index()[STATE_COLUMNS]
+        )
+
+        self._save()
+
+    def means(self, months: List[str] = None) -> DataFrame:
+        """Returns the mean values of each station over some months, from the running sums.
+
+        Args:
+            months (List[str], optional): Months as 'YYYY-MM'. Defaults to None (all months).
+
+        Returns:
+            DataFrame: One row per station with station, name, x, y and mean values, like WeatherLoader.aggregate().
+        """
+        state = self.state
+
+        if months is not None:
+            state = state.loc[state["month"].isin(months)]
+
+        grouped = state.groupby("station")
+        sums = grouped[
+            [f"sum_{v}" for v in VALUES] + [f"count_{v}" for v in VALUES]
+        ].sum()
+
+        df = grouped[["name", "x", "y"]].first()
+        df.insert(0, "station", df.index)
+
+        for v in VALUES:
+            df[v] = sums[f"sum_{v}"] / sums[f"count_{v}"]
+
+        return df
+
+    def _save(self) -> None:
+        """Writes the state atomically, so a failed write never leaves a partial checkpoint."""
+        if self.path is None:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+        with os.fdopen(fd, "w", newline="") as f:
+            self.state.to_csv(f, index=False)
+
+        os.replace(tmp, self.path)
@@ -6,32 +6,89 @@
 # 2023-04-06
 #
 
-import arcpy
 import os
+import re
+import json
+import numpy as np
 import pandas as pd
 
+from utils.grid import Grid
+from utils.idw import IDWInterpolator
+from utils.kriging import KrigingInterpolator
+from utils.validation import (
+    cross_validate,
+    error_statistics,
+    fold_ids,
+    held_out_neighbours,
+)
+from utils.stages import StageCache, stage
+from utils.hexagons import (
+    aggregate_to_h3,
+    build_pyramid,
+    cell_polygons,
+    cell_strings,
+    to_wgs84,
+)
+
+# ArcPy is Only Needed for the ARCPY Engine
+try:
+    import arcpy
+except ImportError:
+    arcpy = None
+
 # For Type Annotations
-from typing import Union
+from typing import List, Tuple, Union
 from pandas import DataFrame
+from numpy import ndarray
 from os import PathLike
 
+# Supported Interpolation Engines
+ENGINES = ["ARCPY", "NATIVE"]
+
+# Sources of NATIVE Predictions at the Known Points
+ACCURACY_SOURCES = ["SURFACE", "CROSS_VALIDATION"]
+
 
 class Pipeline:
     """
     A class used to run a pipeline of interpolation and accuracy assessments automatically.
 
+    The ARCPY engine runs the Geostatistical Analyst tools. The NATIVE engine interpolates with NumPy/SciPy
+    onto a regular grid, so it runs without an ArcGIS license. Its input may also be a DataFrame, CSV or
+    Parquet file with 'x' and 'y' columns.
+
     Methods
     -------
-    run_exploratory_interpolation()
+    run_exploratory_interpolation(candidates, folds, workers)
         Runs the exploratory interpolation tool and generates results for best-performing model.
+    _native_candidates()
+        Private method. Creates the default NATIVE interpolators from interpolation_methods.
+    _read_points()
+        Private method. Reads the input points as arrays for the NATIVE engine.
+    _stage_inputs(stage)
+        Private method. Returns what a stage reads from the pipeline, for the stage cache key.
+    _output_exists(path)
+        Private method. Checks that a cached stage output still exists.
     display(display_method)
         Displays accuracy assessment from the run_exploratory_interpolation() tool.
-    create_point_accuracy_layer()
+    create_point_accuracy_layer(source, folds)
         Calculates difference from actual to interpolated values at known points.
-    convert_results_to_hex(contours, res)
+    convert_results_to_hex(contours, res, min_res)
         Converts the geostats interpolation layer to H3 hexagons.
     export_to_sde(sde_path, dataset)
         Exports dataset to PostgreSQL database that is connected to via SDE connection.
+    export_to_postgis(loader, dataset)
+        Publishes NATIVE dataset to PostGIS with bulk COPY, without an SDE connection.
+    export_surface(directory)
+        Writes the NATIVE surface as a memory-mappable grid for the API's /predict route.
+    _h3_features(df)
+        Static, private method. Names NATIVE H3 statistics and adds cell polygons.
+    _point_features(df)
+        Static, private method. Adds point geometries to NATIVE point accuracy.
+    _to_feature_class(df, name, geometry_type, crs)
+        Private method. Writes NATIVE features to the output geodatabase.
+    _bump_layer_version(sde_path, table)
+        Static, private method. Used for invalidating API caches after an export.
 
     Example
     -------
@@ -41,6 +98,16 @@ class Pipeline:
     > interpolation_pipeline.create_point_accuracy_layer(r"output_gdb_path")
     > interpolation_pipeline.convert_results_to_hex(r"output_gdb_path", 7)
     > interpolation_pipeline.export_to_sde(r"sde_path", "TESSELLATION")
+
+    > native_pipeline = Pipeline(points_df, r"out_dir_path", None, "max_tmpf", engine="NATIVE")
+    > native_pipeline.run_exploratory_interpolation([KrigingInterpolator("ORDINARY_KRIGING", workers=4)])
+    > native_pipeline.surface, native_pipeline.variance_surface
+    > native_pipeline.create_point_accuracy_layer("CROSS_VALIDATION")
+    > native_pipeline.export_to_postgis(BulkLoader(db), "POINT_ACCURACY")
+
+    > cached_pipeline = Pipeline(points_df, r"out_dir_path", None, "max_tmpf", engine="NATIVE", cache_directory=r"cache_dir")
+    > cached_pipeline.run_exploratory_interpolation()  # Skipped on Reruns with the Same Points & Candidates
+    > cached_pipeline.convert_results_to_hex(res=7)
     """
 
     def __init__(
@@ -49,6 +116,11 @@ class Pipeline:
         output_directory: PathLike,
         output_geodatabase: PathLike,
         value_of_interest: str,
+        engine: str = "ARCPY",
+        cell_size: float = None,
+        crs: int = None,
+        name: str = None,
+        cache_directory: PathLike = None,
     ) -> None:
         """Instantiates the Pipeline class.
 
@@ -57,23 +129,111 @@ class Pipeline:
             output_directory (PathLike): Directory that will store the outputs.
             output_geodatabase (PathLike): Path to the geodatabase where the output will be stored.
             value_of_interest (str): Value in the input point feature class that will be interpolated.
+            engine (str, optional): Interpolation engine, one of ['ARCPY', 'NATIVE']. Defaults to "ARCPY".
+            cell_size (float, optional): Cell size of the NATIVE prediction grid. Defaults to 1/250 of the extent.
+            crs (int, optional): EPSG code of the NATIVE input coordinates. Defaults to that of the feature class, or 4326.
+            name (str, optional): Prefix of the output names, e.g. to keep several variables apart. Defaults to the input's name.
+            cache_directory (PathLike, optional): Directory of the stage cache, so reruns skip unchanged stages. Defaults to None (no caching).
+
+        Raises:
+            ValueError: Raised if engine is not valid option.
+            TypeError: Raised if engine is not of type str.
         """
+        # Check Engine
+        if engine not in ENGINES:
+            if type(engine) == str:
+                raise ValueError(f"Param 'engine' must be in {ENGINES}")
+            else:
+                raise TypeError(
+                    f"Param 'engine' must be of type string and value of {ENGINES}"
+                )
+
         self.point_feature_class = point_feature_class
         self.output_directory = output_directory
         self.output_geodatabase = output_geodatabase
         self.value_of_interest = value_of_interest
+        self.engine = engine
+        self.cell_size = cell_size
+        self.crs = crs
 
         # Define Other Paths
-        self.feature_name = os.path.split(self.point_feature_class)[1]
+        if name is not None:
+            self.feature_name = name
+        elif isinstance(self.point_feature_class, DataFrame):
+            self.feature_name = self.point_feature_class.attrs.get("name", "points")
+        else:
+            self.feature_name = os.path.split(self.point_feature_class)[1]
+
+            # Strip Extension of Tabular Inputs
+            if self.feature_name.lower().endswith((".csv", ".parquet")):
+                self.feature_name = os.path.splitext(self.feature_name)[0]
+
         self.stats_table = f"{self.feature_name}_stats"
         self.geostats_layer = f"{self.feature_name}_bestInterpolator"
         self.interpolation_methods = "ORDINARY_KRIGING;UNIVERSAL_KRIGING;IDW"
 
+        # Set up Stage Cache, One Manifest per Output Name
+        self.stage_cache = None
+
+        if cache_directory is not None:
+            self.stage_cache = StageCache(
+                os.path.join(cache_directory, self.feature_name)
+            )
+
         # Set Workspace
-        arcpy.env.workspace = self.output_geodatabase
+        if self.engine == "ARCPY":
+            arcpy.env.workspace = self.output_geodatabase
+
+    @stage(
+        "interpolate",
+        ["stats", "model", "grid", "surface", "variance_surface", "crs"],
+        outputs=["stats_table", "geostats_layer"],
+        ignore=["workers"],
+    )
+    def run_exploratory_interpolation(
+        self, candidates: List = None, folds: int = None, workers: int = 1
+    ) -> None:
+        """Runs the exploratory interpolation tool and generates results for best-performing model.
+
+        Args:
+            candidates (List, optional): Interpolators compared by the NATIVE engine. Defaults to one per interpolation method.
+            folds (int, optional): Cross-validation folds of the NATIVE engine. Defaults to None (leave-one-out).
+            workers (int, optional): Processes used by the NATIVE engine. Defaults to 1.
+        """
+        # Interpolate Natively onto Grid
+        if self.engine == "NATIVE":
+            if candidates is None:
+                candidates = self._native_candidates()
+
+            x, y, values = self._read_points()
+
+            # Rank Candidates by Cross-Validated Accuracy
+            self.stats = cross_validate(candidates, x, y, values, folds, workers)
+
+            # Fit Best-Performing Model
+            self.model = candidates[self.stats["candidate"].iloc[0]].fit(x, y, values)
+
+            # Spread Kriging Grid Blocks across Same Number of Processes
+            if workers > 1 and hasattr(self.model, "workers"):
+                self.model.workers = workers
+
+            self.grid = Grid.from_points(x, y, self.cell_size)
+
+            # Kriging Also Produces a Prediction Variance Surface
+            if getattr(self.model, "has_variance", False):
+                self.surface, self.variance_surface = self.model.predict_grid(
+                    self.grid, return_variance=True
+                )
+            else:
+                self.surface = self.model.predict_grid(self.grid)
+                self.variance_surface = None
+
+            # Message
+            print(
+                f"{self.model.method} surface {self.grid.shape} interpolated from {len(values)} points"
+            )
+            return
 
-    def run_exploratory_interpolation(self) -> None:
-        """Runs the exploratory interpolation tool and generates results for best-performing model."""
         # Run exploratory Interpolation
         arcpy.ga.ExploratoryInterpolation(
             self.point_feature_class,
@@ -91,6 +251,105 @@ class Pipeline:
         # Message
         print(arcpy.GetMessages())
 
+    def _native_candidates(self) -> List:
+        """Creates one NATIVE interpolator per method in interpolation_methods.
+
+        Returns:
+            List: Interpolator instances.
+        """
+        candidates = []
+
+        for method in self.interpolation_methods.split(";"):
+            if method == "IDW":
+                candidates.append(IDWInterpolator())
+            else:
+                candidates.append(KrigingInterpolator(method))
+
+        return candidates
+
+    def _read_points(self) -> Tuple[ndarray, ndarray, ndarray]:
+        """Reads the input points as coordinate and value arrays, dropping points without a value.
+
+        Returns:
+            Tuple[ndarray, ndarray, ndarray]: X coordinates, Y coordinates and values.
+        """
+        # Read from DataFrame, CSV, Parquet or Feature Class
+        if isinstance(self.point_feature_class, DataFrame):
+            df = self.point_feature_class
+
+        elif str(self.point_feature_class).lower().endswith(".csv"):
+            df = pd.read_csv(self.point_feature_class)
+
+        elif str(self.point_feature_class).lower().endswith(".parquet"):
+            df = pd.read_parquet(self.point_feature_class)
+
+        else:
+            # Take CRS from Feature Class if Not Given
+            if self.crs is None:
+                self.crs = arcpy.Describe(
+                    self.point_feature_class
+                ).spatialReference.factoryCode
+
+            array = arcpy.da.FeatureClassToNumPyArray(
+                self.point_feature_class,
+                ["SHAPE@X", "SHAPE@Y", self.value_of_interest],
+                skip_nulls=True,
+            )
+            df = pd.DataFrame(
+                {
+                    "x": array["SHAPE@X"],
+                    "y": array["SHAPE@Y"],
+                    self.value_of_interest: array[self.value_of_interest],
+                }
+            )
+
+        # Tabular Inputs Default to Longitude/Latitude
+        if self.crs is None:
+            self.crs = 4326
+
+        # Drop Missing Values
+        df = df.dropna(subset=["x", "y", self.value_of_interest])
+
+        return (
+            df["x"].to_numpy(dtype=np.float64),
+            df["y"].to_numpy(dtype=np.float64),
+            df[self.value_of_interest].to_numpy(dtype=np.float64),
+        )
+
+    def _stage_inputs(self, stage: str) -> list:
+        """Returns what a stage reads from the pipeline itself, hashed into its cache key.
+
+        Args:
+            stage (str): Name of the stage.
+
+        Returns:
+            list: Settings, and the input points for the first stage.
+        """
+        # Later Stages Read the Points through the Key of the First
+        points = list(self._read_points()) if stage == "interpolate" else []
+
+        return [
+            self.engine,
+            self.value_of_interest,
+            self.cell_size,
+            self.crs,
+            self.interpolation_methods,
+        ] + points
+
+    def _output_exists(self, path: str) -> bool:
+        """Checks that a cached stage output still exists. NATIVE stages keep their results in the cache itself.
+
+        Args:
+            path (str): Path or name of the output.
+
+        Returns:
+            bool: Whether the output exists.
+        """
+        if self.engine == "NATIVE":
+            return True
+
+        return arcpy.Exists(path)
+
     def display(self, display_method: str) -> Union[str, DataFrame]:
         """Displays accuracy assessment from the run_exploratory_interpolation() tool.
 
@@ -104,14 +363,21 @@ class Pipeline:
         Returns:
             Union[str, DataFrame]: Either string or DataFrame is returned.
         """
-        # Convert from GDB Table to CSV
-        arcpy.conversion.ExportTable(
-            self.stats_table,
-            os.path.join(self.output_directory, f"{self.stats_table}.csv"),
-        )
+        # NATIVE Statistics are Already a DataFrame
+        if self.engine == "NATIVE":
+            df = self.stats
+
+        else:
+            # Convert from GDB Table to CSV
+            arcpy.conversion.ExportTable(
+                self.stats_table,
+                os.path.join(self.output_directory, f"{self.stats_table}.csv"),
+            )
 
-        # Read Table into DF
-        df = pd.read_csv(os.path.join(self.output_directory, f"{self.stats_table}.csv"))
+            # Read Table into DF
+            df = pd.read_csv(
+                os.path.join(self.output_directory, f"{self.stats_table}.csv")
+            )
 
         # Display based on Method
         if display_method == "PRINT":
@@ -131,8 +397,99 @@ class Pipeline:
                     "Param 'display_method' must be of type string and value of ['PRINT', 'DATAFRAME']"
                 )
 
-    def create_point_accuracy_layer(self) -> None:
-        """Calculates difference from actual to interpolated values at known points."""
+    @stage(
+        "accuracy",
+        ["point_accuracy", "point_accuracy_stats", "point_accuracy_path"],
+        outputs=["point_accuracy_path"],
+        depends_on=["interpolate"],
+    )
+    def create_point_accuracy_layer(
+        self, source: str = "SURFACE", folds: int = None
+    ) -> DataFrame:
+        """Calculates difference from actual to interpolated values at known points.
+
+        The NATIVE engine predicts all points in one vectorized pass instead of writing them through
+        GALayerToPoints: either by sampling the surface bilinearly, or from each point's held-out
+        neighbours, which gives cross-validated errors. Kriging also adds standard errors.
+
+        Args:
+            source (str, optional): NATIVE predictions, one of ['SURFACE', 'CROSS_VALIDATION']. Defaults to "SURFACE".
+            folds (int, optional): Cross-validation folds of the 'CROSS_VALIDATION' source. Defaults to None (leave-one-out).
+
+        Raises:
+            ValueError: Raised if source is not valid option.
+            TypeError: Raised if source is not of type str.
+
+        Returns:
+            DataFrame: NATIVE points with x, y, actual, predicted and error columns, ready for export_to_postgis().
+                Summary statistics are kept in point_accuracy_stats. None for the ARCPY engine.
+        """
+        if self.engine == "NATIVE":
+            x, y, actual = self._read_points()
+            standard_error = None
+
+            # Sample Surface at Points
+            if source == "SURFACE":
+                predicted = self.grid.sample(self.surface, x, y)
+
+                if self.variance_surface is not None:
+                    standard_error = np.sqrt(
+                        self.grid.sample(self.variance_surface, x, y)
+                    )
+
+            # Predict Points from Neighbours Outside their Fold
+            elif source == "CROSS_VALIDATION":
+                points = np.column_stack([x, y])
+                assignment = fold_ids(len(actual), folds)
+                k = min(
+                    self.model.neighbors,
+                    len(actual) - np.bincount(assignment).max(),
+                )
+                distances, index = held_out_neighbours(points, k, assignment)
+
+                if getattr(self.model, "has_variance", False):
+                    predicted, variance = self.model.predict_from_neighbours(
+                        points, distances, index, return_variance=True
+                    )
+                    standard_error = np.sqrt(variance)
+                else:
+                    predicted = self.model.predict_from_neighbours(
+                        points, distances, index
+                    )
+
+            else:
+                if type(source) == str:
+                    raise ValueError(f"Param 'source' must be in {ACCURACY_SOURCES}")
+                else:
+                    raise TypeError(
+                        f"Param 'source' must be of type string and value of {ACCURACY_SOURCES}"
+                    )
+
+            # Residuals
+            self.point_accuracy = pd.DataFrame(
+                {
+                    "x": x,
+                    "y": y,
+                    "actual": actual,
+                    "predicted": predicted,
+                    "error": predicted - actual,
+                }
+            )
+
+            if standard_error is not None:
+                self.point_accuracy["standard_error"] = standard_error
+                self.point_accuracy["standardized_error"] = (
+                    predicted - actual
+                ) / standard_error
+
+            self.point_accuracy_stats = error_statistics(predicted, actual)
+
+            # Message
+            print(
+                f"Point accuracy calculated at {len(actual)} points, RMSE {self.point_accuracy_stats['rmse']:.4f}"
+            )
+            return self.point_accuracy
+
         # Extract Values of Geostats Layer to Points
         self.point_accuracy_path = os.path.join(
             self.output_geodatabase, f"{self.feature_name}_point_diff"
@@ -148,13 +505,53 @@ class Pipeline:
         # Message
         print(f"Point accuracy successfully generated at: {self.point_accuracy_path}")
 
-    def convert_results_to_hex(self, contours=False, res=6) -> None:
+    @stage(
+        "hexagons",
+        ["tessellation", "h3_res", "tessellation_path", "contour_path"],
+        outputs=["tessellation_path"],
+        depends_on=["interpolate", "accuracy"],
+    )
+    def convert_results_to_hex(self, contours=False, res=6, min_res=None) -> None:
         """Converts the geostats interpolation layer to H3 hexagons.
 
+        The NATIVE engine assigns every cell of the prediction surface to its H3 cell in memory and
+        summarizes them with a NumPy group-by, so only occupied cells are built and nothing is written
+        to disk. The surface covers the whole extent, so contours are not needed.
+
+        Given min_res, the NATIVE engine also builds a pyramid: every resolution from res down to
+        min_res is rolled up from the level below it and stacked in one table with a 'res' column.
+
         Args:
             contours(bool, optional): Determines if filled contours are needed or not.
             res (int, optional): Resolution of the H3 cells that will be used. Defaults to 6.
+            min_res (int, optional): Coarsest resolution of a NATIVE pyramid. Defaults to None (single resolution).
+
+        Raises:
+            ValueError: Raised if a pyramid is requested from the ARCPY engine.
         """
+        # Aggregate Surface to H3 in Memory
+        if self.engine == "NATIVE":
+            lng, lat = to_wgs84(*self.grid.coordinates(), self.crs)
+
+            self.h3_res = res
+            self.tessellation = aggregate_to_h3(
+                lng, lat, self.surface.ravel(), res, ncols=self.grid.ncols
+            )
+
+            # Roll Up Coarser Levels
+            if min_res is not None:
+                self.h3_res = f"{min_res}_{res}"
+                self.tessellation = build_pyramid(self.tessellation, min_res, res)
+
+            # Message
+            print(
+                f"Data successfully aggregated to {len(self.tessellation)} H3 hexagons at resolution {self.h3_res}"
+            )
+            return
+
+        if min_res is not None:
+            raise ValueError("Param 'min_res' is only supported by the NATIVE engine")
+
         # If needed, Convert to Polygons First
         if contours:
             self.contour_path = os.path.join(
@@ -228,10 +625,27 @@ class Pipeline:
         """
         # Determine Dataset to Export
         if dataset == "TESSELLATION":
+            # Write NATIVE Hexagons to Geodatabase First
+            if self.engine == "NATIVE":
+                self.tessellation_path = self._to_feature_class(
+                    self._h3_features(self.tessellation),
+                    f"{self.feature_name}_h3_{self.h3_res}",
+                    "POLYGON",
+                )
+
             input_fc = self.tessellation_path
             output_fc = os.path.join(sde_path, f"{self.feature_name}_h3")
 
         elif dataset == "POINT_ACCURACY":
+            # Write NATIVE Points to Geodatabase First
+            if self.engine == "NATIVE":
+                self.point_accuracy_path = self._to_feature_class(
+                    self._point_features(self.point_accuracy),
+                    f"{self.feature_name}_point_diff",
+                    "POINT",
+                    self.crs,
+                )
+
             input_fc = self.point_accuracy_path
             output_fc = os.path.join(sde_path, f"{self.feature_name}_point_diff")
 
@@ -246,3 +660,234 @@ class Pipeline:
                 )
         # Export
         arcpy.conversion.ExportFeatures(input_fc, output_fc)
+
+        # Bump Published Version so API Caches are Invalidated
+        self._bump_layer_version(sde_path, os.path.split(output_fc)[1])
+
+    def export_to_postgis(self, loader, dataset: str) -> None:
+        """Publishes NATIVE dataset to PostGIS with bulk COPY and an atomic table swap, without ArcGIS.
+
+        Args:
+            loader (BulkLoader): Loader from the API's bulk module, bound to the database.
+            dataset (str): Deterimines which dataset will be exported to the database.
+
+        Raises:
+            ValueError: Raised if dataset is not valid option, or the engine is not NATIVE.
+            TypeError: Raised if dataset is not of type str.
+        """
+        if self.engine != "NATIVE":
+            raise ValueError("Method 'export_to_postgis' requires the NATIVE engine")
+
+        # Determine Dataset to Export
+        if dataset == "TESSELLATION":
+            loader.publish(
+                self._h3_features(self.tessellation),
+                f"{self.feature_name}_h3",
+                geometry="wkt",
+                index_columns=["res", "mean_predicted"],
+            )
+
+        elif dataset == "POINT_ACCURACY":
+            loader.publish(
+                self.point_accuracy,
+                f"{self.feature_name}_point_diff",
+                geometry=("x", "y"),
+                srid=self.crs,
+                index_columns=["error"],
+            )
+
+        else:
+            if type(dataset) == str:
+                raise ValueError(
+                    "Param 'dataset' must be in ['TESSELLATION', 'POINT_ACCURACY']"
+                )
+            else:
+                raise TypeError(
+                    "Param 'dataset' must be of type string and value of ['TESSELLATION', 'POINT_ACCURACY']"
+                )
+
+    def export_surface(self, directory: PathLike) -> str:
+        """Writes the NATIVE surface as a .npy grid with a .json sidecar, which the API memory-maps for /predict.
+
+        The grid is written first and the sidecar last, each replaced atomically, so a reader that sees
+        a new sidecar always finds the complete grid it describes. Kriging variance is written alongside
+        as '<name>_variance'.
+
+        Args:
+            directory (PathLike): Directory that holds the surfaces, e.g. the API's PREDICTION_DIR.
+
+        Raises:
+            ValueError: Raised if the engine is not NATIVE.
+
+        Returns:
+            str: Path to the sidecar of the surface.
+        """
+        if self.engine != "NATIVE":
+            raise ValueError("Method 'export_surface' requires the NATIVE engine")
+
+        os.makedirs(directory, exist_ok=True)
+
+        surfaces = {self.feature_name: self.surface}
+
+        if self.variance_surface is not None:
+            surfaces[f"{self.feature_name}_variance"] = self.variance_surface
+
+        for name, surface in surfaces.items():
+            # Grid First, Written to a Temporary File & Swapped In
+            path = os.path.join(directory, name)
+
+            with open(f"{path}.npy.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(surface, dtype=np.float32))
+            os.replace(f"{path}.npy.tmp", f"{path}.npy")
+
+            # Sidecar Last, Marking the Grid as Complete
+            meta = {
+                "xmin": self.grid.xmin,
+                "ymax": self.grid.ymax,
+                "cell_size": self.grid.cell_size,
+                "nrows": self.grid.nrows,
+                "ncols": self.grid.ncols,
+                "crs": self.crs,
+                "value_of_interest": self.value_of_interest,
+                "method": self.model.method,
+            }
+
+            with open(f"{path}.json.tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(f"{path}.json.tmp", f"{path}.json")
+
+        path = os.path.join(directory, self.feature_name)
+
+        # Message
+        print(f"Surface successfully exported to: {path}.npy")
+
+        return f"{path}.json"
+
+    @staticmethod
+    def _h3_features(df: DataFrame) -> DataFrame:
+        """Names H3 statistics like the SummarizeWithin output and adds cell polygons.
+
+        Args:
+            df (DataFrame): H3 statistics from aggregate_to_h3().
+
+        Returns:
+            DataFrame: Features with a 'wkt' geometry column.
+        """
+        features = pd.DataFrame(
+            {
+                "grid_id": cell_strings(df["h3"]),
+                "res": df["res"],
+                "point_count": df["count"],
+                "sum_predicted": df["sum"],
+                "min_predicted": df["min"],
+                "max_predicted": df["max"],
+                "mean_predicted": df["mean"],
+                "rate": df["rate"],
+            }
+        )
+        features["wkt"] = cell_polygons(df["h3"])
+
+        return features
+
+    @staticmethod
+    def _point_features(df: DataFrame) -> DataFrame:
+        """Adds point geometries to the point accuracy DataFrame.
+
+        Args:
+            df (DataFrame): Point accuracy from create_point_accuracy_layer().
+
+        Returns:
+            DataFrame: Features with a 'wkt' geometry column.
+        """
+        return df.assign(
+            wkt="POINT (" + df["x"].astype(str) + " " + df["y"].astype(str) + ")"
+        )
+
+    def _to_feature_class(
+        self, df: DataFrame, name: str, geometry_type: str, crs: int = 4326
+    ) -> str:
+        """Writes a DataFrame with a 'wkt' geometry column to a feature class in the output geodatabase.
+
+        The geometry type is given rather than read from the first row, so an empty DataFrame still
+        gives an empty feature class with all of its fields.
+
+        Args:
+            df (DataFrame): Features to write, may be empty.
+            name (str): Name of the feature class.
+            geometry_type (str): Geometry type of the feature class, e.g. "POLYGON" or "POINT".
+            crs (int, optional): EPSG code of the geometries. Defaults to 4326.
+
+        Returns:
+            str: Path to the feature class.
+        """
+        path = os.path.join(self.output_geodatabase, name)
+
+        # Replace Output of an Earlier Run
+        if arcpy.Exists(path):
+            arcpy.management.Delete(path)
+
+        # Create Feature Class & Fields
+        arcpy.management.CreateFeatureclass(
+            self.output_geodatabase,
+            name,
+            geometry_type,
+            spatial_reference=arcpy.SpatialReference(crs),
+        )
+
+        fields = [c for c in df.columns if c != "wkt"]
+        field_types = {"i": "LONG", "u": "LONG", "f": "DOUBLE"}
+
+        arcpy.management.AddFields(
+            path, [[f, field_types.get(df[f].dtype.kind, "TEXT")] for f in fields]
+        )
+
+        # Insert Rows
+        with arcpy.da.InsertCursor(path, ["SHAPE@WKT"] + fields) as cursor:
+            for row in df[["wkt"] + fields].itertuples(index=False):
+                cursor.insertRow(row)
+
+        return path
+
+    @staticmethod
+    def _bump_layer_version(sde_path: PathLike, table: str) -> None:
+        """Increments the version of a table in the 'layer_versions' table, which the API polls to invalidate caches.
+
+        ArcSDESQLExecute cannot bind parameters, so the name is checked to be a plain identifier
+        before it is quoted into the statements.
+
+        Args:
+            sde_path (PathLike): Path to the SDE connection file.
+            table (str): Name of the table that was rewritten.
+
+        Raises:
+            ValueError: Raised if the table name is not a plain identifier.
+        """
+        # Table Names are Lowercase in PostgreSQL
+        table = str(table).lower()
+
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", table):
+            raise ValueError(f"Table name '{table}' is not a plain identifier")
+
+        # Execute SQL through SDE Connection
+        sde = arcpy.ArcSDESQLExecute(sde_path)
+
+        sde.execute(
+            """
+            CREATE TABLE IF NOT EXISTS layer_versions (
+                layer_name text PRIMARY KEY,
+                version bigint NOT NULL DEFAULT 1,
+                updated_at timestamptz NOT NULL DEFAULT now()
+            );
+            """
+        )
+
+        sde.execute(
+            f"""
+            INSERT INTO layer_versions (layer_name) VALUES ('{table}')
+            ON CONFLICT (layer_name) DO UPDATE
+            SET version = layer_versions.version + 1, updated_at = now();
+            """
+        )
+
+        # Notify Listening API Workers, the Same Call BulkLoader Makes with a Bound Param
+        sde.execute(f"SELECT pg_notify('layer_changed', '{table}');")
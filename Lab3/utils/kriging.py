@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+#
+# Native Ordinary & Universal Kriging Interpolation
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import numpy as np
+from scipy.optimize import curve_fit
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist
+from concurrent.futures import ProcessPoolExecutor
+
+# For Type Annotations
+from typing import Tuple, Union
+from numpy import ndarray
+from utils.grid import Grid
+
+# Kriging Methods Supported, Matching Names of ExploratoryInterpolation
+METHODS = ["ORDINARY_KRIGING", "UNIVERSAL_KRIGING"]
+
+# Smallest Nugget, Relative to Total Sill, Kept so Smooth (e.g. Gaussian) Systems Stay Well Conditioned
+MIN_NUGGET = 1e-4
+
+
+def spherical(h: ndarray, nugget: float, sill: float, range_: float) -> ndarray:
+    """Spherical semivariogram model.
+
+    Args:
+        h (ndarray): Lag distances.
+        nugget (float): Nugget, the semivariance at (just above) zero distance.
+        sill (float): Partial sill, added to the nugget at the range.
+        range_ (float): Distance at which the model reaches the sill.
+
+    Returns:
+        ndarray: Semivariances.
+    """
+    r = np.minimum(h / range_, 1.0)
+    return nugget + sill * (1.5 * r - 0.5 * r**3)
+
+
+def exponential(h: ndarray, nugget: float, sill: float, range_: float) -> ndarray:
+    """Exponential semivariogram model, with range_ as the practical (95%) range.
+
+    Args:
+        h (ndarray): Lag distances.
+        nugget (float): Nugget, the semivariance at (just above) zero distance.
+        sill (float): Partial sill, approached asymptotically.
+        range_ (float): Practical range of the model.
+
+    Returns:
+        ndarray: Semivariances.
+    """
+    return nugget + sill * (1.0 - np.exp(-3.0 * h / range_))
+
+
+def gaussian(h: ndarray, nugget: float, sill: float, range_: float) -> ndarray:
+    """Gaussian semivariogram model, with range_ as the practical (95%) range.
+
+    Args:
+        h (ndarray): Lag distances.
+        nugget (float): Nugget, the semivariance at (just above) zero distance.
+        sill (float): Partial sill, approached asymptotically.
+        range_ (float): Practical range of the model.
+
+    Returns:
+        ndarray: Semivariances.
+    """
+    return nugget + sill * (1.0 - np.exp(-3.0 * (h / range_) ** 2))
+
+
+# Semivariogram Models by Name
+MODELS = {"spherical": spherical, "exponential": exponential, "gaussian": gaussian}
+
+
+def empirical_variogram(
+    x: ndarray,
+    y: ndarray,
+    values: ndarray,
+    n_lags: int = 15,
+    max_lag: float = None,
+    max_points: int = 3000,
+    seed: int = 0,
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Bins the semivariance of all point pairs by distance, in vectorized form.
+
+    Large inputs are randomly subsampled to max_points, which keeps the number of pairs below ~4.5 million.
+
+    Args:
+        x (ndarray): X coordinates of the points.
+        y (ndarray): Y coordinates of the points.
+        values (ndarray): Values at the points.
+        n_lags (int, optional): Number of distance bins. Defaults to 15.
+        max_lag (float, optional): Largest distance binned. Defaults to half the extent diagonal.
+        max_points (int, optional): Maximum number of points used. Defaults to 3000.
+        seed (int, optional): Seed of the subsample. Defaults to 0.
+
+    Returns:
+        Tuple[ndarray, ndarray, ndarray]: Mean lag distance, semivariance and pair count of non-empty bins.
+    """
+    points = np.column_stack([x, y])
+    values = np.asarray(values, dtype=np.float64)
+
+    # Subsample Large Inputs
+    if len(values) > max_points:
+        keep = np.random.default_rng(seed).choice(
+            len(values), max_points, replace=False
+        )
+        points, values = points[keep], values[keep]
+
+    # Pairwise Distances & Half Squared Differences
+    distances = pdist(points)
+    semivariances = pdist(values[:, None], "sqeuclidean") / 2.0
+
+    if max_lag is None:
+        max_lag = np.hypot(*np.ptp(points, axis=0)) / 2.0
+
+    # Bin Pairs by Distance
+    within = distances <= max_lag
+    bins = np.minimum((distances[within] / max_lag * n_lags).astype(int), n_lags - 1)
+
+    counts = np.bincount(bins, minlength=n_lags)
+    lag_sums = np.bincount(bins, weights=distances[within], minlength=n_lags)
+    gamma_sums = np.bincount(bins, weights=semivariances[within], minlength=n_lags)
+
+    filled = counts > 0
+
+    return (
+        lag_sums[filled] / counts[filled],
+        gamma_sums[filled] / counts[filled],
+        counts[filled],
+    )
+
+
+def fit_variogram(
+    lags: ndarray, gamma: ndarray, counts: ndarray, model: str = "auto"
+) -> Tuple[str, ndarray]:
+    """Fits a semivariogram model to an empirical variogram by weighted least squares.
+
+    Args:
+        lags (ndarray): Mean lag distance of each bin.
+        gamma (ndarray): Semivariance of each bin.
+        counts (ndarray): Pair count of each bin, used as weights.
+        model (str, optional): Name of a model in MODELS, or "auto" to pick the best fit. Defaults to "auto".
+
+    Raises:
+        ValueError: Raised if model is not valid option.
+
+    Returns:
+        Tuple[str, ndarray]: Name of the model and its (nugget, sill, range) parameters.
+    """
+    if model != "auto" and model not in MODELS:
+        raise ValueError(f"Param 'model' must be in {list(MODELS) + ['auto']}")
+
+    names = list(MODELS) if model == "auto" else [model]
+
+    # Too Few Bins to Fit Three Parameters, Fall Back to Pure Nugget
+    if len(lags) < 3:
+        nugget = float(np.mean(gamma)) if len(gamma) else 0.0
+        extent = float(np.max(lags)) if len(lags) and np.max(lags) > 0 else 1.0
+
+        return names[0], np.array([nugget, 0.0, extent])
+
+    # Initial Guess & Bounds
+    p0 = [
+        max(float(np.min(gamma)), 0.0),
+        max(float(np.ptp(gamma)), 1e-12),
+        float(np.max(lags)) / 2.0,
+    ]
+    upper = [np.inf, np.inf, float(np.max(lags)) * 4.0]
+    sigma = 1.0 / np.sqrt(counts)
+
+    best = None
+
+    for name in names:
+        try:
+            params, _ = curve_fit(
+                MODELS[name],
+                lags,
+                gamma,
+                p0=p0,
+                sigma=sigma,
+                bounds=(0, upper),
+                maxfev=10000,
+            )
+
+        # Not Converged or Ill-Posed Fit
+        except (RuntimeError, TypeError, ValueError):
+            continue
+
+        # Weighted Sum of Squared Errors
+        sse = float(np.sum(counts * (MODELS[name](lags, *params) - gamma) ** 2))
+
+        if best is None or sse < best[0]:
+            best = (sse, name, params)
+
+    # Fall Back to Pure Nugget if No Model Converged
+    if best is None:
+        return names[0], np.array([float(np.mean(gamma)), 0.0, float(np.max(lags))])
+
+    return best[1], best[2]
+
+
+class KrigingInterpolator:
+    """
+    A class used to interpolate values with ordinary or universal kriging, without arcpy.
+
+    The semivariogram is fitted to a vectorized empirical variogram. Each prediction solves a local kriging
+    system over its nearest neighbours, and systems are solved in stacked batches with NumPy. Grid blocks can
+    be spread across a process pool, so no global kriging matrix is ever built.
+
+    Methods
+    -------
+    fit(x, y, values)
+        Fits the semivariogram and builds the KD-tree over the known points.
+    predict(x, y, return_variance)
+        Predicts values, and optionally kriging variances, at arbitrary locations.
+    predict_grid(grid, return_variance)
+        Predicts values, and optionally kriging variances, at every cell of a grid.
+    predict_from_neighbours(locations, distances, index, return_variance)
+        Predicts from precomputed neighbours.
+
+    Example
+    -------
+    > kriging = KrigingInterpolator("ORDINARY_KRIGING", model="auto", neighbors=16, workers=4)
+    > kriging.fit(x, y, values)
+    > surface, variance = kriging.predict_grid(Grid.from_points(x, y), return_variance=True)
+    """
+
+    has_variance = True
+
+    def __init__(
+        self,
+        method: str = "ORDINARY_KRIGING",
+        model: str = "auto",
+        neighbors: int = 16,
+        n_lags: int = 15,
+        block_size: int = 4096,
+        workers: int = 1,
+    ) -> None:
+        """Instantiates the KrigingInterpolator class.
+
+        Args:
+            method (str, optional): One of ['ORDINARY_KRIGING', 'UNIVERSAL_KRIGING']. Defaults to "ORDINARY_KRIGING".
+            model (str, optional): Semivariogram model, one of MODELS or "auto". Defaults to "auto".
+            neighbors (int, optional): Number of nearest neighbours in each local system. Defaults to 16.
+            n_lags (int, optional): Number of bins of the empirical variogram. Defaults to 15.
+            block_size (int, optional): Number of locations solved per batch. Defaults to 4096.
+            workers (int, optional): Number of processes grid blocks are spread across. Defaults to 1.
+
+        Raises:
+            ValueError: Raised if method is not valid option.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Param 'method' must be in {METHODS}")
+
+        self.method = method
+        self.model = model
+        self.neighbors = neighbors
+        self.n_lags = n_lags
+        self.block_size = block_size
+        self.workers = workers
+
+    @property
+    def params(self) -> dict:
+        """Tunable parameters of the interpolator."""
+        return {"model": self.model, "neighbors": self.neighbors, "n_lags": self.n_lags}
+
+    def fit(
+        self,
+        x: ndarray,
+        y: ndarray,
+        values: ndarray,
+        variogram: Tuple[str, ndarray] = None,
+    ):
+        """Fits the semivariogram and builds the KD-tree over the known points.
+
+        For universal kriging, the variogram is fitted to the residuals of a linear trend.
+
+        Args:
+            x (ndarray): X coordinates of the known points.
+            y (ndarray): Y coordinates of the known points.
+            values (ndarray): Values at the known points.
+            variogram (Tuple[str, ndarray], optional): Already fitted (model, params) to reuse. Defaults to None.
+
+        Returns:
+            KrigingInterpolator: The fitted interpolator.
+        """
+        self.points = np.column_stack([x, y]).astype(np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.tree = cKDTree(self.points)
+
+        # Fit Variogram, to Detrended Values for Universal Kriging
+        if variogram is None:
+            residuals = self.values
+
+            if self.method == "UNIVERSAL_KRIGING":
+                drift = np.column_stack([np.ones(len(self.values)), self.points])
+                coef = np.linalg.lstsq(drift, self.values, rcond=None)[0]
+                residuals = self.values - drift @ coef
+
+            lags, gamma, counts = empirical_variogram(x, y, residuals, self.n_lags)
+            variogram = fit_variogram(lags, gamma, counts, self.model)
+
+        self.variogram_model, self.variogram_params = variogram[0], np.array(
+            variogram[1]
+        )
+
+        # Floor Nugget for Numerical Stability
+        nugget, sill = self.variogram_params[:2]
+        self.variogram_params[0] = max(nugget, MIN_NUGGET * (nugget + sill))
+
+        return self
+
+    def variogram(self, h: ndarray) -> ndarray:
+        """Evaluates the fitted semivariogram, which is zero at zero distance.
+
+        Args:
+            h (ndarray): Lag distances.
+
+        Returns:
+            ndarray: Semivariances.
+        """
+        gamma = MODELS[self.variogram_model](h, *self.variogram_params)
+        return np.where(h > 0, gamma, 0.0)
+
+    def predict(
+        self, x: ndarray, y: ndarray, return_variance: bool = False
+    ) -> Union[ndarray, Tuple[ndarray, ndarray]]:
+        """Predicts values, and optionally kriging variances, at arbitrary locations, batch by batch.
+
+        Args:
+            x (ndarray): X coordinates of the prediction locations.
+            y (ndarray): Y coordinates of the prediction locations.
+            return_variance (bool, optional): Whether kriging variances are also returned. Defaults to False.
+
+        Returns:
+            Union[ndarray, Tuple[ndarray, ndarray]]: Predictions, or predictions and variances.
+        """
+        locations = np.column_stack([np.ravel(x), np.ravel(y)])
+        prediction = np.empty(len(locations))
+        variance = np.empty(len(locations))
+
+        for start in range(0, len(locations), self.block_size):
+            block = slice(start, start + self.block_size)
+            prediction[block], variance[block] = self._solve(locations[block])
+
+        return (prediction, variance) if return_variance else prediction
+
+    def predict_grid(
+        self, grid: Grid, return_variance: bool = False
+    ) -> Union[ndarray, Tuple[ndarray, ndarray]]:
+        """Predicts values, and optionally kriging variances, at every cell of a grid.
+
+        Blocks of rows are spread across a process pool when workers > 1.
+
+        Args:
+            grid (Grid): Prediction grid.
+            return_variance (bool, optional): Whether the variance surface is also returned. Defaults to False.
+
+        Returns:
+            Union[ndarray, Tuple[ndarray, ndarray]]: Surface, or surface and variance surface, shaped (nrows, ncols).
+        """
+        surface = np.empty(grid.shape)
+        variance = np.empty(grid.shape)
+        blocks = list(grid.blocks(self.block_size))
+
+        # Solve Blocks in this Process
+        if self.workers <= 1:
+            results = (_predict_rows(self, grid, rows) for rows in blocks)
+            for rows, (block_surface, block_variance) in zip(blocks, results):
+                surface[rows], variance[rows] = block_surface, block_variance
+
+        # Spread Blocks across Processes, Sending the Fitted Model Once per Worker
+        else:
+            with ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self, grid)
+            ) as executor:
+                results = executor.map(_predict_worker_rows, blocks)
+                for rows, (block_surface, block_variance) in zip(blocks, results):
+                    surface[rows], variance[rows] = block_surface, block_variance
+
+        return (surface, variance) if return_variance else surface
+
+    def predict_from_neighbours(
+        self,
+        locations: ndarray,
+        distances: ndarray,
+        index: ndarray,
+        return_variance: bool = False,
+    ) -> Union[ndarray, Tuple[ndarray, ndarray]]:
+        """Predicts from precomputed neighbours, e.g. queried once and reused across cross-validation folds.
+
+        Args:
+            locations (ndarray): (n, 2) array of prediction locations.
+            distances (ndarray): (n, >=k) distances to neighbours, sorted ascending.
+            index (ndarray): (n, >=k) indexes of neighbours in the known points.
+            return_variance (bool, optional): Whether kriging variances are also returned. Defaults to False.
+
+        Returns:
+            Union[ndarray, Tuple[ndarray, ndarray]]: Predictions, or predictions and variances.
+        """
+        k = min(self.neighbors, distances.shape[1])
+
+        prediction, variance = self._solve_system(
+            locations, distances[:, :k], index[:, :k]
+        )
+
+        return (prediction, variance) if return_variance else prediction
+
+    def _solve(self, locations: ndarray) -> Tuple[ndarray, ndarray]:
+        """Queries the nearest neighbours of a batch of locations and solves their kriging systems.
+
+        Args:
+            locations (ndarray): (n, 2) array of prediction locations.
+
+        Returns:
+            Tuple[ndarray, ndarray]: Predictions and kriging variances.
+        """
+        n = len(locations)
+        k = min(self.neighbors, len(self.values))
+
+        distances, index = self.tree.query(locations, k=k)
+
+        return self._solve_system(
+            locations, distances.reshape(n, k), index.reshape(n, k)
+        )
+
+    def _solve_system(
+        self, locations: ndarray, distances: ndarray, index: ndarray
+    ) -> Tuple[ndarray, ndarray]:
+        """Solves the local kriging systems of a batch of locations as one stacked linear solve.
+
+        Args:
+            locations (ndarray): (n, 2) array of prediction locations.
+            distances (ndarray): (n, k) distances to neighbours.
+            index (ndarray): (n, k) indexes of neighbours in the known points.
+
+        Returns:
+            Tuple[ndarray, ndarray]: Predictions and kriging variances.
+        """
+        n, k = index.shape
+
+        # Center Neighbours on Each Location for Numerical Stability
+        neighbours = self.points[index] - locations[:, None, :]
+
+        # Drift Terms: Constant for Ordinary, Plus Linear in X/Y for Universal Kriging
+        if self.method == "UNIVERSAL_KRIGING" and k > 3:
+            drift = np.concatenate([np.ones((n, k, 1)), neighbours], axis=2)
+            drift_target = np.tile([1.0, 0.0, 0.0], (n, 1))
+        else:
+            drift = np.ones((n, k, 1))
+            drift_target = np.ones((n, 1))
+
+        m = drift.shape[2]
+
+        # Build Stacked Systems [[Gamma, F], [F^T, 0]] w = [gamma_0, f_0]
+        pairwise = np.linalg.norm(
+            neighbours[:, :, None, :] - neighbours[:, None, :, :], axis=3
+        )
+
+        A = np.zeros((n, k + m, k + m))
+        A[:, :k, :k] = self.variogram(pairwise)
+        A[:, :k, k:] = drift
+        A[:, k:, :k] = drift.transpose(0, 2, 1)
+
+        b = np.concatenate([self.variogram(distances), drift_target], axis=1)
+
+        # Solve, Falling Back to Pseudo-Inverse for Singular Systems (e.g. Duplicate Points)
+        try:
+            w = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            w = (np.linalg.pinv(A) @ b[:, :, None])[:, :, 0]
+
+        prediction = np.einsum("nk,nk->n", w[:, :k], self.values[index])
+        variance = np.einsum("nj,nj->n", w, b)
+
+        return prediction, np.maximum(variance, 0.0)
+
+
+# Fitted Model & Grid Held by Each Worker Process
+_worker_model = None
+_worker_grid = None
+
+
+def _init_worker(model: KrigingInterpolator, grid: Grid) -> None:
+    """Stores the fitted model and grid in a worker process, so they are only sent once."""
+    global _worker_model, _worker_grid
+    _worker_model, _worker_grid = model, grid
+
+
+def _predict_rows(
+    model: KrigingInterpolator, grid: Grid, rows: slice
+) -> Tuple[ndarray, ndarray]:
+    """Predicts one block of grid rows, returning the surface and variance of the block."""
+    prediction, variance = model.predict(*grid.coordinates(rows), return_variance=True)
+    return prediction.reshape(-1, grid.ncols), variance.reshape(-1, grid.ncols)
+
+
+def _predict_worker_rows(rows: slice) -> Tuple[ndarray, ndarray]:
+    """Predicts one block of grid rows with the model held by the worker process."""
+    return _predict_rows(_worker_model, _worker_grid, rows)
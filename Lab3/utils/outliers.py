@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# Spatial Outlier Detection for Weather Observations
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# For Type Annotations
+from typing import List
+from numpy import ndarray
+from pandas import DataFrame
+
+# Values Checked Against Neighbouring Stations
+COLUMNS = ["max_tmpf", "min_tmpf", "precip"]
+
+# Smallest Spread Assumed Among Neighbours, so Identical Neighbours Do Not Flag Every Difference
+MIN_SCALE = {"max_tmpf": 2.0, "min_tmpf": 2.0, "precip": 0.25}
+
+# Scales a Median Absolute Deviation to a Standard Deviation for Normal Data
+MAD_SCALE = 1.4826
+
+
+def spatial_outliers(
+    df: DataFrame,
+    columns: List[str] = COLUMNS,
+    k: int = 8,
+    threshold: float = 4.0,
+    min_neighbors: int = 3,
+    min_scale: dict = MIN_SCALE,
+    block_days: int = 64,
+) -> DataFrame:
+    """Flags observations that disagree with the same day at their nearest stations.
+
+    Each value is compared to the median of those of its k nearest stations that reported the same
+    day, scaled by their median absolute deviation. Stations are indexed once with a KD-tree, and every day is
+    checked in one batched pass over a stations x days array.
+
+    Args:
+        df (DataFrame): Daily observations with station, date, x, y and the checked columns.
+        columns (List[str], optional): Columns that will be checked. Defaults to COLUMNS.
+        k (int, optional): Number of neighbouring stations. Defaults to 8.
+        threshold (float, optional): Robust z-score above which a value is flagged. Defaults to 4.0.
+        min_neighbors (int, optional): Neighbours that must report the same day for a value to be checked. Defaults to 3.
+        min_scale (dict, optional): Smallest spread assumed per column. Defaults to MIN_SCALE.
+        block_days (int, optional): Days compared per vectorized block, bounding memory. Defaults to 64.
+
+    Returns:
+        DataFrame: Boolean flag per checked column, aligned with df.
+    """
+    # Index Stations & Days
+    station_codes, stations = pd.factorize(df["station"])
+    day_codes, days = pd.factorize(pd.to_datetime(df["date"]))
+
+    # One Location per Station
+    coordinates = (
+        df[["x", "y"]]
+        .groupby(station_codes)
+        .first()
+        .reindex(range(len(stations)))
+        .to_numpy()
+    )
+
+    # Nearest Other Stations
+    n_neighbours = min(k, len(stations) - 1)
+    flags = pd.DataFrame(False, index=df.index, columns=columns)
+
+    if n_neighbours < min_neighbors:
+        return flags
+
+    _, index = cKDTree(coordinates).query(coordinates, k=n_neighbours + 1)
+
+    # Drop Each Station from its Own Neighbours, Even if Another Shares its Location
+    is_self = index == np.arange(len(stations))[:, None]
+    order = np.argsort(is_self, axis=1, kind="stable")[:, :n_neighbours]
+    neighbours = np.take_along_axis(index, order, axis=1)
+
+    for column in columns:
+        # Stations x Days Array, NaN where Not Reported
+        values = np.full((len(stations), len(days)), np.nan)
+        values[station_codes, day_codes] = df[column].to_numpy(dtype=np.float64)
+
+        outlier = _robust_outliers(
+            values,
+            neighbours,
+            threshold,
+            min_neighbors,
+            min_scale.get(column, 0.0),
+            block_days,
+        )
+
+        flags[column] = outlier[station_codes, day_codes]
+
+    return flags
+
+
+def _robust_outliers(
+    values: ndarray,
+    neighbours: ndarray,
+    threshold: float,
+    min_neighbors: int,
+    min_scale: float,
+    block_days: int,
+) -> ndarray:
+    """Flags values far from the median of their neighbours, in units of the neighbours' MAD.
+
+    Args:
+        values (ndarray): (stations, days) values, NaN where not reported.
+        neighbours (ndarray): (stations, k) indexes of neighbouring stations.
+        threshold (float): Robust z-score above which a value is flagged.
+        min_neighbors (int): Neighbours that must report for a value to be checked.
+        min_scale (float): Smallest spread assumed.
+        block_days (int): Days compared per vectorized block.
+
+    Returns:
+        ndarray: (stations, days) flags.
+    """
+    outlier = np.zeros(values.shape, dtype=bool)
+
+    for start in range(0, values.shape[1], block_days):
+        block = slice(start, start + block_days)
+
+        # (stations, k, days) Neighbour Values
+        around = values[neighbours, block]
+        reported = np.isfinite(around).sum(axis=1)
+
+        # Days Where No Neighbour Reported Give NaN, Which is Never Flagged
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+
+            median = np.nanmedian(around, axis=1)
+            mad = np.nanmedian(np.abs(around - median[:, None, :]), axis=1)
+
+            scale = np.maximum(MAD_SCALE * mad, min_scale)
+            z = np.abs(values[:, block] - median) / scale
+
+        outlier[:, block] = (reported >= min_neighbors) & (z > threshold)
+
+    return outlier
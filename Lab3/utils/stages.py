@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+#
+# Content-Hash Caching of Pipeline Stages
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import inspect
+import tempfile
+import functools
+import numpy as np
+
+# For Type Annotations
+from typing import Any, Callable, List
+from os import PathLike
+
+
+class StageCache:
+    """
+    A class used to remember the results of pipeline stages, keyed by a hash of their inputs and parameters.
+
+    The key of a stage also covers the keys of the stages it depends on, so a change upstream changes
+    every key downstream. The manifest records the key, outputs and dependencies of each stage, and
+    storing a stage under a new key drops the stages that depend on it.
+
+    Methods
+    -------
+    key(stage, parts, depends_on)
+        Hashes the inputs of a stage together with the keys of its dependencies.
+    lookup(stage, key, exists)
+        Returns the stored state of a stage if its key is unchanged and its outputs still exist.
+    store(stage, key, state, outputs, depends_on)
+        Stores the state of a stage and drops the stages downstream of it.
+    invalidate(stage)
+        Drops a stage and every stage downstream of it.
+
+    Example
+    -------
+    > cache = StageCache(r"cache_dir\\aggMthWX_62022")
+    > key = cache.key("hexagons", {"res": 7}, ["interpolate"])
+    > state = cache.lookup("hexagons", key)
+    """
+
+    def __init__(self, directory: PathLike) -> None:
+        """Instantiates the StageCache class, loading its manifest if it exists.
+
+        Args:
+            directory (PathLike): Directory that holds the manifest and the stored stages.
+        """
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.keys = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def key(self, stage: str, parts: Any, depends_on: List[str] = ()) -> str:
+        """Hashes the inputs of a stage together with the keys of its dependencies.
+
+        Args:
+            stage (str): Name of the stage.
+            parts (Any): Inputs and parameters of the stage; arrays are hashed by content.
+            depends_on (List[str], optional): Stages whose results the stage reads. Defaults to ().
+
+        Returns:
+            str: SHA-256 key of the stage.
+        """
+        digest = hashlib.sha256(stage.encode("utf-8"))
+
+        # Dependencies Run Earlier in this Session, or Were Restored from the Manifest
+        for dependency in depends_on:
+            upstream = self.keys.get(dependency) or self.manifest.get(
+                dependency, {}
+            ).get("key", "")
+            digest.update(upstream.encode("utf-8"))
+
+        _update(digest, parts)
+
+        return digest.hexdigest()
+
+    def lookup(self, stage: str, key: str, exists: Callable = os.path.exists) -> dict:
+        """Returns the stored state of a stage if its key is unchanged and its outputs still exist.
+
+        Args:
+            stage (str): Name of the stage.
+            key (str): Current key of the stage.
+            exists (Callable, optional): Checks that an output exists, e.g. arcpy.Exists. Defaults to os.path.exists.
+
+        Returns:
+            dict: Stored state, or None if the stage must run.
+        """
+        entry = self.manifest.get(stage)
+
+        if entry is None or entry["key"] != key:
+            return None
+
+        if not all(exists(output) for output in entry["outputs"]):
+            return None
+
+        try:
+            with open(self._state_path(stage), "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        self.keys[stage] = key
+
+        return state
+
+    def store(
+        self,
+        stage: str,
+        key: str,
+        state: dict,
+        outputs: List[str] = (),
+        depends_on: List[str] = (),
+    ) -> None:
+        """Stores the state of a stage and drops the stages downstream of it.
+
+        Args:
+            stage (str): Name of the stage.
+            key (str): Key of the stage.
+            state (dict): Attributes the stage produced, restored on a hit.
+            outputs (List[str], optional): Paths the stage wrote, which must still exist on a hit. Defaults to ().
+            depends_on (List[str], optional): Stages whose results the stage read. Defaults to ().
+        """
+        # Stages Downstream Were Built from the Previous Result
+        if self.manifest.get(stage, {}).get("key") != key:
+            self.invalidate(stage)
+
+        self._write(self._state_path(stage), pickle.dumps(state, protocol=5))
+
+        self.keys[stage] = key
+        self.manifest[stage] = {
+            "key": key,
+            "outputs": [str(o) for o in outputs],
+            "depends_on": list(depends_on),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+        self._save()
+
+    def invalidate(self, stage: str) -> None:
+        """Drops a stage and every stage downstream of it.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        stale = [stage]
+
+        while stale:
+            name = stale.pop()
+
+            if self.manifest.pop(name, None) is not None:
+                self.keys.pop(name, None)
+
+                if os.path.exists(self._state_path(name)):
+                    os.remove(self._state_path(name))
+
+            stale.extend(
+                s for s, entry in self.manifest.items() if name in entry["depends_on"]
+            )
+
+        self._save()
+
+    def _state_path(self, stage: str) -> str:
+        """Returns the path to the stored state of a stage."""
+        return os.path.join(self.directory, f"{stage}.pkl")
+
+    def _save(self) -> None:
+        """Writes the manifest atomically."""
+        self._write(
+            self.manifest_path, json.dumps(self.manifest, indent=2).encode("utf-8")
+        )
+
+    def _write(self, path: str, data: bytes) -> None:
+        """Writes a file atomically, so an interrupted run never leaves a partial stage."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp, path)
+
+
+def stage(
+    name: str,
+    attributes: List[str],
+    outputs: List[str] = (),
+    depends_on: List[str] = (),
+    ignore: List[str] = (),
+) -> Callable:
+    """Decorates a pipeline method so it is skipped when its inputs are unchanged.
+
+    The decorated method's object must have a 'stage_cache' attribute (None disables caching), a
+    '_stage_inputs()' method that returns what the stage reads from the object itself, and an
+    '_output_exists()' method that checks the outputs recorded in the manifest.
+
+    Args:
+        name (str): Name of the stage.
+        attributes (List[str]): Attributes the method sets, stored and restored on a hit.
+        outputs (List[str], optional): Attributes holding paths the method writes, which must still exist on a hit. Defaults to ().
+        depends_on (List[str], optional): Stages whose results the method reads. Defaults to ().
+        ignore (List[str], optional): Arguments that do not change the result, e.g. a number of workers. Defaults to ().
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "stage_cache", None)
+
+            if cache is None:
+                return method(self, *args, **kwargs)
+
+            # Key from Arguments, Inputs & Upstream Keys
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+
+            arguments = {
+                k: v
+                for k, v in bound.arguments.items()
+                if k != "self" and k not in ignore
+            }
+            key = cache.key(name, [self._stage_inputs(name), arguments], depends_on)
+
+            # Restore Previous Result
+            state = cache.lookup(name, key, self._output_exists)
+
+            if state is not None:
+                returned = state.pop("__return__", None)
+                self.__dict__.update(state)
+
+                # Message
+                print(f"Stage '{name}' is unchanged, skipped")
+                return returned
+
+            returned = method(self, *args, **kwargs)
+
+            state = {a: getattr(self, a, None) for a in attributes}
+            state["__return__"] = returned
+
+            cache.store(
+                name,
+                key,
+                state,
+                [getattr(self, o) for o in outputs if getattr(self, o, None)],
+                depends_on,
+            )
+
+            return returned
+
+        return wrapper
+
+    return decorator
+
+
+def _update(digest, value: Any) -> None:
+    """Feeds a value into a hash, arrays by content and interpolators by their parameters."""
+    if isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode("utf-8"))
+        digest.update(np.ascontiguousarray(value).tobytes())
+
+    elif isinstance(value, dict):
+        for k in sorted(value, key=str):
+            digest.update(repr(k).encode("utf-8"))
+            _update(digest, value[k])
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode("utf-8"))
+        for item in value:
+            _update(digest, item)
+
+    # Interpolators are Described by their Method & Parameters
+    elif hasattr(value, "params"):
+        digest.update(f"{type(value).__name__}{value.method}".encode("utf-8"))
+        _update(digest, value.params)
+
+    else:
+        digest.update(repr(value).encode("utf-8"))
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Columnar Storage of Daily Weather Observations
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import os
+import pandas as pd
+
+# PyArrow is Only Needed for Columnar Storage
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = feather = pq = None
+
+# For Type Annotations
+from typing import Iterator, List
+from os import PathLike
+from pandas import DataFrame
+
+# Columns Used to Partition the Dataset, Coarsest First
+PARTITIONS = ["year", "month", "station"]
+
+# Compact Dtypes of the Stored Columns
+DTYPES = {
+    "station": "category",
+    "name": "category",
+    "network": "category",
+    "max_tmpf": "float32",
+    "min_tmpf": "float32",
+    "precip": "float32",
+    "x": "float32",
+    "y": "float32",
+}
+
+
+class WeatherStore:
+    """
+    A class used to persist daily weather observations as a Parquet dataset partitioned by year, month
+    and station.
+
+    Measurements are stored as float32 and repeated strings as dictionary (categorical) columns.
+    Reads only decode the requested columns, and filters on partition columns skip whole files, so
+    years of observations can be analysed without extracting them again.
+
+    Methods
+    -------
+    write(df)
+        Writes observations, merged with those already stored in the partitions they fall in.
+    read(columns, filters)
+        Reads observations with column pruning and predicate pushdown.
+    read_batches(columns, filters, batch_size)
+        Yields observations in batches, for streaming aggregation.
+    write_arrow(df, path)
+        Static method. Writes observations to an uncompressed Arrow IPC file.
+    read_arrow(path, columns)
+        Static method. Reads an Arrow IPC file through a memory map, without copying.
+
+    Example
+    -------
+    > store = WeatherStore(r"weather_parquet")
+    > store.write(weather_etl.transform())
+    > df = store.read(["station", "date", "max_tmpf"], [("year", "=", 2022), ("month", "in", [6, 7])])
+    """
+
+    def __init__(self, root: PathLike) -> None:
+        """Instantiates the WeatherStore class.
+
+        Args:
+            root (PathLike): Directory that holds the dataset.
+
+        Raises:
+            ImportError: Raised if pyarrow is not installed.
+        """
+        if pa is None:
+            raise ImportError("WeatherStore requires pyarrow")
+
+        self.root = root
+
+    def write(self, df: DataFrame) -> None:
+        """Writes observations, merged with those already stored in the partitions they fall in.
+
+        Each partition is rewritten whole, so observations of the same station and date replace the stored
+        ones and re-running a month is idempotent, while stored days that are not in df, e.g. earlier days
+        of a month extracted incrementally, are kept.
+
+        Args:
+            df (DataFrame): Transformed daily observations.
+        """
+        df = self._compact(df)
+        stored = self._stored_rows(df)
+
+        # New Observations Win over Stored Ones of the Same Station & Date
+        if not stored.empty:
+            df = pd.concat([self._plain(stored), self._plain(df)], ignore_index=True)
+            df = self._compact(
+                df.drop_duplicates(["station", "date"], keep="last").sort_values(
+                    ["station", "date"], kind="stable"
+                )
+            )
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        pq.write_to_dataset(
+            table,
+            self.root,
+            partition_cols=PARTITIONS,
+            existing_data_behavior="delete_matching",
+        )
+
+    def read(self, columns: List[str] = None, filters: List[tuple] = None) -> DataFrame:
+        """Reads observations, decoding only the requested columns and row groups.
+
+        Args:
+            columns (List[str], optional): Columns that will be read. Defaults to None (all columns).
+            filters (List[tuple], optional): Predicates as (column, operator, value), e.g. ("year", "=", 2022).
+                Filters on year, month and station skip whole files. Defaults to None.
+
+        Returns:
+            DataFrame: Observations, with categorical strings and float32 measurements.
+        """
+        if not os.path.exists(self.root):
+            return pd.DataFrame(columns=columns)
+
+        table = pq.read_table(
+            self.root,
+            columns=columns,
+            filters=filters,
+            partitioning="hive",
+            memory_map=True,
+        )
+
+        return table.to_pandas()
+
+    def read_batches(
+        self,
+        columns: List[str] = None,
+        filters: List[tuple] = None,
+        batch_size: int = 65536,
+    ) -> Iterator[DataFrame]:
+        """Yields observations in batches, so datasets larger than memory can be aggregated as a stream.
+
+        Args:
+            columns (List[str], optional): Columns that will be read. Defaults to None (all columns).
+            filters (List[tuple], optional): Predicates as (column, operator, value). Defaults to None.
+            batch_size (int, optional): Maximum rows per batch. Defaults to 65536.
+
+        Yields:
+            DataFrame: A batch of observations.
+        """
+        dataset = ds.dataset(self.root, format="parquet", partitioning="hive")
+        expression = pq.filters_to_expression(filters) if filters else None
+
+        for batch in dataset.to_batches(
+            columns=columns, filter=expression, batch_size=batch_size
+        ):
+            yield batch.to_pandas()
+
+    @staticmethod
+    def write_arrow(df: DataFrame, path: PathLike) -> None:
+        """Writes observations to an uncompressed Arrow IPC file, which can be memory-mapped.
+
+        Args:
+            df (DataFrame): Daily observations.
+            path (PathLike): Path to the file.
+        """
+        table = pa.Table.from_pandas(WeatherStore._compact(df), preserve_index=False)
+        feather.write_feather(table, path, compression="uncompressed")
+
+    @staticmethod
+    def read_arrow(path: PathLike, columns: List[str] = None) -> DataFrame:
+        """Reads an Arrow IPC file through a memory map, so columns are not copied into memory.
+
+        Args:
+            path (PathLike): Path to the file.
+            columns (List[str], optional): Columns that will be read. Defaults to None (all columns).
+
+        Returns:
+            DataFrame: Observations.
+        """
+        table = feather.read_table(path, columns=columns, memory_map=True)
+
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _stored_rows(self, df: DataFrame) -> DataFrame:
+        """Reads the stored observations of the partitions that df falls in."""
+        if not os.path.exists(self.root):
+            return pd.DataFrame()
+
+        keys = df[PARTITIONS].drop_duplicates()
+
+        # Prune to the Partition Values, then Keep Only the Exact Partitions
+        stored = self.read(
+            filters=[
+                (column, "in", values.unique().tolist())
+                for column, values in self._partition_keys(keys).items()
+            ]
+        )
+
+        if stored.empty:
+            return stored
+
+        stored_keys = pd.MultiIndex.from_frame(self._partition_keys(stored))
+        new_keys = pd.MultiIndex.from_frame(self._partition_keys(keys))
+
+        return stored[stored_keys.isin(new_keys)]
+
+    @staticmethod
+    def _partition_keys(df: DataFrame) -> DataFrame:
+        """Returns the partition columns with plain types, so stored and new keys compare equal."""
+        return df[PARTITIONS].astype({"year": int, "month": int, "station": str})
+
+    @staticmethod
+    def _plain(df: DataFrame) -> DataFrame:
+        """Converts categorical columns back to plain values, so stored and new rows can be combined."""
+        return df.astype(
+            {
+                c: df[c].cat.categories.dtype
+                for c in df.columns
+                if df[c].dtype == "category"
+            }
+        )
+
+    @staticmethod
+    def _compact(df: DataFrame) -> DataFrame:
+        """Adds the partition columns and converts columns to compact dtypes."""
+        dates = pd.to_datetime(df["date"])
+
+        df = df.assign(date=dates, year=dates.dt.year, month=dates.dt.month)
+
+        return df.astype({c: t for c, t in DTYPES.items() if c in df.columns})
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# Native Cross-Validation & Model Selection
+# Luke Zaruba
+# GIS 5572: ArcGIS II - Lab 3
+# 2023-04-06
+#
+
+import itertools
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from concurrent.futures import ProcessPoolExecutor
+
+# For Type Annotations
+from typing import List, Tuple
+from numpy import ndarray
+from pandas import DataFrame
+
+
+def parameter_grid(interpolator: type, **grid) -> List:
+    """Creates one interpolator per combination of parameter values.
+
+    Args:
+        interpolator (type): Interpolator class, e.g. IDWInterpolator.
+        **grid: Lists of values per parameter, e.g. power=[1, 2, 3].
+
+    Returns:
+        List: Interpolator instances.
+
+    Example
+    -------
+    > parameter_grid(IDWInterpolator, power=[1, 2, 3], neighbors=[8, 16])
+    """
+    names = list(grid)
+
+    return [
+        interpolator(**dict(zip(names, values)))
+        for values in itertools.product(*grid.values())
+    ]
+
+
+def fold_ids(n: int, folds: int = None, seed: int = 0) -> ndarray:
+    """Assigns points to cross-validation folds.
+
+    Args:
+        n (int): Number of points.
+        folds (int, optional): Number of folds. Defaults to None (leave-one-out).
+        seed (int, optional): Seed of the random assignment. Defaults to 0.
+
+    Returns:
+        ndarray: Fold of each point.
+    """
+    if folds is None or folds >= n:
+        return np.arange(n)
+
+    return np.random.default_rng(seed).permutation(n) % folds
+
+
+def held_out_neighbours(
+    points: ndarray, k: int, folds: ndarray
+) -> Tuple[ndarray, ndarray]:
+    """Finds the k nearest neighbours of every point that are not in its own fold.
+
+    The KD-tree is queried once for all folds with enough extra neighbours to cover those that are
+    held out, and only the few points left short are re-queried against a tree of their fold's complement.
+
+    Args:
+        points (ndarray): (n, 2) array of point coordinates.
+        k (int): Number of neighbours.
+        folds (ndarray): Fold of each point.
+
+    Returns:
+        Tuple[ndarray, ndarray]: (n, k) distances and indexes, sorted by distance.
+    """
+    n = len(points)
+    n_folds = len(np.unique(folds))
+
+    # Query Once, with Margin for Neighbours in the Same Fold
+    if n_folds == n:
+        query_k = k + 1
+    else:
+        query_k = int(np.ceil(k * n_folds / (n_folds - 1) * 1.5)) + 1
+
+    query_k = min(query_k, n)
+
+    tree = cKDTree(points)
+    distances, index = tree.query(points, k=query_k)
+    distances = distances.reshape(n, query_k)
+    index = index.reshape(n, query_k)
+
+    # Move Neighbours in the Same Fold to the End, Keeping Distance Order
+    same_fold = folds[index] == folds[:, None]
+    order = np.argsort(same_fold, axis=1, kind="stable")[:, :k]
+
+    out_distances = np.take_along_axis(distances, order, axis=1)
+    out_index = np.take_along_axis(index, order, axis=1)
+
+    # Re-Query Points Left Short of k Out-of-Fold Neighbours
+    short = np.take_along_axis(same_fold, order, axis=1).any(axis=1)
+
+    for fold in np.unique(folds[short]):
+        rows = np.flatnonzero(short & (folds == fold))
+        keep = np.flatnonzero(folds != fold)
+
+        fold_distances, fold_index = cKDTree(points[keep]).query(points[rows], k=k)
+        out_distances[rows] = fold_distances.reshape(len(rows), k)
+        out_index[rows] = keep[fold_index.reshape(len(rows), k)]
+
+    return out_distances, out_index
+
+
+def error_statistics(predicted: ndarray, actual: ndarray) -> dict:
+    """Summarizes prediction errors.
+
+    Args:
+        predicted (ndarray): Predicted values.
+        actual (ndarray): Known values.
+
+    Returns:
+        dict: RMSE, MAE, mean error (bias) and number of points compared.
+    """
+    error = predicted - actual
+    error = error[np.isfinite(error)]
+
+    return {
+        "rmse": float(np.sqrt(np.mean(error**2))),
+        "mae": float(np.mean(np.abs(error))),
+        "bias": float(np.mean(error)),
+        "count": int(len(error)),
+    }
+
+
+def cross_validation_predictions(
+    model, points: ndarray, values: ndarray, distances: ndarray, index: ndarray
+) -> ndarray:
+    """Predicts every point from its held-out neighbours.
+
+    Kriging variograms are fitted once to all points and reused by every fold.
+
+    Args:
+        model (Any): IDWInterpolator or KrigingInterpolator.
+        points (ndarray): (n, 2) array of point coordinates.
+        values (ndarray): Values at the points.
+        distances (ndarray): (n, k) distances to held-out neighbours.
+        index (ndarray): (n, k) indexes of held-out neighbours.
+
+    Returns:
+        ndarray: Cross-validated prediction at each point.
+    """
+    model.fit(points[:, 0], points[:, 1], values)
+
+    return model.predict_from_neighbours(points, distances, index)
+
+
+def cross_validate(
+    candidates: List,
+    x: ndarray,
+    y: ndarray,
+    values: ndarray,
+    folds: int = None,
+    workers: int = 1,
+    seed: int = 0,
+) -> DataFrame:
+    """Cross-validates candidate interpolators and ranks them by RMSE.
+
+    Neighbours are queried once for the largest neighbourhood of all candidates and shared by every
+    candidate and fold. Candidates are spread across a process pool when workers > 1.
+
+    Args:
+        candidates (List): Interpolator instances, e.g. from parameter_grid().
+        x (ndarray): X coordinates of the known points.
+        y (ndarray): Y coordinates of the known points.
+        values (ndarray): Values at the known points.
+        folds (int, optional): Number of folds. Defaults to None (leave-one-out).
+        workers (int, optional): Number of processes candidates are spread across. Defaults to 1.
+        seed (int, optional): Seed of the fold assignment. Defaults to 0.
+
+    Returns:
+        DataFrame: One row per candidate with method, params, rmse, mae, bias and count, best first.
+            The 'candidate' column holds the position of the candidate in the input list.
+    """
+    points = np.column_stack([x, y]).astype(np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    assignment = fold_ids(len(values), folds, seed)
+
+    # Largest Neighbourhood that Every Fold Can Still Fill
+    largest_fold = np.bincount(assignment).max()
+    k = min(max(c.neighbors for c in candidates), len(values) - largest_fold)
+    distances, index = held_out_neighbours(points, k, assignment)
+
+    shared = (points, values, distances, index)
+
+    # Evaluate Candidates
+    if workers <= 1:
+        results = [_evaluate(c, *shared) for c in candidates]
+
+    else:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=shared
+        ) as executor:
+            results = list(executor.map(_evaluate_worker, candidates))
+
+    # Rank by RMSE
+    df = pd.DataFrame(
+        [
+            {"candidate": i, "method": c.method, "params": str(c.params), **stats}
+            for i, (c, stats) in enumerate(zip(candidates, results))
+        ]
+    )
+
+    return df.sort_values("rmse", kind="stable").reset_index(drop=True)
+
+
+def _evaluate(
+    model, points: ndarray, values: ndarray, distances: ndarray, index: ndarray
+) -> dict:
+    """Cross-validates one candidate and summarizes its errors."""
+    predicted = cross_validation_predictions(model, points, values, distances, index)
+    return error_statistics(predicted, values)
+
+
+# Points & Neighbours Held by Each Worker Process
+_worker_data = None
+
+
+def _init_worker(*shared) -> None:
+    """Stores the points and neighbours in a worker process, so they are only sent once."""
+    global _worker_data
+    _worker_data = shared
+
+
+def _evaluate_worker(model) -> dict:
+    """Cross-validates one candidate with the data held by the worker process."""
+    return _evaluate(model, *_worker_data)